@@ -5,3 +5,6 @@ class IngredientsConfig(AppConfig):
     name = 'ingredients'
     verbose_name = 'Ингредиент'
     verbose_name_plural = 'Ингредиенты'
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,93 @@
+"""Поиск ингредиентов по индексу в памяти процесса.
+
+Каталог ингредиентов небольшой и почти не меняется, а автодополнение
+запрашивает его на каждое нажатие клавиши. Поэтому каталог один раз
+загружается из базы данных в память процесса и ищется без обращения
+к базе данных:
+    - отсортированный список названий для поиска по началу названия;
+    - отсортированный список суффиксов названий (suffix array) для
+      поиска вхождения в середину названия.
+Индекс помнит версию справочника ингредиентов (utils.reference_data),
+по которой построен, и лениво строится заново при первом поиске после
+её изменения, в том числе изменения в другом процессе.
+"""
+import threading
+from bisect import bisect_left
+from typing import Iterable, List
+
+from .models import Ingredient
+from utils.reference_data import INGREDIENTS, get_version
+
+MAX_CHAR = chr(0x10FFFF)
+
+
+class IngredientSearchIndex:
+    """Индекс ингредиентов для поиска по началу и вхождению в название.
+
+    Результаты выводятся в той же последовательности, что и раньше при
+    поиске через базу данных: сначала ингредиенты, название которых
+    начинается с искомой строки, затем ингредиенты, содержащие её в
+    середине названия. Внутри каждой группы - в порядке id.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._ingredients = None
+        self._prefixes = None
+        self._prefix_positions = None
+        self._suffixes = None
+        self._suffix_positions = None
+
+    def search(self, search_terms: Iterable[str]) -> List[Ingredient]:
+        """Найти ингредиенты по списку поисковых строк."""
+        version = get_version(INGREDIENTS)
+        with self._lock:
+            if self._version != version:
+                self._build()
+                self._version = version
+            ingredients = self._ingredients
+            prefixes = (self._prefixes, self._prefix_positions)
+            suffixes = (self._suffixes, self._suffix_positions)
+
+        found = []
+        seen = set()
+        for search_term in search_terms:
+            search_term = search_term.lower()
+            for keys, positions in (prefixes, suffixes):
+                for position in self._find(keys, positions, search_term):
+                    if position not in seen:
+                        seen.add(position)
+                        found.append(ingredients[position])
+        return found
+
+    def _find(self, keys: list, positions: list, search_term: str) -> list:
+        """Найти позиции ингредиентов, ключи которых начинаются с term."""
+        start = bisect_left(keys, search_term)
+        end = bisect_left(keys, search_term + MAX_CHAR, start)
+        return sorted(set(positions[start:end]))
+
+    def _build(self) -> None:
+        self._ingredients = [
+            Ingredient(id=id, name=name, measurement_unit=measurement_unit)
+            for id, name, measurement_unit in (
+                Ingredient.objects.order_by('id')
+                .values_list('id', 'name', 'measurement_unit')
+            )
+        ]
+
+        prefixes = sorted(
+            (ingredient.name.lower(), position)
+            for position, ingredient in enumerate(self._ingredients)
+        )
+        suffixes = sorted(
+            (name[offset:], position)
+            for name, position in prefixes
+            for offset in range(1, len(name))
+        )
+        self._prefixes = [key for key, _ in prefixes]
+        self._prefix_positions = [position for _, position in prefixes]
+        self._suffixes = [key for key, _ in suffixes]
+        self._suffix_positions = [position for _, position in suffixes]
+
+
+ingredient_search_index = IngredientSearchIndex()
@@ -2,12 +2,15 @@ from rest_framework.viewsets import ReadOnlyModelViewSet
 
 from .models import Ingredient
 from .serializers import IngredientSerializer
-from utils.filters import DoubleSearchBackend
+from utils.filters import IngredientSearchBackend
+from utils.mixins import ReferenceDataConditionalGetMixin, ServerTimingMixin
+from utils.reference_data import INGREDIENTS
 
 
-class IngredientsViewSet(ReadOnlyModelViewSet):
+class IngredientsViewSet(ServerTimingMixin, ReferenceDataConditionalGetMixin,
+                         ReadOnlyModelViewSet):
+    reference_data = INGREDIENTS
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = [DoubleSearchBackend]
-    search_fields = ['^name', '$name']
+    filter_backends = [IngredientSearchBackend]
     pagination_class = None
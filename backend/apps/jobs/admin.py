@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'user', 'created_at',
+                    'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('started_at', 'finished_at', 'worker')
@@ -0,0 +1,102 @@
+"""Обработчик очереди фоновых задач.
+
+Определена дополнительная django команда ./manage.py run_jobs.
+Забирает задачи из очереди (jobs.queue) и выполняет их по одной.
+Для параллельной обработки запускается несколько команд, ограничения
+concurrency задач соблюдаются всеми обработчиками вместе. Между
+задачами команда возвращает в очередь зависшие задачи и удаляет
+задачи с истёкшим сроком хранения результата. По SIGTERM и SIGINT
+команда завершает текущую задачу и останавливается.
+
+Обработчик может запуститься раньше, чем веб-контейнер применит
+миграции, а база данных - стать недоступной во время работы. При
+ошибках базы данных (OperationalError, ProgrammingError) команда
+закрывает соединение и повторяет попытку через паузу, удваивающуюся с
+каждой ошибкой подряд до JOBS_DB_ERROR_MAX_DELAY. Задача, на которой
+произошла ошибка, возвращается в очередь как зависшая.
+
+Использование:
+    Команда запуска:
+        ./manage.py run_jobs
+        ./manage.py run_jobs --once
+"""
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, ProgrammingError, connection
+
+from jobs.queue import (claim_job, purge_expired_jobs, requeue_stale_jobs,
+                        run_job)
+
+
+class Command(BaseCommand):
+    help = 'Выполнение фоновых задач из очереди'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и завершиться',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help='Пауза в секундах, когда в очереди нет задач',
+        )
+
+    def handle(self, *args, **options) -> None:
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+
+        delay = 0
+        while not self.stopping:
+            try:
+                job = self._claim(worker)
+                if job is not None:
+                    self._run(job)
+            except (OperationalError, ProgrammingError) as error:
+                connection.close()
+                delay = min(max(delay * 2, settings.JOBS_POLL_INTERVAL),
+                            settings.JOBS_DB_ERROR_MAX_DELAY)
+                self.stderr.write(f'Ошибка базы данных: {error}. '
+                                  f'Повтор через {delay} с')
+                self._wait(delay)
+                continue
+            delay = 0
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+    def _claim(self, worker: str) -> object:
+        requeue_stale_jobs()
+        purge_expired_jobs()
+        return claim_job(worker)
+
+    def _run(self, job: object) -> None:
+        started = time.monotonic()
+        run_job(job)
+        self.stdout.write(
+            f'{job.name} {job.id}: {job.status}, попытка '
+            f'{job.attempts} за {time.monotonic() - started:.2f} с'
+            + (f' ({job.error})' if job.error else '')
+        )
+
+    def _wait(self, seconds: float) -> None:
+        """Пауза, которую прерывает остановка команды."""
+        deadline = time.monotonic() + seconds
+        while not self.stopping:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            time.sleep(min(left, 1))
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
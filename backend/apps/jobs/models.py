@@ -0,0 +1,142 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+User = get_user_model()
+
+
+def get_result_file_path(job: object, filename: str) -> str:
+    return f'jobs/{job.id}/{filename}'
+
+
+class Job(models.Model):
+    """Фоновая задача.
+    Очередь задач хранится в базе данных и выполняется командой
+    ./manage.py run_jobs (см. jobs.queue).
+    Attributes:
+        name(str):
+            Имя задачи, под которым её обработчик зарегистрирован
+            в jobs.registry.
+        payload(dict):
+            Параметры задачи.
+        user(int):
+            Пользователь, поставивший задачу. Только он видит её статус
+            и результат.
+        status(str):
+            queued - ждёт выполнения, running - выполняется,
+            succeeded - выполнена, failed - не выполнена за
+            max_attempts попыток.
+        attempts(int):
+            Количество начатых попыток.
+        max_attempts(int):
+            Наибольшее количество попыток.
+        run_after(datetime):
+            Задача не начнётся раньше этого момента (повтор после
+            ошибки откладывается).
+        result(dict):
+            Результат выполненной задачи.
+        result_file(str):
+            Файл с результатом. Удаляется вместе с задачей через
+            JOBS_RESULT_TTL после её завершения.
+        error(str):
+            Последняя ошибка.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (SUCCEEDED, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    name = models.CharField(
+        max_length=100,
+        verbose_name='Задача'
+    )
+    payload = models.JSONField(
+        default=dict,
+        verbose_name='Параметры'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='Пользователь'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name='Наибольшее количество попыток'
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Выполнить после'
+    )
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Обработчик'
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='Результат'
+    )
+    result_file = models.FileField(
+        upload_to=get_result_file_path,
+        blank=True,
+        verbose_name='Файл с результатом'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создана'
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Начата'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершена'
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = (
+            models.Index(
+                fields=('status', 'run_after'),
+                name='job_queue_idx'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.name} | {self.status} | {self.id}'
@@ -0,0 +1,153 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача ставится в очередь обычным INSERT (enqueue), поэтому задача,
+поставленная внутри транзакции, становится видна обработчикам только
+после её фиксации, а при откате исчезает вместе с ней. Отдельный брокер
+не нужен: обработчики (./manage.py run_jobs) забирают задачи из таблицы
+jobs_job.
+
+Задача забирается условным UPDATE ... WHERE status = 'queued': если
+два обработчика выбрали одну задачу, изменит её только один из них.
+Ограничение concurrency (jobs.registry.task) проверяется по числу
+выполняющихся задач с тем же именем в момент выбора задачи.
+"""
+import datetime
+import traceback
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+from .registry import get_task
+
+
+def enqueue(name: str, payload: dict = None, user: object = None) -> Job:
+    """Поставить задачу в очередь."""
+    task = get_task(name)
+    if task is None:
+        raise KeyError(f'Задача {name} не зарегистрирована')
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        user=user,
+        max_attempts=task.max_attempts,
+    )
+
+
+def claim_job(worker: str) -> Optional[Job]:
+    """Забрать из очереди задачу, готовую к выполнению.
+
+        -----
+        Выходное значение
+            Job или None, если готовых задач нет
+    """
+    while True:
+        now = timezone.now()
+        job = (Job.objects
+               .filter(status=Job.QUEUED, run_after__lte=now)
+               .exclude(name__in=_get_busy_task_names())
+               .order_by('run_after', 'created_at')
+               .only('id')
+               .first())
+        if job is None:
+            return None
+        claimed = (Job.objects
+                   .filter(pk=job.pk, status=Job.QUEUED)
+                   .update(status=Job.RUNNING,
+                           attempts=F('attempts') + 1,
+                           worker=worker,
+                           started_at=now))
+        if claimed:
+            return Job.objects.get(pk=job.pk)
+
+
+def run_job(job: Job) -> None:
+    """Выполнить задачу и сохранить её результат.
+
+    После ошибки задача возвращается в очередь с задержкой
+    JOBS_RETRY_DELAY, удваивающейся с каждой попыткой, а когда попытки
+    исчерпаны - завершается со статусом failed.
+    """
+    task = get_task(job.name)
+    try:
+        if task is None:
+            raise KeyError(f'Задача {job.name} не зарегистрирована')
+        job.result = task.handler(job)
+    except Exception as error:
+        job.error = ''.join(
+            traceback.format_exception_only(type(error), error)
+        ).strip()
+        if task is not None and job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + datetime.timedelta(
+                seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status = Job.SUCCEEDED
+        job.error = ''
+        job.finished_at = timezone.now()
+    job.save()
+
+
+def requeue_stale_jobs() -> int:
+    """Вернуть в очередь задачи, выполняющиеся дольше
+    JOBS_RUNNING_TIMEOUT (обработчик был остановлен или завис).
+
+        -----
+        Выходное значение
+            int: количество таких задач
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        started_at__lt=now - datetime.timedelta(
+            seconds=settings.JOBS_RUNNING_TIMEOUT
+        ),
+    )
+    failed = (stale
+              .filter(attempts__gte=F('max_attempts'))
+              .update(status=Job.FAILED,
+                      error='Превышено время выполнения',
+                      finished_at=now))
+    return failed + stale.update(status=Job.QUEUED, run_after=now)
+
+
+def purge_expired_jobs() -> int:
+    """Удалить задачи, завершённые раньше чем JOBS_RESULT_TTL назад,
+    вместе с файлами результатов.
+
+        -----
+        Выходное значение
+            int: количество удалённых задач
+    """
+    expired = Job.objects.filter(
+        status__in=(Job.SUCCEEDED, Job.FAILED),
+        finished_at__lt=timezone.now() - datetime.timedelta(
+            seconds=settings.JOBS_RESULT_TTL
+        ),
+    )
+    for job in expired.exclude(result_file='').only('id', 'result_file'):
+        job.result_file.delete(save=False)
+    deleted, _ = expired.delete()
+    return deleted
+
+
+def _get_busy_task_names() -> list:
+    """Имена задач, достигших ограничения concurrency."""
+    running = (Job.objects
+               .filter(status=Job.RUNNING)
+               .values_list('name')
+               .annotate(count=Count('id'))
+               .order_by())
+    busy = []
+    for name, count in running:
+        task = get_task(name)
+        if task is not None and task.concurrency is not None:
+            if count >= task.concurrency:
+                busy.append(name)
+    return busy
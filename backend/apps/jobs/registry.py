@@ -0,0 +1,44 @@
+"""Реестр обработчиков фоновых задач.
+
+Приложения регистрируют обработчики в своих модулях tasks.py
+(загружаются в JobsConfig.ready) декоратором task:
+
+    @task('recipes.shopping_list_pdf', concurrency=2)
+    def create_shopping_list_pdf(job):
+        ...
+
+Обработчик получает задачу (jobs.models.Job) и возвращает результат,
+сериализуемый в JSON, или None. Файл с результатом обработчик
+сохраняет в job.result_file без сохранения задачи (save=False).
+Исключение в обработчике приводит к повтору задачи, пока не исчерпаны
+max_attempts попыток.
+"""
+from collections import namedtuple
+from typing import Callable, Optional
+
+Task = namedtuple('Task', ('name', 'handler', 'concurrency', 'max_attempts'))
+
+TASKS = {}
+
+
+def task(name: str,
+         concurrency: Optional[int] = None,
+         max_attempts: int = 3) -> Callable:
+    """Зарегистрировать обработчик задачи.
+
+        ------
+        Параметры:
+            name: str - имя задачи
+            concurrency: int - сколько задач с этим именем может
+                выполняться одновременно всеми обработчиками очереди,
+                None - без ограничения
+            max_attempts: int - наибольшее количество попыток
+    """
+    def register(handler: Callable) -> Callable:
+        TASKS[name] = Task(name, handler, concurrency, max_attempts)
+        return handler
+    return register
+
+
+def get_task(name: str) -> Optional[Task]:
+    return TASKS.get(name)
@@ -0,0 +1,24 @@
+from rest_framework import serializers
+from rest_framework.reverse import reverse
+
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ('id', 'name', 'status', 'attempts', 'result', 'error',
+                  'created_at', 'finished_at', 'url', 'result_url')
+
+    def get_url(self, obj):
+        return reverse('jobs_api-detail', kwargs={'pk': obj.pk},
+                       request=self.context.get('request'))
+
+    def get_result_url(self, obj):
+        if not obj.result_file:
+            return None
+        return reverse('jobs_api-result', kwargs={'pk': obj.pk},
+                       request=self.context.get('request'))
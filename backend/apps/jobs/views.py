@@ -0,0 +1,40 @@
+import os
+
+from django.conf import settings
+from django.http import FileResponse
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+
+from .models import Job
+from .serializers import JobSerializer
+from utils.generalizing_functions import send_bad_request_response
+from utils.mixins import ServerTimingMixin
+
+
+class JobViewSet(ServerTimingMixin, mixins.RetrieveModelMixin,
+                 viewsets.GenericViewSet):
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+    @action(detail=True, url_path='result')
+    def result(self, request, *args, **kwargs):
+        """
+        Отправить файл с результатом задачи.
+
+        Пока задача не выполнена, отвечает ошибкой: статус задачи
+        нужно опрашивать по её url.
+        """
+        job = self.get_object()
+        if not job.result_file:
+            return send_bad_request_response(
+                settings.ERROR_MESSAGE.get('job_result_not_ready')
+            )
+        return FileResponse(
+            job.result_file.open('rb'),
+            as_attachment=True,
+            filename=os.path.basename(job.result_file.name)
+        )
@@ -1,6 +1,9 @@
 from django.contrib import admin
 
-from .models import IngredientsList, MarkedUserRecipe, Recipe
+from .counters import change_recipes_count, refresh_recipes_count
+from .models import Favorite, IngredientsList, Recipe, ShoppingCart
+from .shopping_cart import (change_recipe_in_totals,
+                            remove_recipes_from_all_totals)
 
 
 class IngredientsListInline(admin.TabularInline):
@@ -19,12 +22,60 @@ class RecipeAdmin(admin.ModelAdmin):
     search_fields = ['name', 'author']
 
     def total_number_of_additions(self, obj):
-        return obj.marked_favorited_recipes.all().count()
+        return obj.favorites_count
     total_number_of_additions.short_description = ('Общее количесвто '
                                                    'добавлений в избранное')
+    total_number_of_additions.admin_order_field = 'favorites_count'
 
+    def save_model(self, request, obj, form, change):
+        old_author_id = (form.initial.get('author')
+                         if change and 'author' in form.changed_data
+                         else None)
+        super().save_model(request, obj, form, change)
+        if old_author_id is not None:
+            refresh_recipes_count([old_author_id, obj.author_id])
 
-@admin.register(MarkedUserRecipe)
-class MarkedRecipeAdmin(admin.ModelAdmin):
-    list_display = ('user',)
-    filter_horizontal = ('fovorited_recipe', 'recipe_for_download')
+    def save_related(self, request, form, formsets, change):
+        recipe = form.instance
+        old_amounts = dict(
+            recipe.through_recipes.values_list('ingredients', 'amount')
+        )
+        super().save_related(request, form, formsets, change)
+        change_recipe_in_totals(
+            recipe.pk,
+            old_amounts,
+            dict(recipe.through_recipes.values_list('ingredients', 'amount'))
+        )
+
+    def delete_model(self, request, obj):
+        remove_recipes_from_all_totals([obj.pk])
+        change_recipes_count([obj.author_id], -1)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        author_ids = set(queryset.values_list('author', flat=True))
+        remove_recipes_from_all_totals(queryset.values('id'))
+        super().delete_queryset(request, queryset)
+        refresh_recipes_count(author_ids)
+
+
+@admin.register(Favorite, ShoppingCart)
+class UserRecipeMarkAdmin(admin.ModelAdmin):
+    """
+    Просмотр избранного и корзин.
+
+    Отметки меняются только через API (recipes.marks), вместе со
+    счётчиками и итогами корзин, поэтому в админке они только читаются.
+    """
+    list_display = ('user', 'recipe', 'created_at')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'user__email')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
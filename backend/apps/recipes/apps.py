@@ -1,7 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class RecipesConfig(AppConfig):
     name = 'recipes'
     verbose_name = 'Рецепт'
     verbose_name_plural = 'Рецепты'
+
+    def ready(self):
+        from . import signals  # noqa
+        from .search import create_search_index
+        from utils.file_creators import register_fonts
+        post_migrate.connect(create_search_index, sender=self)
+        register_fonts()
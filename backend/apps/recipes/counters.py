@@ -0,0 +1,92 @@
+"""Денормализованные счётчики.
+
+Recipe.favorites_count, User.recipes_count и User.followers_count
+хранятся в таблицах, чтобы выводить, сортировать и фильтровать по ним
+без COUNT запросов. Счётчики меняются одним UPDATE на изменение в той
+же транзакции, что и само изменение:
+    - избранное - при добавлении и удалении отметки (recipes.marks);
+    - подписки - сигналами m2m_changed (recipes.signals),
+      add/remove/clear связей выполняются в транзакции;
+    - создание рецепта - сигналом post_save;
+    - удаление рецептов - явными вызовами в представлениях и админке:
+      при удалении пользователя его рецепты удаляются каскадом, и
+      сигнал на каждый рецепт выполнял бы лишний UPDATE.
+Расхождения (например, после записи через bulk_create) исправляет
+reconcile_counters.
+"""
+from typing import Dict, Iterable
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorite, Recipe
+
+User = get_user_model()
+
+Subscription = User.subscriptions.through
+
+
+def change_favorites_count(recipe_ids: Iterable[int], delta: int) -> None:
+    """Изменить счётчик добавлений в избранное у рецептов на delta."""
+    _change(Recipe.objects.filter(pk__in=recipe_ids), 'favorites_count', delta)
+
+
+def change_recipes_count(author_ids: Iterable[int], delta: int) -> None:
+    """Изменить счётчик рецептов у авторов на delta."""
+    _change(User.objects.filter(pk__in=author_ids), 'recipes_count', delta)
+
+
+def change_followers_count(author_ids: Iterable[int], delta: int) -> None:
+    """Изменить счётчик подписчиков у авторов на delta."""
+    _change(User.objects.filter(pk__in=author_ids), 'followers_count', delta)
+
+
+def refresh_recipes_count(author_ids: Iterable[int]) -> None:
+    """Пересчитать счётчик рецептов у авторов одним UPDATE."""
+    User.objects.filter(pk__in=author_ids).update(
+        recipes_count=_count(Recipe, 'author')
+    )
+
+
+def reconcile_counters() -> Dict[str, int]:
+    """Пересчитать все счётчики по связям.
+
+        -----
+        Выходное значение
+            dict: {счётчик: количество исправленных записей}
+    """
+    counters = (
+        (Recipe, 'favorites_count', _count(Favorite, 'recipe')),
+        (User, 'recipes_count', _count(Recipe, 'author')),
+        (User, 'followers_count', _count(Subscription, 'to_user')),
+    )
+    return {
+        field: (model.objects
+                .exclude(**{field: actual})
+                .update(**{field: actual}))
+        for model, field, actual in counters
+    }
+
+
+def _change(queryset: object, field: str, delta: int) -> None:
+    if delta:
+        queryset.update(**{field: Greatest(
+            F(field) + Value(delta), Value(0), output_field=IntegerField()
+        )})
+
+
+def _count(model: object, field: str) -> object:
+    """Коррелированный подзапрос: количество строк model, ссылающихся
+    через field на текущую запись."""
+    return Coalesce(
+        Subquery(
+            model.objects
+            .filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('*'))
+            .values('total')
+        ),
+        Value(0),
+    )
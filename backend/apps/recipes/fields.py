@@ -0,0 +1,33 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+from .images import VARIANTS, needs_image_variants
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Ссылки на варианты изображения рецепта (recipes.images).
+
+    Пока варианты не созданы (или созданы для прежнего изображения),
+    вместо каждого из них выводится ссылка на исходное изображение.
+    """
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return {variant: None for variant in VARIANTS}
+        paths = ({} if needs_image_variants(recipe)
+                 else recipe.image_variants)
+        urls = {
+            variant: (default_storage.url(paths[variant])
+                      if variant in paths else recipe.image.url)
+            for variant in VARIANTS
+        }
+        request = self.context.get('request')
+        if request is not None:
+            urls = {variant: request.build_absolute_uri(url)
+                    for variant, url in urls.items()}
+        return urls
@@ -0,0 +1,108 @@
+"""Уменьшенные копии изображений рецептов.
+
+Лента, страница рецепта и списки подписок выводят изображение в
+разных размерах, поэтому для каждого рецепта хранятся варианты из
+VARIANTS в формате WebP: размеры ограничены, метаданные (EXIF и т.п.)
+не сохраняются. Пути вариантов записываются в Recipe.image_variants
+вместе с именем исходного изображения, поэтому устаревшие варианты
+определяются сравнением с Recipe.image.
+
+Варианты создаются вне запроса: сигнал post_save рецепта ставит в
+очередь фоновую задачу (recipes.tasks), и пока варианты не готовы, API
+отдаёт вместо них исходное изображение. Рецепты, записанные в обход
+сигналов (load_data), обрабатывает команда generate_image_variants.
+"""
+import os
+from io import BytesIO
+from typing import Dict
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Recipe
+from utils.response_cache import bump_recipes
+
+# Вариант: наибольшие ширина и высота, пропорции сохраняются.
+VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (600, 600),
+    'detail': (1200, 1200),
+}
+VARIANT_FORMAT = 'WEBP'
+VARIANT_EXTENSION = 'webp'
+VARIANT_QUALITY = 80
+VARIANTS_DIR = 'recipes/variants/'
+SOURCE = 'source'
+
+
+def needs_image_variants(recipe: object) -> bool:
+    """Нужно ли создать варианты изображения рецепта."""
+    return (bool(recipe.image)
+            and recipe.image_variants.get(SOURCE) != recipe.image.name)
+
+
+def update_image_variants(recipe_id: int, force: bool = False) -> bool:
+    """Создать варианты изображения рецепта и сохранить их пути.
+
+    Если изображение рецепта заменили во время обработки, созданные
+    файлы удаляются: варианты для нового изображения создаст его
+    собственный вызов.
+
+        -----
+        Выходное значение
+            bool: созданы ли варианты
+    """
+    recipe = (Recipe.objects
+              .only('id', 'image', 'image_variants')
+              .filter(pk=recipe_id)
+              .first())
+    if recipe is None or not recipe.image:
+        return False
+    if not force and not needs_image_variants(recipe):
+        return False
+
+    variants = create_image_variants(recipe.image)
+    updated = (Recipe.objects
+               .filter(pk=recipe_id, image=recipe.image.name)
+               .update(image_variants=variants))
+    _delete_variant_files(recipe.image_variants if updated else variants)
+    if updated:
+        bump_recipes([recipe_id])
+    return bool(updated)
+
+
+def create_image_variants(image: object) -> Dict[str, str]:
+    """Записать в хранилище варианты изображения.
+
+        -----
+        Выходное значение
+            dict: {вариант: путь, SOURCE: имя исходного изображения}
+    """
+    with image.open('rb'):
+        source = Image.open(image)
+        source.load()
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert(
+                'RGBA' if source.mode in ('LA', 'PA', 'P') else 'RGB'
+            )
+
+    stem = os.path.splitext(os.path.basename(image.name))[0]
+    variants = {SOURCE: image.name}
+    for variant, size in VARIANTS.items():
+        resized = source.copy()
+        resized.thumbnail(size, Image.Resampling.LANCZOS)
+        content = BytesIO()
+        resized.save(content, VARIANT_FORMAT, quality=VARIANT_QUALITY)
+        variants[variant] = default_storage.save(
+            f'{VARIANTS_DIR}{stem}-{variant}.{VARIANT_EXTENSION}',
+            ContentFile(content.getvalue()),
+        )
+    return variants
+
+
+def _delete_variant_files(variants: Dict[str, str]) -> None:
+    for variant, path in variants.items():
+        if variant != SOURCE:
+            default_storage.delete(path)
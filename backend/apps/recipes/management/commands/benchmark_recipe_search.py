@@ -0,0 +1,89 @@
+"""Бенчмарк полнотекстового поиска рецептов.
+
+Определена дополнительная django команда
+./manage.py benchmark_recipe_search. Команда измеряет время ответа
+/api/recipes/?search=... для запросов разной избирательности: от слова,
+которое есть в каждом рецепте, до слова, которого нет ни в одном. Для
+сравнения измеряется время ответа ленты без поиска. Запросы составлены
+под синтетические данные (utils.data_generators), поэтому база
+заполняется командой generate_data, которая строит и поисковый индекс
+(recipes.search).
+
+Использование:
+    Команда запуска:
+        ./manage.py generate_data --scale production --flush
+        ./manage.py benchmark_recipe_search
+        ./manage.py benchmark_recipe_search --repeat 50
+"""
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+# (описание, поисковая строка)
+QUERIES = (
+    ('лента без поиска', ''),
+    ('все рецепты', 'рецепт'),
+    ('все рецепты, два слова', 'смешать готовить'),
+    ('ингредиент по префиксу', 'ингредиент 17'),
+    ('рецепты одного автора', 'user{author}'),
+    ('рецепты одного автора с тегом', 'user{author}&tags={tag}'),
+    ('нет совпадений', 'несуществующее'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк полнотекстового поиска рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Количество повторов каждого запроса',
+        )
+
+    def handle(self, *args, **options) -> None:
+        recipes = Recipe.objects.count()
+        if not recipes:
+            raise CommandError('В базе нет рецептов, заполните её командой '
+                               'generate_data')
+        self.stdout.write(f'Рецептов: {recipes}')
+
+        viewer = User.objects.order_by('id').first()
+        token, _ = Token.objects.get_or_create(user=viewer)
+        # Анонимные ответы кешируются, поэтому запросы выполняются
+        # от имени пользователя.
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        context = {
+            'author': User.objects.order_by('-id').first().id,
+            'tag': 'tag1',
+        }
+        self.stdout.write(f'{"запрос":32} {"найдено":>8} '
+                          f'{"p50, мс":>8} {"p95, мс":>8} {"max, мс":>8}')
+        for label, query in QUERIES:
+            self._measure(client, label, query.format(**context),
+                          options['repeat'])
+
+    def _measure(self, client: Client, label: str, query: str,
+                 repeat: int) -> None:
+        path = f'/api/recipes/?search={query}'
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(path)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+        self.stdout.write(
+            f'{label:32} {response.json()["count"]:8} '
+            f'{statistics.median(timings):8.1f} {p95:8.1f} '
+            f'{timings[-1]:8.1f}'
+        )
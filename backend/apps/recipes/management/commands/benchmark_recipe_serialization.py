@@ -0,0 +1,119 @@
+"""Бенчмарк сериализации рецептов для чтения.
+
+Определена дополнительная django команда
+./manage.py benchmark_recipe_serialization. Для страниц ленты разного
+размера команда сравнивает RecipeSerializer по объектам рецептов (select_related и
+prefetch_related, как было в RecipeViewSet) с RecipeRowSerializer по
+строкам values_list (recipes.row_serializers). Время включает запросы
+к базе данных и сериализацию, но не рендеринг JSON; ответы обоих
+вариантов сверяются байт в байт. Для сравнения измеряется время ответа
+/api/recipes/?limit=... целиком. Замеры выполняются на рабочей базе
+данных от имени первого пользователя, базу можно заполнить командой
+generate_data.
+
+Использование:
+    Команда запуска:
+        ./manage.py generate_data --flush
+        ./manage.py benchmark_recipe_serialization
+        ./manage.py benchmark_recipe_serialization --page-size 20 500
+"""
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.models import Recipe
+from recipes.row_serializers import ROW_FIELDS, RecipeRowSerializer
+from recipes.serializers import RecipeSerializer
+from recipes.views import RecipeViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк сериализации рецептов для чтения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            nargs='+',
+            default=[20, 100, 500],
+            help='Размеры страниц',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Количество повторов каждого замера',
+        )
+
+    def handle(self, *args, **options) -> None:
+        page_sizes = options['page_size']
+        recipes = Recipe.objects.count()
+        if min(page_sizes) < 1 or max(page_sizes) > recipes:
+            raise CommandError(f'Размер страницы должен быть от 1 до '
+                               f'количества рецептов в базе ({recipes})')
+        viewer = User.objects.order_by('id').first()
+        token, _ = Token.objects.get_or_create(user=viewer)
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = viewer
+        view = RecipeViewSet(request=request, action='list',
+                             format_kwarg=None, kwargs={})
+        recipes = view._annotate_user_marks(Recipe.objects.all())
+        # Анонимные ответы кешируются, поэтому запросы выполняются
+        # от имени пользователя.
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        self.stdout.write(
+            f'{"рецептов":>8} {"объекты, мс":>12} {"строки, мс":>11} '
+            f'{"строк/с":>9} {"ускорение":>10} {"ответ, мс":>10}'
+        )
+        for page_size in page_sizes:
+            self._measure(view, recipes, client, page_size,
+                          options['repeat'])
+
+    def _measure(self, view: RecipeViewSet, recipes: object,
+                 client: Client, page_size: int, repeat: int) -> None:
+        context = view.get_serializer_context()
+
+        def serialize_instances():
+            page = list(view._prefetch_related_data(recipes)[:page_size])
+            return RecipeSerializer(page, many=True, context=context).data
+
+        def serialize_rows():
+            page = list(recipes.values_list(*ROW_FIELDS,
+                                            named=True)[:page_size])
+            return RecipeRowSerializer(page, many=True, context=context).data
+
+        renderer = JSONRenderer()
+        if (renderer.render(serialize_instances())
+                != renderer.render(serialize_rows())):
+            raise CommandError(f'Ответы сериализаторов на странице из '
+                               f'{page_size} рецептов различаются')
+
+        instances = _median_ms(serialize_instances, repeat)
+        rows = _median_ms(serialize_rows, repeat)
+        response = _median_ms(
+            lambda: client.get(f'/api/recipes/?limit={page_size}'), repeat
+        )
+        self.stdout.write(
+            f'{page_size:8} {instances:12.1f} {rows:11.1f} '
+            f'{page_size / rows * 1000:9.0f} {instances / rows:9.1f}x '
+            f'{response:10.1f}'
+        )
+
+
+def _median_ms(function: callable, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
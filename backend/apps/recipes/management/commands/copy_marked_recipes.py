@@ -0,0 +1,22 @@
+"""Перенос избранного и корзин в отдельные таблицы.
+
+Определена дополнительная django команда ./manage.py copy_marked_recipes.
+Переносит связи устаревшей модели MarkedUserRecipe в таблицы Favorite
+и ShoppingCart (recipes.marks.copy_legacy_marks). Перенесённые связи
+удаляются из старых таблиц, поэтому повторный запуск ничего не меняет.
+
+Использование:
+    Команда запуска:
+        ./manage.py copy_marked_recipes
+"""
+from django.core.management.base import BaseCommand
+
+from recipes.marks import copy_legacy_marks
+
+
+class Command(BaseCommand):
+    help = 'Перенос избранного и корзин из MarkedUserRecipe'
+
+    def handle(self, *args, **kwargs) -> None:
+        for name, copied in copy_legacy_marks().items():
+            self.stdout.write(f'{name}: перенесено {copied}')
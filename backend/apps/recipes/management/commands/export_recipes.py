@@ -0,0 +1,55 @@
+"""Выгрузка рецептов в NDJSON.
+
+Определена дополнительная django команда ./manage.py export_recipes.
+Потоково выгружает авторов, теги, ингредиенты и рецепты с их тегами,
+ингредиентами и путями к изображениям (см. utils.data_exporters),
+поэтому память не зависит от количества рецептов. Выгрузка
+загружается командой import_recipes.
+
+Использование:
+    Команда запуска:
+        ./manage.py export_recipes --output recipes.ndjson
+        ./manage.py export_recipes > recipes.ndjson
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.data_exporters import EXPORT_CHUNK_SIZE, export_recipes
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка рецептов в NDJSON'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--output',
+            metavar='PATH',
+            help='Путь к файлу выгрузки, по умолчанию стандартный вывод',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Количество записей, читаемых из базы данных за раз',
+        )
+
+    def handle(self, *args, **options) -> None:
+        started = time.monotonic()
+        lines = 0
+        chunks = export_recipes(chunk_size=options['chunk_size'])
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        try:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    lines += chunk.count('\n')
+        except OSError as error:
+            raise CommandError(f'{options["output"]}: {error}') from error
+        self.stdout.write(
+            f'Выгружено записей: {lines} за '
+            f'{time.monotonic() - started:.2f} с'
+        )
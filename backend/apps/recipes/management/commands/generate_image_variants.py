@@ -0,0 +1,45 @@
+"""Создание вариантов изображений рецептов.
+
+Определена дополнительная django команда ./manage.py
+generate_image_variants. Создаёт уменьшенные копии изображений
+(recipes.images) для рецептов, у которых их нет или которые созданы
+для прежнего изображения. Нужна после записи рецептов в обход сигналов
+(load_data, bulk_create) и после изменения recipes.images.VARIANTS.
+
+Использование:
+    Команда запуска:
+        ./manage.py generate_image_variants
+        ./manage.py generate_image_variants --all
+"""
+from django.core.management.base import BaseCommand
+
+from recipes.images import needs_image_variants, update_image_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных копий изображений рецептов'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать варианты всех рецептов',
+        )
+
+    def handle(self, *args, **options) -> None:
+        recipes = (Recipe.objects
+                   .exclude(image='')
+                   .only('id', 'image', 'image_variants')
+                   .order_by('id'))
+        created = failed = 0
+        for recipe in recipes.iterator():
+            if not (options['all'] or needs_image_variants(recipe)):
+                continue
+            try:
+                created += update_image_variants(recipe.pk, force=True)
+            except OSError as error:
+                failed += 1
+                self.stderr.write(f'Рецепт {recipe.pk}: {error}')
+        self.stdout.write(f'Созданы варианты для рецептов: {created}, '
+                          f'ошибок: {failed}')
@@ -0,0 +1,59 @@
+"""Загрузка выгрузки рецептов.
+
+Определена дополнительная django команда ./manage.py import_recipes.
+Загружает файл, созданный export_recipes или /api/recipes/export/
+(см. utils.data_loaders.load_recipe_export): файл читается потоково и
+записывается пачками, id тегов и ингредиентов выгрузки заменяются id
+записей этой базы данных. Рецепты сопоставляются по id выгрузки,
+поэтому повторная загрузка обновляет рецепты, загруженные ранее, а
+рецепты с одинаковыми названиями не сливаются.
+
+Использование:
+    Команда запуска:
+        ./manage.py import_recipes recipes.ndjson
+        ./manage.py import_recipes recipes.ndjson --batch-size 500
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.data_loaders import (BATCH_SIZE, EXPORT_INGREDIENT, EXPORT_RECIPE,
+                                EXPORT_TAG, EXPORT_USER, load_recipe_export,
+                                read_records)
+
+TITLES = {
+    EXPORT_USER: 'Авторы',
+    EXPORT_TAG: 'Теги',
+    EXPORT_INGREDIENT: 'Ингредиенты',
+    EXPORT_RECIPE: 'Рецепты',
+}
+
+
+class Command(BaseCommand):
+    help = 'Загрузка выгрузки рецептов из NDJSON'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            'path',
+            help='Путь к файлу выгрузки (.ndjson или .jsonl)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество записей в одной пачке',
+        )
+
+    def handle(self, *args, **options) -> None:
+        started = time.monotonic()
+        try:
+            totals = load_recipe_export(read_records(options['path'], ()),
+                                        batch_size=options['batch_size'])
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'{options["path"]}: {error}') from error
+        for record_type, (read, created, existing) in totals.items():
+            self.stdout.write(
+                f'{TITLES[record_type]}: прочитано {read}, создано '
+                f'{created}, уже существовало {existing}'
+            )
+        self.stdout.write(f'Загружено за {time.monotonic() - started:.2f} с')
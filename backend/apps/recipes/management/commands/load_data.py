@@ -0,0 +1,74 @@
+"""Загрузка данных в базу данных.
+
+Определена дополнительная django команда ./manage.py load_data.
+Загружает ингредиенты, теги и рецепты из файлов CSV, JSON и JSON Lines
+(см. utils.data_loaders). Повторная загрузка обновляет существующие
+записи и не создаёт дубликатов, поэтому команда выполняется при каждом
+запуске docker контейнера.
+
+Использование:
+    Cтуктура файла ingredients.csv:
+        product_name,measurement_unit
+
+    Cтуктура файла tags.csv:
+        name,color,slug
+
+    Команда запуска:
+        ./manage.py load_data --ingredients ../data/ingredients.csv
+        ./manage.py load_data --tags tags.csv --recipes recipes.jsonl
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.data_loaders import (BATCH_SIZE, INGREDIENT_FIELDS, TAG_FIELDS,
+                                load_ingredients, load_recipes, load_tags,
+                                read_records)
+
+LOADERS = (
+    ('ingredients', 'Ингредиенты', load_ingredients, INGREDIENT_FIELDS),
+    ('tags', 'Теги', load_tags, TAG_FIELDS),
+    ('recipes', 'Рецепты', load_recipes, ()),
+)
+
+
+class Command(BaseCommand):
+    help = 'Загрузка ингредиентов, тегов и рецептов из файлов'
+
+    def add_arguments(self, parser) -> None:
+        for option, title, _, _ in LOADERS:
+            parser.add_argument(
+                f'--{option}',
+                metavar='PATH',
+                help=f'{title}: путь к файлу CSV, JSON или JSON Lines',
+            )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество записей в одной пачке',
+        )
+
+    def handle(self, *args, **options) -> None:
+        if not any(options[option] for option, _, _, _ in LOADERS):
+            raise CommandError('Не указан ни один файл для загрузки')
+
+        # Порядок важен: рецепты ссылаются на теги и ингредиенты.
+        for option, title, loader, fields in LOADERS:
+            file_path = options[option]
+            if not file_path:
+                continue
+            started = time.monotonic()
+            try:
+                read, created, existing = loader(
+                    read_records(file_path, fields),
+                    batch_size=options['batch_size'],
+                )
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(f'{title}: {error}') from error
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{title}: прочитано {read}, создано {created}, '
+                f'уже существовало {existing} за {elapsed:.2f} с '
+                f'({read / max(elapsed, 1e-6):.0f} строк/с)'
+            )
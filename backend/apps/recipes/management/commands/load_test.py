@@ -0,0 +1,108 @@
+"""Нагрузочное тестирование запущенного сервера.
+
+Определена дополнительная django команда ./manage.py load_test.
+Воспроизводит смесь запросов к маршрутам router_v1 (ленты с фильтрами,
+рецепты, справочники, пользователи, подписки, избранное, корзина и её
+выгрузка, создание рецептов) против запущенного сервера и выводит
+пропускную способность, долю ошибок и перцентили времени ответа по
+сценариям (utils.load_testing). Сервер заполняется командой
+generate_data; изменения, сделанные тестом, откатываются им же.
+
+Использование:
+    Команда запуска:
+        ./manage.py generate_data --flush
+        gunicorn config.wsgi:application --workers 4 &
+        ./manage.py load_test --url http://127.0.0.1:8000 --duration 60
+        ./manage.py load_test --concurrency 32 --scenario feed recipe
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.data_generators import USER_PASSWORD
+from utils.load_testing import (PERCENTILES, TRAFFIC_MIX, LoadTestError,
+                                run_load_test)
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочное тестирование API запущенного сервера'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--url',
+            default='http://127.0.0.1:8000',
+            help='Адрес сервера',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Длительность замера, секунды',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=float,
+            default=5,
+            help='Длительность прогрева перед замером, секунды',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Количество одновременных клиентов',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            help='Количество пользователей, по умолчанию по одному на '
+                 'клиента',
+        )
+        parser.add_argument(
+            '--password',
+            default=USER_PASSWORD,
+            help='Пароль пользователей',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно выбора сценариев и данных',
+        )
+        parser.add_argument(
+            '--scenario',
+            nargs='+',
+            choices=[scenario.name for scenario in TRAFFIC_MIX],
+            help='Выполнять только эти сценарии',
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options['duration'] <= 0 or options['concurrency'] < 1:
+            raise CommandError('Длительность и количество клиентов должны '
+                               'быть положительными')
+        try:
+            report = run_load_test(
+                options['url'],
+                duration=options['duration'],
+                concurrency=options['concurrency'],
+                users=options['users'] or options['concurrency'],
+                seed=options['seed'],
+                warmup=options['warmup'],
+                password=options['password'],
+                scenarios=options['scenario'],
+            )
+        except LoadTestError as error:
+            raise CommandError(str(error)) from error
+
+        columns = ''.join(f'{f"p{percent}, мс":>9}' for percent in PERCENTILES)
+        self.stdout.write(f'{"сценарий":30} {"метод":6} {"запросов":>9} '
+                          f'{"ошибок":>7} {"в секунду":>10}{columns}'
+                          f'{"max, мс":>9}')
+        for row in report['rows'] + [report['total']]:
+            self.stdout.write(
+                f'{row["scenario"]:30} {row["method"]:6} '
+                f'{row["requests"]:9} {row["errors"]:7} {row["rps"]:10.1f}'
+                + ''.join(f'{row[f"p{percent}"]:9.1f}'
+                          for percent in PERCENTILES)
+                + f'{row["max"]:9.1f}'
+            )
+        for (scenario, method, status), count in report['errors'].items():
+            self.stderr.write(f'Ошибки {scenario} {method}: статус '
+                              f'{status or "нет ответа"} - {count}')
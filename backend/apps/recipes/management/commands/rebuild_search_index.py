@@ -0,0 +1,22 @@
+"""Перестроение поискового индекса рецептов.
+
+Определена дополнительная django команда ./manage.py rebuild_search_index.
+Заново строит поисковые документы всех рецептов (recipes.search) и
+удаляет документы удалённых рецептов. Нужна после записи рецептов или
+ингредиентов в обход сигналов и для исправления расхождений.
+
+Использование:
+    Команда запуска:
+        ./manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+
+from recipes.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Перестроение поискового индекса рецептов'
+
+    def handle(self, *args, **kwargs) -> None:
+        documents = rebuild_search_index()
+        self.stdout.write(f'Проиндексировано рецептов: {documents}')
@@ -0,0 +1,23 @@
+"""Пересчёт итогов корзин покупок.
+
+Определена дополнительная django команда
+./manage.py rebuild_shopping_cart_totals.
+Пересчитывает таблицу ShoppingCartIngredient по содержимому корзин
+пользователей. Нужна для первоначального заполнения итогов и для
+исправления расхождений.
+
+Использование:
+    Команда запуска:
+        ./manage.py rebuild_shopping_cart_totals
+"""
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_cart import rebuild_shopping_cart_totals
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт итогов корзин покупок'
+
+    def handle(self, *args, **kwargs) -> None:
+        rows = rebuild_shopping_cart_totals()
+        self.stdout.write(f'Записано строк итогов: {rows}')
@@ -0,0 +1,26 @@
+"""Исправление денормализованных данных.
+
+Определена дополнительная django команда ./manage.py reconcile_counters.
+Пересчитывает по связям счётчики Recipe.favorites_count,
+User.recipes_count и User.followers_count, а также итоги корзин покупок.
+Нужна после записи данных в обход представлений (bulk_create, ручные
+правки в базе данных) и для исправления расхождений.
+
+Использование:
+    Команда запуска:
+        ./manage.py reconcile_counters
+"""
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile_counters
+from recipes.shopping_cart import rebuild_shopping_cart_totals
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт счётчиков и итогов корзин покупок'
+
+    def handle(self, *args, **kwargs) -> None:
+        for counter, fixed in reconcile_counters().items():
+            self.stdout.write(f'{counter}: исправлено записей {fixed}')
+        rows = rebuild_shopping_cart_totals()
+        self.stdout.write(f'Записано строк итогов: {rows}')
@@ -0,0 +1,278 @@
+"""Избранное и корзина покупок.
+
+Отметка рецепта - строка (user, recipe, created_at) таблицы Favorite
+или ShoppingCart с уникальным индексом (user, recipe):
+    - добавление выполняется одним INSERT, который при повторе ничего
+      не записывает (INSERT OR IGNORE на SQLite, ON CONFLICT DO NOTHING
+      на PostgreSQL);
+    - удаление выполняется одним DELETE.
+Количество затронутых строк показывает, изменился ли список, поэтому
+отдельная проверка "уже в списке" не нужна, а параллельные повторы
+одного запроса не приводят к ошибке и не меняют производные данные
+дважды. Только при фактическом изменении в той же транзакции
+обновляются счётчик Recipe.favorites_count (recipes.counters) и итоги
+корзины (recipes.shopping_cart).
+
+Пакетные изменения (change_favorites, change_shopping_cart) добавляют
+и удаляют отметки сразу для списка рецептов теми же INSERT и DELETE
+с RETURNING, которые возвращают id действительно изменённых рецептов.
+"""
+import sqlite3
+from typing import Dict, Iterable, List, Set
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .counters import change_favorites_count
+from .models import Favorite, MarkedUserRecipe, Recipe, ShoppingCart
+from .shopping_cart import add_recipes_to_totals, remove_recipes_from_totals
+
+# Результаты пакетного изменения списка для рецепта.
+ADDED = 'added'
+ALREADY_PRESENT = 'already_present'
+REMOVED = 'removed'
+NOT_PRESENT = 'not_present'
+NOT_FOUND = 'not_found'
+
+
+def add_to_favorites(user_id: int, recipe_id: int) -> bool:
+    """Добавить рецепт в избранное.
+
+        -----
+        Выходное значение
+            bool: False, если рецепт уже в избранном
+    """
+    with transaction.atomic():
+        added = _insert_mark(Favorite, user_id, recipe_id)
+        if added:
+            change_favorites_count([recipe_id], 1)
+    return added
+
+
+def remove_from_favorites(user_id: int, recipe_id: int) -> bool:
+    """Убрать рецепт из избранного.
+
+        -----
+        Выходное значение
+            bool: False, если рецепта нет в избранном
+    """
+    with transaction.atomic():
+        removed = _delete_mark(Favorite, user_id, recipe_id)
+        if removed:
+            change_favorites_count([recipe_id], -1)
+    return removed
+
+
+def add_to_shopping_cart(user_id: int, recipe_id: int) -> bool:
+    """Добавить рецепт в корзину покупок.
+
+        -----
+        Выходное значение
+            bool: False, если рецепт уже в корзине
+    """
+    with transaction.atomic():
+        added = _insert_mark(ShoppingCart, user_id, recipe_id)
+        if added:
+            add_recipes_to_totals([user_id], [recipe_id])
+    return added
+
+
+def remove_from_shopping_cart(user_id: int, recipe_id: int) -> bool:
+    """Убрать рецепт из корзины покупок.
+
+        -----
+        Выходное значение
+            bool: False, если рецепта нет в корзине
+    """
+    with transaction.atomic():
+        removed = _delete_mark(ShoppingCart, user_id, recipe_id)
+        if removed:
+            remove_recipes_from_totals([user_id], [recipe_id])
+    return removed
+
+
+def change_favorites(user_id: int, add_ids: Iterable[int],
+                     remove_ids: Iterable[int]) -> Dict[int, str]:
+    """Добавить рецепты add_ids в избранное и убрать из него remove_ids.
+
+        -----
+        Выходное значение
+            dict: {id рецепта: результат (ADDED, ALREADY_PRESENT,
+                REMOVED, NOT_PRESENT или NOT_FOUND)}
+    """
+    with transaction.atomic():
+        results, added, removed = _change_marks(Favorite, user_id,
+                                                add_ids, remove_ids)
+        change_favorites_count(added, 1)
+        change_favorites_count(removed, -1)
+    return results
+
+
+def change_shopping_cart(user_id: int, add_ids: Iterable[int],
+                         remove_ids: Iterable[int]) -> Dict[int, str]:
+    """Добавить рецепты add_ids в корзину покупок и убрать из неё
+    remove_ids.
+
+        -----
+        Выходное значение
+            dict: {id рецепта: результат}, как у change_favorites
+    """
+    with transaction.atomic():
+        results, added, removed = _change_marks(ShoppingCart, user_id,
+                                                add_ids, remove_ids)
+        if added:
+            add_recipes_to_totals([user_id], added)
+        if removed:
+            remove_recipes_from_totals([user_id], removed)
+    return results
+
+
+def copy_legacy_marks() -> dict:
+    """Перенести избранное и корзины из MarkedUserRecipe.
+
+    Связи каждого списка копируются одним INSERT ... SELECT и удаляются
+    из старых таблиц в той же транзакции, поэтому повторный перенос
+    ничего не меняет и не возвращает удалённые с тех пор отметки.
+    Счётчики и итоги корзин при переносе не меняются: они считались
+    по тем же связям.
+
+        -----
+        Выходное значение
+            dict: {модель: количество перенесённых отметок}
+    """
+    legacy = (
+        (Favorite, MarkedUserRecipe.fovorited_recipe.through),
+        (ShoppingCart, MarkedUserRecipe.recipe_for_download.through),
+    )
+    copied = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model, through in legacy:
+            cursor.execute(
+                f'{_get_insert_statement(model)} '
+                f'SELECT mark.user_id, link.recipe_id, %s '
+                f'FROM {through._meta.db_table} link '
+                f'JOIN {MarkedUserRecipe._meta.db_table} mark '
+                f'ON mark.id = link.markeduserrecipe_id '
+                f'{_get_conflict_suffix()}',
+                [_get_now()]
+            )
+            copied[model._meta.verbose_name_plural] = cursor.rowcount
+            through.objects.all().delete()
+    return copied
+
+
+def _insert_mark(model: object, user_id: int, recipe_id: int) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{_get_insert_statement(model)} '
+            f'VALUES (%s, %s, %s) {_get_conflict_suffix()}',
+            [user_id, recipe_id, _get_now()]
+        )
+        return cursor.rowcount > 0
+
+
+def _delete_mark(model: object, user_id: int, recipe_id: int) -> bool:
+    deleted, _ = model.objects.filter(user=user_id, recipe=recipe_id).delete()
+    return deleted > 0
+
+
+def _change_marks(model: object, user_id: int, add_ids: Iterable[int],
+                  remove_ids: Iterable[int]) -> tuple:
+    """Пакетное изменение отметок.
+
+        -----
+        Выходное значение
+            tuple: (результаты по рецептам, id добавленных рецептов,
+                id удалённых рецептов)
+    """
+    add_ids, remove_ids = list(add_ids), list(remove_ids)
+    existing = set(Recipe.objects
+                   .filter(pk__in=add_ids + remove_ids)
+                   .values_list('pk', flat=True))
+    added = _insert_marks(model, user_id,
+                          [pk for pk in add_ids if pk in existing])
+    removed = _delete_marks(model, user_id,
+                            [pk for pk in remove_ids if pk in existing])
+
+    results = {}
+    for pk in add_ids:
+        results[pk] = (NOT_FOUND if pk not in existing
+                       else ADDED if pk in added else ALREADY_PRESENT)
+    for pk in remove_ids:
+        results[pk] = (NOT_FOUND if pk not in existing
+                       else REMOVED if pk in removed else NOT_PRESENT)
+    return results, sorted(added), sorted(removed)
+
+
+def _insert_marks(model: object, user_id: int,
+                  recipe_ids: List[int]) -> Set[int]:
+    """Добавить отметки, вернуть id рецептов, которых не было в списке."""
+    if not recipe_ids:
+        return set()
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    sql = (f'{_get_insert_statement(model)} '
+           f'SELECT %s, id, %s FROM {Recipe._meta.db_table} '
+           f'WHERE id IN ({placeholders}) {_get_conflict_suffix()}')
+    params = [user_id, _get_now(), *recipe_ids]
+    if _can_return_rows():
+        return _execute_returning(sql, params)
+    present = _get_marked(model, user_id, recipe_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+    return set(recipe_ids) - present
+
+
+def _delete_marks(model: object, user_id: int,
+                  recipe_ids: List[int]) -> Set[int]:
+    """Удалить отметки, вернуть id рецептов, которые были в списке."""
+    if not recipe_ids:
+        return set()
+    if not _can_return_rows():
+        present = _get_marked(model, user_id, recipe_ids)
+        model.objects.filter(user=user_id, recipe__in=present).delete()
+        return present
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    return _execute_returning(
+        f'DELETE FROM {model._meta.db_table} '
+        f'WHERE user_id = %s AND recipe_id IN ({placeholders})',
+        [user_id, *recipe_ids]
+    )
+
+
+def _execute_returning(sql: str, params: list) -> Set[int]:
+    with connection.cursor() as cursor:
+        cursor.execute(f'{sql} RETURNING recipe_id', params)
+        return {recipe_id for recipe_id, in cursor.fetchall()}
+
+
+def _get_marked(model: object, user_id: int,
+                recipe_ids: List[int]) -> Set[int]:
+    return set(model.objects
+               .filter(user=user_id, recipe__in=recipe_ids)
+               .values_list('recipe', flat=True))
+
+
+def _can_return_rows() -> bool:
+    """Поддерживает ли база данных INSERT/DELETE ... RETURNING.
+
+    Без RETURNING изменённые рецепты определяются по отметкам,
+    прочитанным перед записью, и параллельное изменение того же списка
+    может быть учтено дважды (расхождения исправят reconcile_counters и
+    rebuild_shopping_cart_totals).
+    """
+    if connection.vendor == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 35)
+    return connection.vendor == 'postgresql'
+
+
+def _get_insert_statement(model: object) -> str:
+    return (f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{model._meta.db_table} (user_id, recipe_id, created_at)')
+
+
+def _get_conflict_suffix() -> str:
+    return connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+
+
+def _get_now() -> object:
+    return connection.ops.adapt_datetimefield_value(timezone.now())
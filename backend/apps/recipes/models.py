@@ -29,6 +29,13 @@ class Recipe(models.Model):
             IngredientsList с указанием количества ингридиента.
         pub_date(datetime):
             Дата добавления рецепта. Прописывается автоматически.
+        favorites_count(int):
+            Количество добавлений в избранное.
+            Поддерживается recipes.counters.
+        image_variants(dict):
+            Уменьшенные копии изображения: {вариант: путь}, под ключом
+            source - изображение, из которого они получены.
+            Поддерживается recipes.images.
     """
     author = models.ForeignKey(
         User,
@@ -64,11 +71,32 @@ class Recipe(models.Model):
         auto_now_add=True,
         editable=False,
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество добавлений в избранное'
+    )
+    image_variants = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Уменьшенные копии изображения'
+    )
 
     class Meta:
         ordering = ('-publication_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=('-publication_date', '-id'),
+                name='recipe_feed_idx'
+            ),
+            # Последние рецепты автора в подписках (UserViewSet).
+            models.Index(
+                fields=('author', '-publication_date', '-id'),
+                name='recipe_author_feed_idx'
+            ),
+        )
 
     def __str__(self) -> str:
         return (f'{self.id} | {self.name} | '
@@ -110,8 +138,116 @@ class IngredientsList(models.Model):
         )
 
 
+class Favorite(models.Model):
+    """Избранные рецепты пользователя.
+    Каждая отметка - отдельная строка. Уникальный индекс (user, recipe)
+    не даёт отметить рецепт дважды и покрывает выборку отметок
+    пользователя, индекс (recipe, user) - выборку пользователей,
+    отметивших рецепт (см. recipes.marks).
+    Attributes:
+        user(int):
+            Пользователь. Связь через ForeignKey.
+        recipe(int):
+            Отмеченный рецепт. Связь через ForeignKey.
+        created_at(datetime):
+            Дата добавления. Прописывается автоматически.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='favorites',
+        db_index=False,
+        verbose_name='Пользователь',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='favorites',
+        db_index=False,
+        verbose_name='Рецепт',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата добавления',
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = 'Избранный рецепт'
+        verbose_name_plural = 'Избранные рецепты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_favorite'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', 'user'),
+                name='favorite_recipe_idx'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.user} | {self.recipe_id}'
+
+
+class ShoppingCart(models.Model):
+    """Рецепты в корзине покупок пользователя.
+    Индексы устроены так же, как у Favorite.
+    Attributes:
+        user(int):
+            Пользователь. Связь через ForeignKey.
+        recipe(int):
+            Отмеченный рецепт. Связь через ForeignKey.
+        created_at(datetime):
+            Дата добавления. Прописывается автоматически.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart',
+        db_index=False,
+        verbose_name='Пользователь',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart',
+        db_index=False,
+        verbose_name='Рецепт',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата добавления',
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = 'Рецепт в корзине'
+        verbose_name_plural = 'Рецепты в корзине'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_shopping_cart'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', 'user'),
+                name='shopping_cart_recipe_idx'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.user} | {self.recipe_id}'
+
+
 class MarkedUserRecipe(models.Model):
-    """Отмеченные пользователем рецепты
+    """Отмеченные пользователем рецепты (устаревшая модель).
+    Избранное и корзина хранятся в Favorite и ShoppingCart, данные
+    переносятся из этой модели командой copy_marked_recipes. Модель
+    оставлена, пока её таблицы не перенесены на всех установках.
     Attributes:
         user(int):
             Пользователь, который добавил рецепт.
@@ -147,3 +283,47 @@ class MarkedUserRecipe(models.Model):
         return (f'{self.id} | {self.user} | '
                 f'{self.recipe_for_download.all()[:5]} | '
                 f'{self.fovorited_recipe.all()[:5]}')
+
+
+class ShoppingCartIngredient(models.Model):
+    """Суммарное количество ингредиента в корзине пользователя.
+    Материализованные итоги по всем рецептам корзины, поддерживаются
+    изменениями при добавлении/удалении рецептов из корзины и при
+    редактировании рецептов (см. recipes.shopping_cart).
+    Attributes:
+        user(int):
+            Владелец корзины. Связь через ForeignKey.
+        ingredient(int):
+            Ингредиент. Связь через ForeignKey.
+        amount(int):
+            Суммарное количество ингредиента во всех рецептах корзины.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент',
+    )
+    amount = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество',
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент корзины'
+        verbose_name_plural = 'Ингредиенты корзины'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_cart_ingredient'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.user} | {self.ingredient} | {self.amount}'
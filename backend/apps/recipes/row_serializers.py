@@ -0,0 +1,239 @@
+"""Быстрая сериализация рецептов для чтения (list, retrieve).
+
+RecipeSerializer на каждый рецепт запускает поля DRF и вложенные
+сериализаторы автора, тегов и ингредиентов (IngredientsListSerializer
+создаёт IngredientSerializer на каждый ингредиент). RecipeRowSerializer
+строит тот же ответ по строкам values_list:
+    - рецепт с автором и отметками пользователя - строка основного
+      запроса (ROW_FIELDS);
+    - теги и ингредиенты страницы - по одному запросу той же формы,
+      что и prefetch_related RecipeSerializer, поэтому порядок тегов и
+      ингредиентов тот же;
+    - подписки пользователя - один запрос, как в check_the_occurrence.
+
+Состав и порядок ключей берутся из полей RecipeSerializer,
+UserSerializer, TagSerializer и IngredientSerializer и один раз
+сводятся в таблицы "ключ ответа -> функция от строки", поэтому JSON
+совпадает с ответом RecipeSerializer байт в байт. Поле, добавленное в
+эти сериализаторы, но неизвестное таблицам, приводит к ошибке
+ImproperlyConfigured, а не к расхождению ответов.
+"""
+from collections import defaultdict
+from functools import lru_cache
+from operator import attrgetter
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from .images import SOURCE, VARIANTS
+from .models import IngredientsList
+from .serializers import RecipeSerializer
+from ingredients.serializers import IngredientSerializer
+from tags.models import Tag
+from tags.serializers import TagSerializer
+from users.serializers import UserSerializer
+
+# Поля строки рецепта (values_list(*ROW_FIELDS, named=True)).
+# publication_date нужна курсорной пагинации (RecipeFeedPagination).
+ROW_FIELDS = (
+    'id', 'name', 'image', 'text', 'cooking_time', 'image_variants',
+    'publication_date', 'is_favorited', 'is_in_shopping_cart',
+    'author_id', 'author__email', 'author__username',
+    'author__first_name', 'author__last_name',
+)
+# Поля ответа, которые берутся из строки как есть.
+PLAIN_RECIPE_FIELDS = ('id', 'name', 'text', 'cooking_time',
+                       'is_favorited', 'is_in_shopping_cart')
+AUTHOR_ROW_FIELDS = {
+    'id': 'author_id',
+    'email': 'author__email',
+    'username': 'author__username',
+    'first_name': 'author__first_name',
+    'last_name': 'author__last_name',
+}
+TAG_ROW_FIELDS = ('id', 'name', 'color', 'slug')
+INGREDIENT_ROW_FIELDS = ('id', 'name', 'measurement_unit')
+
+
+class RecipeRowSerializer:
+    """
+    Сериализация строк рецептов (см. ROW_FIELDS) для list и retrieve.
+
+    Принимает те же аргументы, что и RecipeSerializer, и отдаёт data
+    такого же вида, но только для чтения.
+    """
+    def __init__(self, instance=None, many: bool = False,
+                 context: dict = None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        request = self.context.get('request')
+        self._build_absolute_uri = (request.build_absolute_uri
+                                    if request is not None else None)
+        self._user = getattr(request, 'user', None)
+        self._subscriptions = None
+        self._urls = {}
+
+    @property
+    def data(self):
+        if self.many:
+            return ReturnList(self.to_representation(self.instance),
+                              serializer=self)
+        return ReturnDict(self.to_representation([self.instance])[0],
+                          serializer=self)
+
+    def to_representation(self, rows: Sequence[tuple]) -> List[dict]:
+        if not rows:
+            return []
+        ids = [row.id for row in rows]
+        tags = self._get_tags(ids)
+        ingredients = self._get_ingredients(ids)
+        builders = [
+            (key, self._bind(kind, argument, tags, ingredients))
+            for key, kind, argument in _get_recipe_field_map()
+        ]
+        return [{key: build(row) for key, build in builders} for row in rows]
+
+    def _bind(self, kind: str, argument: object, tags: dict,
+              ingredients: dict) -> Callable:
+        """Функция поля ответа от строки рецепта."""
+        if kind == 'plain':
+            return argument
+        if kind == 'tags':
+            return lambda row: tags.get(row.id, [])
+        if kind == 'ingredients':
+            return lambda row: ingredients.get(row.id, [])
+        if kind == 'author':
+            return self._get_author
+        if kind == 'image':
+            return lambda row: self._get_image_url(row.image)
+        return self._get_image_variants
+
+    def _get_author(self, row: tuple) -> dict:
+        author = {}
+        for key, get in _get_author_field_map():
+            author[key] = (get(row) if get is not None
+                           else self._is_subscribed(row.author_id))
+        return author
+
+    def _is_subscribed(self, author_id: int) -> bool:
+        if self._user is None or self._user.is_anonymous:
+            return False
+        if self._subscriptions is None:
+            self._subscriptions = set(
+                self._user.subscriptions.values_list('pk', flat=True)
+            )
+        return author_id in self._subscriptions
+
+    def _get_tags(self, ids: List[int]) -> Dict[int, List[dict]]:
+        tags = defaultdict(list)
+        known = {}
+        keys = _get_tag_keys()
+        for recipe_id, *values in (Tag.objects
+                                   .filter(recipes__in=ids)
+                                   .values_list('recipes', *TAG_ROW_FIELDS)):
+            tag_id = values[0]
+            if tag_id not in known:
+                known[tag_id] = dict(zip(keys, values))
+            tags[recipe_id].append(known[tag_id])
+        return tags
+
+    def _get_ingredients(self, ids: List[int]) -> Dict[int, List[dict]]:
+        ingredients = defaultdict(list)
+        keys = _get_ingredient_keys()
+        for recipe_id, *values in (IngredientsList.objects
+                                   .filter(recipe__in=ids)
+                                   .values_list('recipe', 'ingredients',
+                                                'ingredients__name',
+                                                'ingredients__measurement_unit',
+                                                'amount')):
+            ingredients[recipe_id].append(dict(zip(keys, values)))
+        return ingredients
+
+    def _get_image_url(self, name: str) -> str:
+        """Ссылка на файл, как у ImageField DRF."""
+        if not name:
+            return None
+        if name not in self._urls:
+            url = default_storage.url(name)
+            if self._build_absolute_uri is not None:
+                url = self._build_absolute_uri(url)
+            self._urls[name] = url
+        return self._urls[name]
+
+    def _get_image_variants(self, row: tuple) -> dict:
+        """Ссылки на варианты изображения, как у ImageVariantsField."""
+        if not row.image:
+            return {variant: None for variant in VARIANTS}
+        paths = row.image_variants or {}
+        if paths.get(SOURCE) != row.image:
+            paths = {}
+        return {
+            variant: self._get_image_url(paths.get(variant, row.image))
+            for variant in VARIANTS
+        }
+
+
+@lru_cache(maxsize=None)
+def _get_recipe_field_map() -> Tuple[tuple, ...]:
+    """Поля ответа RecipeSerializer: (ключ, вид, аргумент) по порядку."""
+    kinds = {
+        'tags': 'tags',
+        'ingredients': 'ingredients',
+        'author': 'author',
+        'image': 'image',
+        'image_variants': 'image_variants',
+    }
+    field_map = []
+    for key in _get_readable_fields(RecipeSerializer):
+        if key in PLAIN_RECIPE_FIELDS:
+            field_map.append((key, 'plain', attrgetter(key)))
+        elif key in kinds:
+            field_map.append((key, kinds[key], None))
+        else:
+            _raise_unknown_field(RecipeSerializer, key)
+    return tuple(field_map)
+
+
+@lru_cache(maxsize=None)
+def _get_author_field_map() -> Tuple[tuple, ...]:
+    """Поля автора: (ключ, функция от строки или None для is_subscribed)."""
+    field_map = []
+    for key in _get_readable_fields(UserSerializer):
+        if key == 'is_subscribed':
+            field_map.append((key, None))
+        elif key in AUTHOR_ROW_FIELDS:
+            field_map.append((key, attrgetter(AUTHOR_ROW_FIELDS[key])))
+        else:
+            _raise_unknown_field(UserSerializer, key)
+    return tuple(field_map)
+
+
+@lru_cache(maxsize=None)
+def _get_tag_keys() -> Tuple[str, ...]:
+    keys = tuple(_get_readable_fields(TagSerializer))
+    if keys != TAG_ROW_FIELDS:
+        _raise_unknown_field(TagSerializer, keys)
+    return keys
+
+
+@lru_cache(maxsize=None)
+def _get_ingredient_keys() -> Tuple[str, ...]:
+    keys = tuple(_get_readable_fields(IngredientSerializer))
+    if keys != INGREDIENT_ROW_FIELDS:
+        _raise_unknown_field(IngredientSerializer, keys)
+    return keys + ('amount',)
+
+
+def _get_readable_fields(serializer_class: type) -> List[str]:
+    return [name for name, field in serializer_class().fields.items()
+            if not field.write_only]
+
+
+def _raise_unknown_field(serializer_class: type, field: object) -> None:
+    raise ImproperlyConfigured(
+        f'RecipeRowSerializer не знает поле {field} '
+        f'{serializer_class.__name__}'
+    )
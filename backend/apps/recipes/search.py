@@ -0,0 +1,244 @@
+"""Полнотекстовый поиск рецептов.
+
+Для каждого рецепта в отдельной таблице SEARCH_TABLE хранится
+поисковый документ из названия, описания и названий ингредиентов:
+    - SQLite: виртуальная таблица FTS5 (rowid - id рецепта), результаты
+      ранжируются функцией bm25;
+    - PostgreSQL: столбец tsvector с GIN индексом, результаты
+      ранжируются функцией ts_rank.
+В обоих случаях совпадение в названии весит больше, чем в ингредиентах,
+а в ингредиентах - больше, чем в описании. Каждое слово запроса ищется
+по началу слова, все слова запроса должны встретиться в документе.
+
+Таблица не описывается моделью: она создаётся обработчиком post_migrate
+(create_search_index) и при создании заполняется по существующим
+рецептам. Документы обновляются после фиксации транзакции
+(schedule_search_index_update) сигналами рецептов и ингредиентов,
+сериализатором рецепта при изменении ингредиентов и загрузчиками данных
+после массовой записи. Документы удалённых рецептов в поиск не попадают,
+поскольку поиск всегда соединяется с таблицей рецептов, и удаляются при
+удалении рецептов через API, а остальные - командой
+rebuild_search_index.
+"""
+import re
+from typing import Iterable, Optional
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Q
+
+from .models import IngredientsList, Recipe
+from ingredients.models import Ingredient
+
+SEARCH_TABLE = 'recipes_recipe_search'
+# Поля рецепта, из которых состоит его поисковый документ.
+SEARCH_FIELDS = frozenset(('name', 'text'))
+# Конфигурация полнотекстового поиска PostgreSQL.
+SEARCH_CONFIG = 'russian'
+# Веса совпадений: название, ингредиенты, описание.
+NAME_WEIGHT, INGREDIENTS_WEIGHT, TEXT_WEIGHT = 10.0, 4.0, 1.0
+MAX_SEARCH_TERMS = 8
+SUPPORTED_VENDORS = ('postgresql', 'sqlite')
+BATCH_SIZE = 500
+
+SEARCH_TERM = re.compile(r'\w+')
+
+
+def create_search_index(using: str = DEFAULT_DB_ALIAS, **kwargs) -> None:
+    """Создать таблицу поискового индекса, если её нет (post_migrate).
+
+    Только что созданный индекс заполняется по существующим рецептам.
+    """
+    db = connections[using]
+    if db.vendor not in SUPPORTED_VENDORS:
+        return
+    with db.cursor() as cursor:
+        if SEARCH_TABLE in db.introspection.table_names(cursor):
+            return
+        if db.vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE TABLE {SEARCH_TABLE} ('
+                f'recipe_id integer PRIMARY KEY, '
+                f'document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX {SEARCH_TABLE}_document_idx '
+                f'ON {SEARCH_TABLE} USING GIN (document)'
+            )
+        else:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {SEARCH_TABLE} '
+                f'USING fts5(name, ingredients, text, prefix=\'2 3\')'
+            )
+    rebuild_search_index(using)
+
+
+def rebuild_search_index(using: str = DEFAULT_DB_ALIAS) -> int:
+    """Заново построить поисковые документы всех рецептов.
+
+        -----
+        Выходное значение
+            int: количество документов
+    """
+    db = connections[using]
+    if db.vendor not in SUPPORTED_VENDORS:
+        return 0
+    with transaction.atomic(using=using), db.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(_get_insert_sql(db.vendor, ''), _get_params(db.vendor))
+        return cursor.rowcount
+
+
+def update_search_index(recipe_ids: Iterable[int]) -> None:
+    """Обновить поисковые документы рецептов.
+
+    Документы несуществующих рецептов удаляются.
+    """
+    if not _is_supported():
+        return
+    recipe_ids = list(recipe_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            batch = recipe_ids[start:start + BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} '
+                f'WHERE {_get_key_column()} IN ({placeholders})',
+                batch
+            )
+            cursor.execute(
+                _get_insert_sql(connection.vendor,
+                                f'WHERE recipe.id IN ({placeholders})'),
+                _get_params(connection.vendor) + batch
+            )
+
+
+def schedule_search_index_update(recipe_ids: Iterable[int]) -> None:
+    """Обновить поисковые документы рецептов после фиксации транзакции.
+
+    Документ строится по уже записанным ингредиентам, поэтому новый
+    рецепт индексируется вместе с ингредиентами, добавленными после
+    сохранения самого рецепта в той же транзакции.
+    """
+    recipe_ids = list(recipe_ids)
+    if _is_supported():
+        transaction.on_commit(lambda: update_search_index(recipe_ids))
+
+
+def remove_from_search_index(recipe_ids: object) -> None:
+    """Удалить поисковые документы рецептов.
+
+        ------
+        Параметры:
+            recipe_ids - список id рецептов или queryset с полем id
+    """
+    if not _is_supported():
+        return
+    if hasattr(recipe_ids, 'query'):
+        subquery, params = recipe_ids.query.sql_with_params()
+    else:
+        params = list(recipe_ids)
+        if not params:
+            return
+        subquery = ', '.join(['%s'] * len(params))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} '
+            f'WHERE {_get_key_column()} IN ({subquery})',
+            params
+        )
+
+
+def search_recipes(queryset: object, value: str) -> object:
+    """Отфильтровать рецепты по поисковой строке и упорядочить по
+    релевантности.
+
+    Рецептам добавляется поле search_rank: чем оно больше, тем лучше
+    рецепт соответствует запросу. Строка без слов не фильтрует рецепты.
+
+    Таблица индекса присоединяется к рецептам через extra(): ранг,
+    посчитанный коррелированным подзапросом, заново читал бы из индекса
+    все совпадения для каждого найденного рецепта.
+    """
+    query = build_search_query(value)
+    if query is None:
+        return queryset
+    if not _is_supported():
+        return queryset.filter(Q(name__icontains=value)
+                               | Q(text__icontains=value))
+    recipe_id = f'{Recipe._meta.db_table}.id'
+    if connection.vendor == 'postgresql':
+        where = (f'{SEARCH_TABLE}.recipe_id = {recipe_id}',
+                 f'{SEARCH_TABLE}.document @@ to_tsquery(%s, %s)')
+        rank = f'ts_rank({SEARCH_TABLE}.document, to_tsquery(%s, %s))'
+        params = rank_params = [SEARCH_CONFIG, query]
+    else:
+        where = (f'{SEARCH_TABLE}.rowid = {recipe_id}',
+                 f'{SEARCH_TABLE} MATCH %s')
+        rank = (f'-bm25({SEARCH_TABLE}, {NAME_WEIGHT}, '
+                f'{INGREDIENTS_WEIGHT}, {TEXT_WEIGHT})')
+        params, rank_params = [query], []
+    return (queryset
+            .extra(tables=[SEARCH_TABLE], where=where, params=params,
+                   select={'search_rank': rank}, select_params=rank_params)
+            .order_by('-search_rank', '-publication_date', '-id'))
+
+
+def build_search_query(value: str) -> Optional[str]:
+    """Поисковый запрос из строки пользователя.
+
+    Из строки берутся только слова, поэтому операторы языков запросов
+    FTS5 и tsquery в ней не действуют.
+
+        -----
+        Выходное значение
+            str или None, если в строке нет слов
+    """
+    terms = SEARCH_TERM.findall(value.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    if connection.vendor == 'postgresql':
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _is_supported() -> bool:
+    return connection.vendor in SUPPORTED_VENDORS
+
+
+def _get_key_column() -> str:
+    return 'recipe_id' if connection.vendor == 'postgresql' else 'rowid'
+
+
+def _get_insert_sql(vendor: str, where: str) -> str:
+    ingredients = (
+        f'SELECT {{aggregate}} '
+        f'FROM {IngredientsList._meta.db_table} item '
+        f'JOIN {Ingredient._meta.db_table} ingredient '
+        f'ON ingredient.id = item.ingredients_id '
+        f'WHERE item.recipe_id = recipe.id'
+    )
+    if vendor == 'postgresql':
+        ingredients = ingredients.format(
+            aggregate="string_agg(ingredient.name, ' ')"
+        )
+        return (
+            f'INSERT INTO {SEARCH_TABLE} (recipe_id, document) '
+            f'SELECT recipe.id, '
+            f"setweight(to_tsvector(%s, recipe.name), 'A') || "
+            f"setweight(to_tsvector(%s, coalesce(({ingredients}), '')), 'B')"
+            f" || setweight(to_tsvector(%s, recipe.text), 'C') "
+            f'FROM {Recipe._meta.db_table} recipe {where}'
+        )
+    ingredients = ingredients.format(
+        aggregate="group_concat(ingredient.name, ' ')"
+    )
+    return (
+        f'INSERT INTO {SEARCH_TABLE} (rowid, name, ingredients, text) '
+        f"SELECT recipe.id, recipe.name, coalesce(({ingredients}), ''), "
+        f'recipe.text '
+        f'FROM {Recipe._meta.db_table} recipe {where}'
+    )
+
+
+def _get_params(vendor: str) -> list:
+    return [SEARCH_CONFIG] * 3 if vendor == 'postgresql' else []
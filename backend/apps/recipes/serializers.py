@@ -1,20 +1,29 @@
 import datetime
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
-from rest_framework.generics import get_object_or_404
 
-from .models import IngredientsList, Recipe
+from .fields import ImageVariantsField
+from .models import (Favorite, IngredientsList, Recipe, ShoppingCart,
+                     ShoppingCartIngredient)
+from .search import SEARCH_FIELDS, schedule_search_index_update
+from .shopping_cart import change_recipe_in_totals
 from ingredients.models import Ingredient
 from ingredients.serializers import IngredientSerializer
 from tags.models import Tag
 from tags.serializers import TagSerializer
 from users.serializers import UserSerializer
-from utils.generalizing_functions import check_the_occurrence
+from utils.response_cache import bump_recipes
 
 User = get_user_model()
 
+# Верхняя граница PositiveSmallIntegerField.
+MAX_INGREDIENT_AMOUNT = 32767
+
 
 class IngredientsListSerializer(serializers.ModelSerializer):
     class Meta:
@@ -34,21 +43,41 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     publication_date = serializers.DateTimeField(write_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('favorites_count',)
 
     def get_is_favorited(self, obj):
-        print(obj)
-        return check_the_occurrence(obj,
-                                    'marked_recipes__fovorited_recipe',
-                                    self)
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        return self._is_marked(obj, Favorite)
 
     def get_is_in_shopping_cart(self, obj):
-        return check_the_occurrence(obj,
-                                    'marked_recipes__recipe_for_download',
-                                    self)
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        return self._is_marked(obj, ShoppingCart)
+
+    def _is_marked(self, recipe: object, model: object) -> bool:
+        """
+        Проверить отметку рецепта пользователем запроса.
+
+        Используется для рецептов без аннотаций is_favorited и
+        is_in_shopping_cart (см. RecipeViewSet._annotate_user_marks).
+        """
+        request = self.context.get('request')
+        if request is None or request.user.is_anonymous:
+            return False
+        return model.objects.filter(user=request.user, recipe=recipe).exists()
+
+
+class IngredientAmountSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField(
+        min_value=1,
+        max_value=MAX_INGREDIENT_AMOUNT,
+    )
 
 
 class CreateRecipeSerializer(serializers.ModelSerializer):
@@ -56,9 +85,7 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
     tags = serializers.ListField(
         child=serializers.IntegerField(),
     )
-    ingredients = serializers.ListField(
-        child=serializers.JSONField(),
-    )
+    ingredients = IngredientAmountSerializer(many=True)
     publication_date = serializers.DateTimeField(
         write_only=True,
         default=datetime.datetime.now()
@@ -66,81 +93,169 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        exclude = ('author',)
+        exclude = ('author', 'favorites_count', 'image_variants')
 
-    def validate_ingredients(self, value):
-        unique_ingredients = []
-        for data_ingredient in value:
+    def validate_tags(self, value):
+        """
+        Получить теги одним запросом.
 
-            ingredient = get_object_or_404(
-                Ingredient,
-                id=data_ingredient.get('id')
-            )
+        Ошибки возвращаются по позициям в списке, повторы тегов
+        отбрасываются.
+        """
+        tags = Tag.objects.in_bulk(value)
+        errors = {
+            index: [f'Тег с id {id_tag} не найден.']
+            for index, id_tag in enumerate(value)
+            if id_tag not in tags
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+        return [tags[id_tag] for id_tag in dict.fromkeys(value)]
 
-            if ingredient in unique_ingredients:
-                raise serializers.ValidationError(
+    def validate_ingredients(self, value):
+        """
+        Получить ингредиенты одним запросом.
+
+        Ошибки возвращаются списком по ингредиентам, как ошибки
+        вложенного сериализатора.
+        """
+        ingredients = Ingredient.objects.in_bulk(
+            {data_ingredient['id'] for data_ingredient in value}
+        )
+        result = []
+        errors = []
+        seen = set()
+        for data_ingredient in value:
+            ingredient = ingredients.get(data_ingredient['id'])
+            if ingredient is None:
+                errors.append({'id': [
+                    f'Ингредиент с id {data_ingredient["id"]} не найден.'
+                ]})
+            elif ingredient.pk in seen:
+                errors.append({'id': [
                     f'Дублируется {ingredient.name}, пожалуйста оставьте один'
                     ' ингредиент.'
-                )
-
-            unique_ingredients.append(ingredient)
-
-            if int(data_ingredient.get('amount')) <= 0:
-                raise serializers.ValidationError(
-                    'Вы велли не корректное значение ('
-                    f'{data_ingredient.get("amount")}) для {ingredient.name}'
-                )
-
-        return value
-
+                ]})
+            else:
+                errors.append({})
+                seen.add(ingredient.pk)
+                result.append({'object': ingredient,
+                               'amount': data_ingredient['amount']})
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return result
+
+    @transaction.atomic
     def create(self, validated_data):
-        tags = self._get_tags(validated_data)
-        ingredients = self._get_ingredients(validated_data)
+        tags = validated_data.pop('tags')
+        ingredients = validated_data.pop('ingredients')
 
         recipe = Recipe.objects.create(
             author=self.context['request'].user,
             **validated_data
         )
 
-        recipe.tags.add(*tags)
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe=recipe, tag=tag) for tag in tags
+        ])
 
         self._add_ingredients_to_recipe(recipe, ingredients)
 
+        # Новый рецепт ещё никто не добавил в избранное и корзину.
+        recipe.is_favorited = recipe.is_in_shopping_cart = False
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags = self._get_tags(validated_data)
-        ingredients = self._get_ingredients(validated_data)
-
-        instance.tags.clear()
-        instance.tags.add(*tags)
-
-        instance.ingredients.clear()
-        self._add_ingredients_to_recipe(instance, ingredients)
+        """
+        Изменить рецепт.
 
-        return super().update(instance, validated_data)
+        Изменяются только переданные поля. Теги и ингредиенты
+        сравниваются с текущими, и в базу записывается только разница,
+        поэтому повторное сохранение того же рецепта не трогает
+        связующие таблицы, а в итоги корзин и кеш ответов уходят только
+        фактические изменения.
+        """
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+
+        if tags is not None:
+            instance.tags.set(tags)
+        if (ingredients is not None
+                and self._update_recipe_ingredients(instance, ingredients)):
+            bump_recipes([instance.pk])
+            # Изменение названия или описания обновит документ при save.
+            if not SEARCH_FIELDS & validated_data.keys():
+                schedule_search_index_update([instance.pk])
+
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        if validated_data:
+            instance.save(update_fields=validated_data.keys())
+        return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'through_recipes',
+                queryset=IngredientsList.objects.select_related('ingredients')
+            ),
+        )
         serializer = RecipeSerializer(
             instance,
             context={'request': self.context.get('request')}
         )
         return serializer.data
 
-    def _get_tags(self, validated_data: dict) -> list:
-        """
-        Сформировать список тегов.
+    def _update_recipe_ingredients(self,
+                                   recipe: object,
+                                   ingredients: list) -> bool:
         """
-        return [get_object_or_404(Tag, pk=id_tag)
-                for id_tag in validated_data.pop('tags')]
+        Применить к рецепту разницу ингредиентов.
 
-    def _get_ingredients(self, validated_data: dict) -> list:
-        """
-        Сформировать список ингредиентов.
+        Новые ингредиенты добавляются одним INSERT, изменённые
+        количества - одним UPDATE, убранные ингредиенты удаляются одним
+        DELETE. Изменения количеств передаются в итоги корзин.
+
+            -----
+            Выходное значение
+                bool: изменились ли ингредиенты рецепта
         """
-        return [{'object': get_object_or_404(Ingredient, pk=ingredient['id']),
-                'amount': int(ingredient['amount'])}
-                for ingredient in validated_data.pop('ingredients')]
+        rows = {row.ingredients_id: row for row in recipe.through_recipes.all()}
+        old_amounts = {
+            ingredient: row.amount for ingredient, row in rows.items()
+        }
+        new_amounts = {
+            ingredient['object'].pk: ingredient['amount']
+            for ingredient in ingredients
+        }
+        if old_amounts == new_amounts:
+            return False
+
+        removed = old_amounts.keys() - new_amounts.keys()
+        if removed:
+            IngredientsList.objects.filter(
+                pk__in=[rows[ingredient].pk for ingredient in removed]
+            ).delete()
+
+        changed = []
+        for ingredient, row in rows.items():
+            amount = new_amounts.get(ingredient, row.amount)
+            if amount != row.amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            IngredientsList.objects.bulk_update(changed, ['amount'])
+
+        self._add_ingredients_to_recipe(recipe, [
+            ingredient for ingredient in ingredients
+            if ingredient['object'].pk not in rows
+        ])
+        change_recipe_in_totals(recipe.pk, old_amounts, new_amounts)
+        return True
 
     def _add_ingredients_to_recipe(self,
                                    recipe: object,
@@ -157,7 +272,62 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         ])
 
 
+class ShoppingCartIngredientSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='ingredient.id')
+    name = serializers.CharField(source='ingredient.name')
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = ShoppingCartIngredient
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
 class ShortRecipeSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+
+
+class RecipeMarksBatchSerializer(serializers.Serializer):
+    """
+    Пакетное изменение избранного или корзины покупок.
+
+    Повторы id в списке отбрасываются, один рецепт нельзя одновременно
+    добавить и удалить.
+    """
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=settings.RECIPE_MARKS_BATCH_MAX,
+        required=False,
+        default=list,
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=settings.RECIPE_MARKS_BATCH_MAX,
+        required=False,
+        default=list,
+    )
+
+    def validate_add(self, value):
+        return list(dict.fromkeys(value))
+
+    def validate_remove(self, value):
+        return list(dict.fromkeys(value))
+
+    def validate(self, data):
+        if not data['add'] and not data['remove']:
+            raise serializers.ValidationError(
+                settings.ERROR_MESSAGE.get('empty_marks_batch')
+            )
+        conflicting = set(data['add']) & set(data['remove'])
+        if conflicting:
+            raise serializers.ValidationError(
+                settings.ERROR_MESSAGE.get('conflicting_marks_batch').format(
+                    ids=', '.join(map(str, sorted(conflicting)))
+                )
+            )
+        return data
@@ -0,0 +1,241 @@
+"""Итоги корзины покупок.
+
+Суммы ингредиентов по всем рецептам корзины хранятся в таблице
+ShoppingCartIngredient и поддерживаются изменениями (дельтами):
+    - добавление/удаление рецепта из корзины прибавляет/вычитает
+      ингредиенты рецепта из итогов пользователя;
+    - редактирование ингредиентов рецепта применяет разницу к итогам
+      всех пользователей, у которых рецепт лежит в корзине;
+    - удаление рецептов вычитает их из всех корзин, в которых они лежат.
+Каждое изменение выполняется постоянным числом запросов независимо от
+количества пользователей и ингредиентов. Полный пересчёт из корзин
+выполняет rebuild_shopping_cart_totals.
+"""
+from typing import Dict, Iterable
+
+from django.db import transaction
+from django.db.models import (Case, F, IntegerField, OuterRef, Subquery, Sum,
+                              Value, When)
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import IngredientsList, ShoppingCart, ShoppingCartIngredient
+
+
+def get_shopping_cart_totals(user: object) -> object:
+    """Получить итоги корзины пользователя.
+
+    Итоги хранятся уже просуммированными (ShoppingCartIngredient),
+    поэтому запрос читает по одной строке на ингредиент.
+    """
+    return (user.shopping_cart_ingredients
+            .select_related('ingredient')
+            .order_by('ingredient__name'))
+
+
+def get_ingredient_list(user: object) -> Dict[str, int]:
+    """Получить список ингредиентов.
+
+        Сформировывает словарь из ингредиентов всех рецептов корзины
+        вида:
+            имя (единица измерения): колличество
+        -----
+        Note:
+            Одинаковые ингредиенты складываются и хранятся ввиде
+            суммы под одним ключем.
+        -----
+        Параметры:
+            user: object - владелец корзины
+        -----
+        выходное значение
+            dict: словарь ингредиентов ввида:
+                имя (единица измерения): колличество
+    """
+    ingredients = {}
+    for total in get_shopping_cart_totals(user):
+        key = (f'{total.ingredient.name} '
+               f'({total.ingredient.measurement_unit})')
+        ingredients[key] = ingredients.get(key, 0) + total.amount
+    return ingredients
+
+
+def get_recipe_ingredient_amounts(recipe_ids: Iterable[int]) -> Dict[int, int]:
+    """Получить суммарное количество ингредиентов в рецептах.
+
+        -----
+        Выходное значение
+            dict: {id ингредиента: количество}
+    """
+    return dict(
+        IngredientsList.objects
+        .filter(recipe__in=recipe_ids)
+        .order_by()
+        .values_list('ingredients')
+        .annotate(total=Sum('amount'))
+        .values_list('ingredients', 'total')
+    )
+
+
+def add_recipes_to_totals(user_ids: Iterable[int],
+                          recipe_ids: Iterable[int]) -> None:
+    """Прибавить ингредиенты рецептов к итогам корзин пользователей."""
+    apply_deltas(user_ids, get_recipe_ingredient_amounts(recipe_ids))
+
+
+def remove_recipes_from_totals(user_ids: Iterable[int],
+                               recipe_ids: Iterable[int]) -> None:
+    """Вычесть ингредиенты рецептов из итогов корзин пользователей."""
+    apply_deltas(user_ids, {
+        ingredient: -amount for ingredient, amount in
+        get_recipe_ingredient_amounts(recipe_ids).items()
+    })
+
+
+def remove_recipes_from_all_totals(recipe_ids: Iterable[int]) -> None:
+    """Вычесть рецепты из итогов всех корзин, в которых они лежат.
+
+    Вычитаемое количество считается коррелированным подзапросом для
+    каждой строки итогов, поэтому изменение выполняется одним UPDATE
+    независимо от числа рецептов и корзин. Вызывается до удаления
+    рецептов, пока корзины ещё ссылаются на них.
+
+        ------
+        Параметры:
+            recipe_ids: список id рецептов или подзапрос .values('id')
+    """
+    removed_amount = (
+        IngredientsList.objects
+        .filter(recipe__in=recipe_ids,
+                recipe__shopping_cart__user=OuterRef('user'),
+                ingredients=OuterRef('ingredient'))
+        .order_by()
+        .values('ingredients')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    totals = ShoppingCartIngredient.objects.filter(
+        user__in=(ShoppingCart.objects
+                  .filter(recipe__in=recipe_ids)
+                  .values('user')),
+        ingredient__in=(IngredientsList.objects
+                        .filter(recipe__in=recipe_ids)
+                        .values('ingredients')),
+    )
+
+    with transaction.atomic(savepoint=False):
+        totals.update(amount=Greatest(
+            F('amount') - Coalesce(Subquery(removed_amount), Value(0)),
+            Value(0),
+            output_field=IntegerField(),
+        ))
+        totals.filter(amount=0).delete()
+
+
+def change_recipe_in_totals(recipe_id: int,
+                            old_amounts: Dict[int, int],
+                            new_amounts: Dict[int, int]) -> None:
+    """Применить изменение ингредиентов рецепта к итогам корзин.
+
+        ------
+        Параметры:
+            recipe_id: int - id изменённого рецепта
+            old_amounts: dict - ингредиенты рецепта до изменения
+            new_amounts: dict - ингредиенты рецепта после изменения
+    """
+    deltas = {
+        ingredient: new_amounts.get(ingredient, 0)
+        - old_amounts.get(ingredient, 0)
+        for ingredient in old_amounts.keys() | new_amounts.keys()
+    }
+    deltas = {
+        ingredient: delta for ingredient, delta in deltas.items() if delta
+    }
+    if deltas:
+        apply_deltas(_get_cart_owners(recipe_id), deltas)
+
+
+def apply_deltas(user_ids: Iterable[int], deltas: Dict[int, int]) -> None:
+    """Применить изменения количеств ингредиентов к итогам корзин.
+
+    Недостающие строки создаются одним INSERT, все изменения
+    применяются одним UPDATE, обнулившиеся строки удаляются одним DELETE.
+
+        ------
+        Параметры:
+            user_ids: список id пользователей
+            deltas: dict - {id ингредиента: изменение количества}
+    """
+    user_ids = list(user_ids)
+    if not user_ids or not deltas:
+        return
+
+    with transaction.atomic(savepoint=False):
+        ShoppingCartIngredient.objects.bulk_create(
+            [
+                ShoppingCartIngredient(user_id=user_id,
+                                       ingredient_id=ingredient_id)
+                for user_id in user_ids
+                for ingredient_id, delta in deltas.items() if delta > 0
+            ],
+            ignore_conflicts=True,
+        )
+
+        totals = ShoppingCartIngredient.objects.filter(
+            user__in=user_ids,
+            ingredient__in=deltas.keys(),
+        )
+        totals.update(amount=Greatest(
+            F('amount') + Case(
+                *(When(ingredient_id=ingredient_id, then=Value(delta))
+                  for ingredient_id, delta in deltas.items()),
+                default=Value(0),
+            ),
+            Value(0),
+            output_field=IntegerField(),
+        ))
+        totals.filter(amount=0).delete()
+
+
+def rebuild_shopping_cart_totals(user_ids: Iterable[int] = None) -> int:
+    """Пересчитать итоги корзин по содержимому корзин.
+
+        ------
+        Параметры:
+            user_ids: список id пользователей, по умолчанию - все
+        -----
+        Выходное значение
+            int: количество записанных строк итогов
+    """
+    carts = ShoppingCart.objects.filter(
+        recipe__through_recipes__isnull=False
+    )
+    totals = ShoppingCartIngredient.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        carts = carts.filter(user__in=user_ids)
+        totals = totals.filter(user__in=user_ids)
+
+    rows = (carts
+            .values_list('user', 'recipe__through_recipes__ingredients')
+            .annotate(total=Sum('recipe__through_recipes__amount'))
+            .order_by())
+
+    with transaction.atomic(savepoint=False):
+        totals.delete()
+        created = ShoppingCartIngredient.objects.bulk_create(
+            [
+                ShoppingCartIngredient(user_id=user_id,
+                                       ingredient_id=ingredient_id,
+                                       amount=amount)
+                for user_id, ingredient_id, amount in rows
+            ],
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def _get_cart_owners(recipe_id: int) -> list:
+    return list(
+        ShoppingCart.objects
+        .filter(recipe=recipe_id)
+        .values_list('user', flat=True)
+    )
@@ -0,0 +1,145 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from .counters import (Subscription, change_favorites_count,
+                       change_followers_count, change_recipes_count)
+from .images import needs_image_variants
+from .models import IngredientsList, Recipe
+from .search import (SEARCH_FIELDS, remove_from_search_index,
+                     schedule_search_index_update)
+from .shopping_cart import remove_recipes_from_all_totals
+from .tasks import schedule_image_variants
+from ingredients.models import Ingredient
+from utils.response_cache import AUTHOR_FIELDS, bump_authors, bump_recipes
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipes_count(instance, created, **kwargs):
+    """Увеличить User.recipes_count автора нового рецепта."""
+    if created:
+        change_recipes_count([instance.author_id], 1)
+
+
+@receiver(m2m_changed, sender=Subscription)
+def update_followers_count(instance, action, reverse, pk_set, **kwargs):
+    """Поддерживать User.followers_count при изменении подписок.
+
+    Прямая связь: instance - подписчик, pk_set - id авторов.
+    Обратная связь: instance - автор, pk_set - id подписчиков.
+    """
+    manager = instance.user_set if reverse else instance.subscriptions
+    _update_counter(instance, action, reverse, pk_set, manager,
+                    change_followers_count)
+
+
+def _update_counter(instance, action, reverse, pk_set, manager, change):
+    """Применить изменение связи к счётчику одним UPDATE.
+
+    При прямой связи счётчик ведётся у объектов из pk_set, при обратной -
+    у самого instance.
+    """
+    delta = {'post_add': 1, 'post_remove': -1}.get(action)
+    if delta and reverse:
+        change([instance.pk], delta * len(pk_set))
+    elif delta:
+        change(pk_set, delta)
+    elif action == 'pre_clear' and reverse:
+        change([instance.pk], -manager.count())
+    elif action == 'pre_clear':
+        change(manager.values('id'), -1)
+
+
+@receiver(pre_delete, sender=User)
+def remove_user_from_counters_and_totals(instance, **kwargs):
+    """Убрать удаляемого пользователя из счётчиков и итогов корзин.
+
+    Избранное и подписки пользователя удаляются каскадом без обновления
+    счётчиков, поэтому они вычитаются из счётчиков здесь.
+    """
+    change_favorites_count(instance.favorites.values('recipe'), -1)
+    change_followers_count(instance.subscriptions.values('id'), -1)
+    remove_recipes_from_all_totals(instance.recipes.values('id'))
+    remove_from_search_index(instance.recipes.values('id'))
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_recipe_image_variants(instance, update_fields, **kwargs):
+    """Создать варианты нового или заменённого изображения рецепта."""
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if needs_image_variants(instance):
+        schedule_image_variants(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_document(instance, update_fields, **kwargs):
+    """Обновить поисковый документ нового или изменённого рецепта."""
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        schedule_search_index_update([instance.pk])
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_search_documents(instance, created, **kwargs):
+    """Обновить поисковые документы рецептов с изменённым ингредиентом."""
+    if not created:
+        schedule_search_index_update(
+            IngredientsList.objects.filter(ingredients=instance)
+            .values_list('recipe', flat=True)
+        )
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def bump_recipe_version(instance, **kwargs):
+    """Сбросить кеш ответов рецепта при его изменении или удалении."""
+    bump_recipes([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=IngredientsList)
+def bump_recipe_relations_version(instance, action, reverse, pk_set, **kwargs):
+    """Сбросить кеш ответов рецептов при изменении их тегов и ингредиентов.
+
+    При обратной связи (изменение через тег или ингредиент) меняются
+    все рецепты, поэтому сбрасывается только кеш списка рецептов.
+    """
+    if action.startswith('post_'):
+        bump_recipes([] if reverse else [instance.pk])
+
+
+@receiver(m2m_changed, sender=IngredientsList)
+def update_recipe_ingredients_search_documents(instance, action, reverse,
+                                               pk_set, **kwargs):
+    """Обновить поисковые документы рецептов при изменении их
+    ингредиентов.
+
+    Прямая связь: instance - Recipe, pk_set - id ингредиентов.
+    Обратная связь: instance - Ingredient, pk_set - id рецептов.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        schedule_search_index_update([instance.pk])
+    elif pk_set:
+        schedule_search_index_update(pk_set)
+
+
+@receiver(post_save, sender=User)
+def bump_author_version(update_fields, created, **kwargs):
+    """Сбросить кеш ответов рецептов при изменении данных авторов.
+
+    Сохранения, не затрагивающие выводимые поля (например, last_login
+    при входе), кеш не сбрасывают.
+    """
+    if created:
+        return
+    if update_fields is None or AUTHOR_FIELDS & set(update_fields):
+        bump_authors()
+
+
+@receiver(post_delete, sender=User)
+def bump_deleted_author_version(**kwargs):
+    bump_authors()
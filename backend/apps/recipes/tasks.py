@@ -0,0 +1,36 @@
+"""Фоновые задачи рецептов (jobs.registry)."""
+from django.contrib.auth import get_user_model
+from django.core.files import File
+
+from .images import update_image_variants
+from .shopping_cart import get_ingredient_list
+from jobs.queue import enqueue
+from jobs.registry import task
+from utils.file_creators import create_ingredients_list_pdf
+
+User = get_user_model()
+
+SHOPPING_LIST_PDF = 'recipes.shopping_list_pdf'
+IMAGE_VARIANTS = 'recipes.image_variants'
+
+SHOPPING_LIST_FILENAME = 'product_list.pdf'
+
+
+@task(SHOPPING_LIST_PDF, concurrency=2)
+def create_shopping_list_pdf(job: object) -> dict:
+    """Сформировать pdf со списком покупок пользователя."""
+    ingredients = get_ingredient_list(User.objects.get(pk=job.user_id))
+    with create_ingredients_list_pdf(ingredients) as pdf:
+        job.result_file.save(SHOPPING_LIST_FILENAME, File(pdf), save=False)
+    return {'ingredients': len(ingredients)}
+
+
+@task(IMAGE_VARIANTS, concurrency=2)
+def create_recipe_image_variants(job: object) -> dict:
+    """Создать варианты изображения рецепта (recipes.images)."""
+    return {'created': update_image_variants(job.payload['recipe_id'])}
+
+
+def schedule_image_variants(recipe_id: int) -> None:
+    """Поставить в очередь создание вариантов изображения рецепта."""
+    enqueue(IMAGE_VARIANTS, {'recipe_id': recipe_id})
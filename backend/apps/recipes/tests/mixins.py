@@ -0,0 +1,38 @@
+"""Общие настройки тестов."""
+import tempfile
+
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'foodgram-tests',
+    }
+}
+
+
+class IsolatedStorageMixin:
+    """
+    Медиафайлы во временном каталоге, кеш в памяти процесса.
+
+    Файлы и кеш проекта тестами не затрагиваются.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls._media_root = tempfile.TemporaryDirectory()
+        cls._storage_settings = override_settings(
+            MEDIA_ROOT=cls._media_root.name, CACHES=TEST_CACHES,
+        )
+        cls._storage_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._storage_settings.disable()
+        cls._media_root.cleanup()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
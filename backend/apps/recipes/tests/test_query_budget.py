@@ -0,0 +1,363 @@
+"""Бюджет SQL запросов эндпоинтов API.
+
+Тесты наполняют базу синтетическими данными нескольких масштабов
+(utils.data_generators) и выполняют запросы ко всем маршрутам router_v1.
+Для каждого запроса проверяется точное количество SQL запросов на
+каждом масштабе, поэтому любая N+1 регрессия и рост количества
+запросов вместе с объёмом данных приводят к ошибке теста.
+
+Каждая пара (маршрут, HTTP метод) из router_v1 должна быть покрыта хотя
+бы одной проверкой из CHECKS. Проверки выполняются по порядку и зависят
+друг от друга (кеш ответов, повторное добавление отметок, удаление
+пользователей), поэтому каждый масштаб - один тест с subTest на
+проверку. Тесты выполняются без общей транзакции (TransactionTestCase):
+как и в работающем сервере, transaction.on_commit срабатывает сразу, а
+точки сохранения не добавляют запросов.
+
+Использование:
+    Команда запуска:
+        ./manage.py test recipes.tests.test_query_budget
+"""
+import json
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.test import Client, SimpleTestCase, TransactionTestCase
+from rest_framework.authtoken.models import Token
+
+from config.urls import router_v1
+from ingredients.models import Ingredient
+from jobs.queue import enqueue, run_job
+from recipes.models import Recipe
+from recipes.tasks import SHOPPING_LIST_PDF
+from recipes.tests.mixins import IsolatedStorageMixin
+from tags.models import Tag
+from utils.data_generators import (SCALES, USER_PASSWORD, DatasetScale,
+                                   generate_dataset)
+from utils.paginations import RecipeFeedPagination
+from utils.reference_data import INGREDIENTS, TAGS, get_etag, get_version
+
+User = get_user_model()
+
+NEW_PASSWORD = 'foodgram-new-password'
+MARKS_BATCH_SIZE = 10
+IMAGE = ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAf'
+         'FcSJAAAADUlEQVR42mP8z8DwHwAFBQIAX8jx0gAAAABJRU5ErkJggg==')
+
+Check = namedtuple(
+    'Check',
+    ('route', 'method', 'path', 'budget',
+     'user', 'payload', 'status', 'headers'),
+    defaults=('viewer', None, 200, None),
+)
+
+CHECKS = (
+    Check('api-root', 'get', '/', 0, user=None),
+
+    Check('tags_api-list', 'get', '/api/tags/', 1, user=None),
+    Check('tags_api-list', 'get', '/api/tags/', 0),
+    Check('tags_api-list', 'get', '/api/tags/', 0,
+          headers=(('If-None-Match', '{tags_etag}'),), status=304),
+    Check('tags_api-detail', 'get', '/api/tags/{tag}/', 1, user=None),
+
+    Check('ingredients_api-list', 'get', '/api/ingredients/', 1, user=None),
+    Check('ingredients_api-list', 'get', '/api/ingredients/', 0,
+          user=None),
+    Check('ingredients_api-list', 'get', '/api/ingredients/', 0,
+          headers=(('If-None-Match', '{ingredients_etag}'),), status=304),
+    Check('ingredients_api-list', 'get',
+          '/api/ingredients/?name={ingredient_prefix}', 1, user=None),
+    Check('ingredients_api-detail', 'get',
+          '/api/ingredients/{ingredient}/', 1, user=None),
+
+    Check('users_api-list', 'get', '/api/users/', 2, user=None),
+    Check('users_api-list', 'get', '/api/users/', 4),
+    Check('users_api-list', 'post', '/api/users/', 4, user=None,
+          payload='new_user', status=201),
+    Check('users_api-detail', 'get', '/api/users/{author}/', 3),
+    Check('users_api-me', 'get', '/api/users/me/', 2),
+    Check('users_api-list-subscriptions', 'get',
+          '/api/users/subscriptions/', 4),
+    Check('users_api-list-subscriptions', 'get',
+          '/api/users/subscriptions/?recipes_limit=2', 4),
+    Check('users_api-list-subscriptions', 'get',
+          '/api/users/subscriptions/?recipes_limit=-1', 1,
+          status=400),
+    Check('users_api-subscribe-on-user', 'post',
+          '/api/users/{author}/subscribe/', 10),
+    Check('users_api-subscribe-on-user', 'delete',
+          '/api/users/{author}/subscribe/', 6, status=204),
+
+    Check('users_api-detail', 'put', '/api/users/{disposable}/', 6,
+          user='disposable', payload='disposable_data'),
+    Check('users_api-detail', 'patch', '/api/users/{disposable}/', 6,
+          user='disposable', payload='disposable_data'),
+    Check('users_api-detail', 'delete', '/api/users/{disposable}/', 29,
+          user='disposable', payload='disposable_password', status=204),
+    Check('users_api-me', 'put', '/api/users/me/', 5,
+          user='other_disposable', payload='other_disposable_data'),
+    Check('users_api-me', 'patch', '/api/users/me/', 5,
+          user='other_disposable', payload='other_disposable_data'),
+    Check('users_api-set-password', 'post', '/api/users/set_password/', 2,
+          user='other_disposable', payload='new_password', status=204),
+    Check('users_api-me', 'delete', '/api/users/me/', 28,
+          user='other_disposable', payload='other_disposable_password',
+          status=204),
+
+    Check('recipes_api-list', 'get', '/api/recipes/', 4, user=None),
+    Check('recipes_api-list', 'get', '/api/recipes/', 0, user=None),
+    Check('recipes_api-list', 'get', '/api/recipes/', 6),
+    Check('recipes_api-list', 'get', '/api/recipes/?limit=50', 6),
+    Check('recipes_api-list', 'get', '/api/recipes/?page=2', 6),
+    Check('recipes_api-list', 'get', '/api/recipes/?cursor=', 5),
+    Check('recipes_api-list', 'get', '/api/recipes/?cursor={recipe_cursor}',
+          5),
+    Check('recipes_api-list', 'get',
+          '/api/recipes/?tags={tag_slug}&cursor={recipe_cursor}', 6),
+    Check('recipes_api-list', 'get', '/api/recipes/?author={author}', 7),
+    Check('recipes_api-list', 'get', '/api/recipes/?tags={tag_slug}', 6),
+    Check('recipes_api-list', 'get',
+          '/api/recipes/?tags={tag_slug}&tags={other_tag_slug}', 6),
+    Check('recipes_api-list', 'get',
+          '/api/recipes/?tags={tag_slug}&tags={other_tag_slug}'
+          '&tags_mode=all', 6),
+    Check('recipes_api-list', 'get', '/api/recipes/?search={search}', 4,
+          user=None),
+    Check('recipes_api-list', 'get', '/api/recipes/?search={search}', 6),
+    Check('recipes_api-list', 'get',
+          '/api/recipes/?search={search}&tags={tag_slug}', 6),
+    Check('recipes_api-list', 'get', '/api/recipes/?is_favorited=1', 6),
+    Check('recipes_api-list', 'get', '/api/recipes/?is_in_shopping_cart=1',
+          6),
+    Check('recipes_api-detail', 'get', '/api/recipes/{recipe}/', 3,
+          user=None),
+    Check('recipes_api-detail', 'get', '/api/recipes/{recipe}/', 0,
+          user=None),
+    Check('recipes_api-detail', 'get', '/api/recipes/{recipe}/', 5),
+    # Загрузка изображения ставит в очередь задачу создания его вариантов.
+    Check('recipes_api-list', 'post', '/api/recipes/', 14,
+          payload='recipe_data', status=201),
+    Check('recipes_api-detail', 'patch', '/api/recipes/{own_recipe}/', 27,
+          payload='recipe_data'),
+    Check('recipes_api-detail', 'put', '/api/recipes/{own_recipe}/', 17,
+          payload='recipe_data'),
+    Check('recipes_api-detail', 'patch', '/api/recipes/{own_recipe}/', 12,
+          payload='recipe_name_data'),
+    # Повторное добавление и удаление отметки отклоняются по числу
+    # строк, затронутых INSERT/DELETE, без отдельной проверки списка.
+    Check('recipes_api-mark-favorite-recipe', 'post',
+          '/api/recipes/{recipe}/favorite/', 5, status=201),
+    Check('recipes_api-mark-favorite-recipe', 'post',
+          '/api/recipes/{recipe}/favorite/', 4, status=400),
+    Check('recipes_api-mark-favorite-recipe', 'delete',
+          '/api/recipes/{recipe}/favorite/', 4, status=204),
+    Check('recipes_api-mark-favorite-recipe', 'delete',
+          '/api/recipes/{recipe}/favorite/', 4, status=400),
+    Check('recipes_api-mark-download-recipe', 'post',
+          '/api/recipes/{recipe}/shopping_cart/', 8, status=201),
+    Check('recipes_api-mark-download-recipe', 'post',
+          '/api/recipes/{recipe}/shopping_cart/', 4, status=400),
+    Check('recipes_api-mark-download-recipe', 'delete',
+          '/api/recipes/{recipe}/shopping_cart/', 6, status=204),
+    Check('recipes_api-mark-download-recipe', 'delete',
+          '/api/recipes/{recipe}/shopping_cart/', 4, status=400),
+    # Пакетное изменение списка стоит столько же запросов, сколько
+    # изменение одного рецепта, при любом размере пакета.
+    Check('recipes_api-batch-favorite', 'post',
+          '/api/recipes/favorite/batch/', 5, payload='marks_batch_add'),
+    Check('recipes_api-batch-favorite', 'post',
+          '/api/recipes/favorite/batch/', 5, payload='marks_batch_remove'),
+    Check('recipes_api-batch-shopping-cart', 'post',
+          '/api/recipes/shopping_cart/batch/', 8,
+          payload='marks_batch_add'),
+    Check('recipes_api-batch-shopping-cart', 'post',
+          '/api/recipes/shopping_cart/batch/', 7,
+          payload='marks_batch_remove'),
+    Check('recipes_api-download-shopping-cart', 'get',
+          '/api/recipes/download_shopping_cart/', 2),
+    # Выгрузка читает рецепты пачками по EXPORT_CHUNK_SIZE, поэтому на
+    # масштабах проверки все рецепты помещаются в одну пачку.
+    Check('recipes_api-export', 'get', '/api/recipes/export/', 7,
+          user='staff'),
+    Check('recipes_api-export', 'get', '/api/recipes/export/', 1,
+          status=403),
+    Check('recipes_api-download-shopping-cart', 'get',
+          '/api/recipes/download_shopping_cart/?async=1', 2, status=202),
+    Check('recipes_api-shopping-cart-totals', 'get',
+          '/api/recipes/shopping_cart_totals/', 2),
+    Check('recipes_api-detail', 'delete', '/api/recipes/{own_recipe}/', 15,
+          status=204),
+
+    Check('jobs_api-detail', 'get', '/api/jobs/{job}/', 2),
+    Check('jobs_api-result', 'get', '/api/jobs/{job}/result/', 2),
+    Check('jobs_api-result', 'get', '/api/jobs/{queued_job}/result/', 2,
+          status=400),
+)
+
+
+class RouteCoverageTest(SimpleTestCase):
+    def test_every_route_is_checked(self):
+        """
+        Каждый маршрут router_v1 покрыт проверкой.
+
+        HEAD обрабатывается тем же методом, что и GET (DRF добавляет его
+        в actions при первом запросе), и отдельно не проверяется.
+        """
+        checked = {(check.route, check.method) for check in CHECKS}
+        missing = set()
+        for url in router_v1.urls:
+            methods = getattr(url.callback, 'actions', None) or {'get': None}
+            for method in methods:
+                if method != 'head' and (url.name, method) not in checked:
+                    missing.add(f'{method.upper()} {url.name}')
+        self.assertFalse(missing, 'Нет проверок для маршрутов')
+
+
+class QueryBudgetMixin(IsolatedStorageMixin):
+    scale = None
+
+    def setUp(self):
+        super().setUp()
+        generate_dataset(self.scale)
+        self.context = self._build_context(self.scale)
+
+    def test_query_budget(self):
+        for check in CHECKS:
+            label = f'{check.method.upper()} {check.path}'
+            if check.user is None:
+                label += ' (anonymous)'
+            with self.subTest(label, route=check.route):
+                with self.assertNumQueries(check.budget):
+                    response = self._request(check)
+                self.assertEqual(response.status_code, check.status)
+
+    def _build_context(self, scale: DatasetScale) -> dict:
+        """Подобрать объекты, над которыми выполняются проверки."""
+        viewer, disposable, other_disposable = (
+            User.objects.order_by('id')[:3]
+        )
+        subscriptions = viewer.subscriptions.values_list('id', flat=True)
+        author = (User.objects.exclude(id__in=subscriptions)
+                  .exclude(id__in=(viewer.id, disposable.id,
+                                   other_disposable.id))
+                  .order_by('id').first())
+        recipe = (Recipe.objects
+                  .exclude(id__in=viewer.favorites.values('recipe'))
+                  .exclude(id__in=viewer.shopping_cart.values('recipe'))
+                  .exclude(author__in=(viewer, disposable, other_disposable))
+                  .order_by('id').first())
+        feed = Recipe.objects.order_by('-publication_date', '-id')
+        middle = feed[feed.count() // 2]
+        tag, other_tag = Tag.objects.order_by('id')[:2]
+        ingredients = Ingredient.objects.order_by('id')
+        job = enqueue(SHOPPING_LIST_PDF, user=viewer)
+        run_job(job)
+        batch = list(Recipe.objects
+                     .filter(author=author)
+                     .order_by('id')
+                     .values_list('id', flat=True)[:MARKS_BATCH_SIZE])
+
+        return {
+            'users': {
+                'viewer': self._get_token(viewer),
+                'disposable': self._get_token(disposable),
+                'other_disposable': self._get_token(other_disposable),
+                'staff': self._get_token(User.objects.create(
+                    email='staff@foodgram.test', username='staff',
+                    is_staff=True,
+                )),
+            },
+            'author': author.id,
+            'disposable': disposable.id,
+            'recipe': recipe.id,
+            'own_recipe': viewer.recipes.order_by('id').first().id,
+            'recipe_cursor': RecipeFeedPagination().encode_cursor(
+                middle.publication_date, middle.id
+            ),
+            'tag': tag.id,
+            'job': job.id,
+            'queued_job': enqueue(SHOPPING_LIST_PDF, user=viewer).id,
+            'tags_etag': get_etag(TAGS, get_version(TAGS), 'json'),
+            'ingredients_etag': get_etag(
+                INGREDIENTS, get_version(INGREDIENTS), 'json'
+            ),
+            'search': 'рецепт смешать',
+            'tag_slug': tag.slug,
+            'other_tag_slug': other_tag.slug,
+            'ingredient': ingredients[0].id,
+            'ingredient_prefix': ingredients[0].name[:4],
+            'new_user': {
+                'email': 'new-user@foodgram.test',
+                'username': 'new-user',
+                'first_name': 'Имя',
+                'last_name': 'Фамилия',
+                'password': USER_PASSWORD,
+            },
+            'disposable_data': self._get_user_data(disposable),
+            'disposable_password': {'current_password': USER_PASSWORD},
+            'other_disposable_data': self._get_user_data(other_disposable),
+            'new_password': {
+                'current_password': USER_PASSWORD,
+                'new_password': NEW_PASSWORD,
+            },
+            'other_disposable_password': {'current_password': NEW_PASSWORD},
+            'recipe_data': {
+                'name': 'Новый рецепт',
+                'text': 'Описание нового рецепта',
+                'cooking_time': 10,
+                'image': IMAGE,
+                'tags': [tag.id, other_tag.id],
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': 10}
+                    for ingredient in
+                    ingredients[:scale.ingredients_per_recipe]
+                ],
+            },
+            'recipe_name_data': {'name': 'Новое название рецепта'},
+            'marks_batch_add': {'add': batch},
+            'marks_batch_remove': {'remove': batch},
+        }
+
+    def _get_token(self, user: object) -> str:
+        token, _ = Token.objects.get_or_create(user=user)
+        return token.key
+
+    def _get_user_data(self, user: object) -> dict:
+        return {
+            'email': user.email,
+            'username': user.username,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+        }
+
+    def _request(self, check: Check) -> object:
+        """Выполнить запрос проверки, дочитав потоковый ответ."""
+        headers = {
+            'HTTP_' + header.upper().replace('-', '_'):
+                value.format(**self.context)
+            for header, value in check.headers or ()
+        }
+        if check.user is not None:
+            headers['HTTP_AUTHORIZATION'] = (
+                'Token ' + self.context['users'][check.user]
+            )
+        client = Client(**headers)
+        path = check.path.format(**self.context)
+        data = {}
+        if check.payload is not None:
+            data = {
+                'data': json.dumps(self.context[check.payload]),
+                'content_type': 'application/json',
+            }
+        response = getattr(client, check.method)(path, **data)
+        if hasattr(response, 'streaming_content'):
+            b''.join(response.streaming_content)
+        return response
+
+
+class SmallScaleQueryBudgetTest(QueryBudgetMixin, TransactionTestCase):
+    scale = SCALES['small']
+
+
+class LargeScaleQueryBudgetTest(QueryBudgetMixin, TransactionTestCase):
+    scale = SCALES['large']
@@ -0,0 +1,130 @@
+"""Выгрузка и загрузка рецептов (utils.data_exporters, utils.data_loaders).
+
+Рецепты синтетического набора данных вместе с рецептами с одинаковыми
+названиями (у одного автора и у разных авторов) выгружаются и
+загружаются обратно, после чего содержимое рецептов сравнивается с
+исходным.
+"""
+import json
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ingredients.models import Ingredient
+from recipes.models import IngredientsList, Recipe
+from recipes.tests.mixins import IsolatedStorageMixin
+from utils.data_exporters import export_recipes
+from utils.data_generators import SCALES, generate_dataset
+from utils.data_loaders import EXPORT_RECIPE, load_recipe_export
+
+User = get_user_model()
+
+# Меньше количества рецептов, чтобы выгрузка и загрузка шли несколькими
+# пачками.
+BATCH_SIZE = 7
+
+
+class RecipeExportTest(IsolatedStorageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(SCALES['small'])
+        cls.duplicate = cls._add_duplicate_names()
+        cls.original = _snapshot()
+        cls.records = [
+            json.loads(line)
+            for chunk in export_recipes(chunk_size=BATCH_SIZE)
+            for line in chunk.splitlines()
+        ]
+
+    @classmethod
+    def _add_duplicate_names(cls) -> Recipe:
+        """
+        Добавить рецепты с названием уже существующего рецепта.
+
+        Возвращает рецепт-дубликат того же автора.
+        """
+        recipe = Recipe.objects.order_by('id').first()
+        other_author = User.objects.exclude(id=recipe.author_id).first()
+        ingredients = Ingredient.objects.order_by('-id')[:2]
+        duplicates = []
+        for author, ingredient in zip((recipe.author, other_author),
+                                      ingredients):
+            duplicate = Recipe.objects.create(
+                author=author, name=recipe.name, text=recipe.text,
+                cooking_time=recipe.cooking_time, image=recipe.image,
+            )
+            duplicate.tags.set(recipe.tags.all())
+            IngredientsList.objects.create(recipe=duplicate,
+                                           ingredients=ingredient, amount=5)
+            duplicates.append(duplicate)
+        return duplicates[0]
+
+    def _load(self) -> tuple:
+        totals = load_recipe_export(self.records, batch_size=BATCH_SIZE)
+        return totals[EXPORT_RECIPE]
+
+    def test_reimport_into_source_database(self):
+        """Повторная загрузка в исходную базу не меняет рецепты."""
+        count = len(self.original)
+        self.assertEqual(self._load(), (count, 0, count))
+        self.assertEqual(_snapshot(), self.original)
+
+    def test_import_into_empty_database(self):
+        """В базе без рецептов рецепты создаются под id выгрузки."""
+        Recipe.objects.all().delete()
+        count = len(self.original)
+        self.assertEqual(self._load(), (count, count, 0))
+        self.assertEqual(_snapshot(), self.original)
+
+    def test_same_names_are_not_merged(self):
+        """Рецепты одного автора с одинаковым названием не сливаются."""
+        Recipe.objects.all().delete()
+        self._load()
+        name = self.duplicate.name
+        self.assertEqual(
+            Recipe.objects.filter(author=self.duplicate.author,
+                                  name=name).count(),
+            2,
+        )
+        self.assertEqual(_snapshot()[self.duplicate.id],
+                         self.original[self.duplicate.id])
+
+    def test_id_of_another_author(self):
+        """Чужой рецепт с id из выгрузки не изменяется."""
+        Recipe.objects.all().delete()
+        stranger = (User.objects.exclude(id=self.duplicate.author_id)
+                    .first())
+        Recipe.objects.create(id=self.duplicate.id, author=stranger,
+                              name=self.duplicate.name, text='чужой рецепт',
+                              cooking_time=1)
+        occupied = _snapshot()[self.duplicate.id]
+        count = len(self.original)
+
+        self.assertEqual(self._load(), (count, count, 0))
+        loaded = _snapshot()
+        self.assertEqual(loaded.pop(self.duplicate.id), occupied)
+        self.assertEqual(sorted(loaded.values()),
+                         sorted(self.original.values()))
+
+
+def _snapshot() -> dict:
+    """Содержимое рецептов: {id: (автор, поля, теги, ингредиенты)}."""
+    tags = defaultdict(list)
+    for recipe_id, slug in Recipe.tags.through.objects.values_list(
+            'recipe', 'tag__slug'):
+        tags[recipe_id].append(slug)
+    ingredients = defaultdict(list)
+    for recipe_id, *item in IngredientsList.objects.values_list(
+            'recipe', 'ingredients__name', 'ingredients__measurement_unit',
+            'amount'):
+        ingredients[recipe_id].append(tuple(item))
+    return {
+        recipe_id: (*fields, publication_date.isoformat(),
+                    tuple(sorted(tags[recipe_id])),
+                    tuple(sorted(ingredients[recipe_id])))
+        for recipe_id, publication_date, *fields in Recipe.objects.values_list(
+            'id', 'publication_date', 'author__email', 'name', 'text',
+            'cooking_time', 'image',
+        )
+    }
@@ -0,0 +1,82 @@
+"""Поиск рецептов и пагинация ленты (recipes.search, utils.paginations).
+
+Рецепт с поисковым словом в названии опубликован раньше рецептов, в
+которых это слово встречается только в описании, поэтому порядок по
+релевантности отличается от порядка по дате публикации. Курсорная
+пагинация упорядочивает по дате публикации, и вместе с поиском она
+отклоняется, а не переупорядочивает результаты поиска.
+"""
+import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from recipes.search import rebuild_search_index
+from recipes.tests.mixins import IsolatedStorageMixin
+
+User = get_user_model()
+
+SEARCH = 'борщ'
+
+
+class RecipeSearchPaginationTest(IsolatedStorageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Рецептов', password='password',
+        )
+        now = timezone.now()
+        recipes = (
+            ('Борщ', 'Сварить свёклу'),
+            ('Суп', 'Как борщ, но без свёклы'),
+            ('Щи', 'Почти борщ'),
+            ('Каша', 'Сварить крупу'),
+        )
+        cls.recipes = []
+        for days, (name, text) in enumerate(reversed(recipes)):
+            recipe = Recipe.objects.create(author=author, name=name,
+                                           text=text, cooking_time=10)
+            Recipe.objects.filter(id=recipe.id).update(
+                publication_date=now - datetime.timedelta(days=days)
+            )
+            cls.recipes.insert(0, recipe)
+        rebuild_search_index()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def _ids(self, query: str) -> list:
+        response = self.client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_search_is_ranked_by_relevance(self):
+        """Рецепт с совпадением в названии выводится первым."""
+        name_match, *text_matches, _ = self.recipes
+        self.assertEqual(
+            self._ids(f'search={SEARCH}'),
+            [name_match.id, *(recipe.id for recipe in reversed(text_matches))],
+        )
+
+    def test_cursor_with_search_is_rejected(self):
+        """С параметром cursor поиск не переупорядочивается по дате."""
+        ranked = self._ids(f'search={SEARCH}')
+        for cursor in ('', 'MjAyMi0wMS0wMVQwMDowMDowMHwx'):
+            response = self.client.get(
+                f'/api/recipes/?search={SEARCH}&cursor={cursor}'
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'],
+                             settings.ERROR_MESSAGE['cursor_with_ordering'])
+        self.assertEqual(self._ids(f'search={SEARCH}'), ranked)
+
+    def test_cursor_without_search(self):
+        """Без поиска cursor выводит ленту по дате публикации."""
+        self.assertEqual(self._ids('cursor='),
+                         [recipe.id for recipe in reversed(self.recipes)])
@@ -1,160 +1,264 @@
 from django.conf import settings
-from django.db.models import Sum
-from django.http import FileResponse
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Value
+from django.http import FileResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 
-from .models import MarkedUserRecipe, Recipe
-from .serializers import (CreateRecipeSerializer, RecipeSerializer,
+from .counters import change_recipes_count
+from .marks import (add_to_favorites, add_to_shopping_cart, change_favorites,
+                    change_shopping_cart, remove_from_favorites,
+                    remove_from_shopping_cart)
+from .models import Favorite, IngredientsList, Recipe, ShoppingCart
+from .row_serializers import ROW_FIELDS, RecipeRowSerializer
+from .search import remove_from_search_index
+from .serializers import (CreateRecipeSerializer, RecipeMarksBatchSerializer,
+                          RecipeSerializer, ShoppingCartIngredientSerializer,
                           ShortRecipeSerializer)
+from .shopping_cart import (get_ingredient_list, get_shopping_cart_totals,
+                            remove_recipes_from_all_totals)
+from .tasks import SHOPPING_LIST_FILENAME, SHOPPING_LIST_PDF
+from jobs.queue import enqueue
+from jobs.serializers import JobSerializer
+from utils.data_exporters import (EXPORT_CONTENT_TYPE, EXPORT_FILENAME,
+                                  export_recipes)
 from utils.file_creators import create_ingredients_list_pdf
 from utils.filters import RecipeFilterSet
-from utils.generalizing_functions import (check_the_occurrence,
-                                          send_bad_request_response)
+from utils.generalizing_functions import send_bad_request_response
+from utils.mixins import AnonymousResponseCacheMixin, ServerTimingMixin
+from utils.paginations import RecipeFeedPagination
 from utils.permissions import IsOwnerOrReadOnly
+from utils.response_cache import RECIPES_FEED, get_recipe_version_name
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ServerTimingMixin, AnonymousResponseCacheMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilterSet
+    pagination_class = RecipeFeedPagination
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    lookup_value_regex = r'\d+'
+    anonymous_cache_query_params = (
+        'page', 'limit', 'cursor', 'author', 'tags', 'tags_mode',
+        'is_favorited', 'is_in_shopping_cart', 'search',
+    )
+
+    def get_response_version_names(self) -> tuple:
+        if self.action == 'retrieve':
+            return (get_recipe_version_name(self.kwargs['pk']),)
+        return (RECIPES_FEED,)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = self._annotate_user_marks(queryset)
+            if not self._serializes_rows():
+                queryset = self._prefetch_related_data(queryset)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self._serializes_rows():
+            queryset = queryset.values_list(*ROW_FIELDS, named=True)
+        return queryset
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        remove_recipes_from_all_totals([instance.pk])
+        remove_from_search_index([instance.pk])
+        change_recipes_count([instance.author_id], -1)
+        super().perform_destroy(instance)
 
     def get_serializer_class(self):
         if (self.action == 'create'
                 or self.action == 'update' or self.action == 'partial_update'):
             return CreateRecipeSerializer
+        if self._serializes_rows():
+            return RecipeRowSerializer
         return super().get_serializer_class()
 
+    def _serializes_rows(self) -> bool:
+        """
+        Сериализуются ли рецепты по строкам (recipes.row_serializers).
+
+        Только при чтении ленты и рецепта в JSON: browsable API строит
+        формы редактирования по объекту рецепта и RecipeSerializer.
+        """
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return (self.action in ('list', 'retrieve')
+                and self.request.method in ('GET', 'HEAD')
+                and not isinstance(renderer, BrowsableAPIRenderer))
+
     @action(detail=True, serializer_class=ShortRecipeSerializer,
             methods=['post'],
             url_path='favorite', permission_classes=[IsAuthenticated])
-    def mark_favorite_recipe(self, request, id=None, *args, **kwargs):
-        return self._mark_recipes(request, id=None, *args, **kwargs)
+    def mark_favorite_recipe(self, request, *args, **kwargs):
+        return self._mark_recipe(add_to_favorites, 'alredy_favorited')
 
     @mark_favorite_recipe.mapping.delete
-    def delete_favorite_recipe(self, request, id=None, *args, **kwargs):
-        return self._delete_mark_recipes(request, id=None, *args, **kwargs)
+    def delete_favorite_recipe(self, request, *args, **kwargs):
+        return self._unmark_recipe(remove_from_favorites, 'not_in_favorited')
 
     @action(detail=True, serializer_class=ShortRecipeSerializer,
             methods=['post'],
             url_path='shopping_cart', permission_classes=[IsAuthenticated])
-    def mark_download_recipe(self, request, id=None, *args, **kwargs):
-        return self._mark_recipes(request, id=None, *args, **kwargs)
+    def mark_download_recipe(self, request, *args, **kwargs):
+        return self._mark_recipe(add_to_shopping_cart, 'alredy_in_cart')
 
     @mark_download_recipe.mapping.delete
-    def delete_download_recipe(self, request, id=None, *args, **kwargs):
-        return self._delete_mark_recipes(request, id=None, *args, **kwargs)
+    def delete_download_recipe(self, request, *args, **kwargs):
+        return self._unmark_recipe(remove_from_shopping_cart, 'not_in_cart')
 
-    def _mark_recipes(self, request, id=None, *args, **kwargs):
-        """
-        Добавить рецепт в список избранного/список загрузок
+    @action(detail=False, serializer_class=RecipeMarksBatchSerializer,
+            methods=['post'], url_path='favorite/batch',
+            permission_classes=[IsAuthenticated])
+    def batch_favorite(self, request, *args, **kwargs):
+        return self._change_marks(change_favorites)
+
+    @action(detail=False, serializer_class=RecipeMarksBatchSerializer,
+            methods=['post'], url_path='shopping_cart/batch',
+            permission_classes=[IsAuthenticated])
+    def batch_shopping_cart(self, request, *args, **kwargs):
+        return self._change_marks(change_shopping_cart)
 
-        Добавляет в нужный список выбранный рецеп, следит за наличием
-        данного рецепта, в случае наличия отсылает соответсвующий ответ.
+    def _prefetch_related_data(self, queryset: object) -> object:
         """
-        marked_recipes, _ = MarkedUserRecipe.objects.get_or_create(
-                                                            user=request.user
-                                                        )
-        recipe = self.get_object()
+        Подгрузить связанные с рецептами данные.
 
-        if request.resolver_match.url_name == 'recipes_api-mark-favorite-recipe':
-            if check_the_occurrence(recipe,
-                                    'fovorited_recipe',
-                                    marked_recipes):
+        Автор загружается через JOIN, теги и ингредиенты (вместе с
+        самими объектами Ingredient) - отдельными запросами на всю
+        страницу, поэтому количество запросов не зависит от числа
+        рецептов и ингредиентов в них.
+        """
+        return queryset.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'through_recipes',
+                queryset=IngredientsList.objects.select_related('ingredients')
+            ),
+        )
 
-                return send_bad_request_response(
-                    settings.ERROR_MESSAGE.get('alredy_favorited')
-                )
+    def _annotate_user_marks(self, queryset: object) -> object:
+        """
+        Добавить к рецептам отметки пользователя.
 
-            marked_recipes.fovorited_recipe.add(recipe)
-        else:
-            if check_the_occurrence(recipe,
-                                    'recipe_for_download',
-                                    marked_recipes):
+        Аннотирует queryset полями is_favorited и is_in_shopping_cart
+        через EXISTS подзапросы, чтобы не проверять каждый рецепт
+        отдельным запросом при сериализации.
+        """
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
 
-                return send_bad_request_response(
-                    settings.ERROR_MESSAGE.get('alredy_in_cart')
-                )
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
 
-            marked_recipes.recipe_for_download.add(recipe)
+    def _mark_recipe(self, add: callable, error: str) -> object:
+        """
+        Добавить рецепт в список избранного/список загрузок
 
+        Рецепт добавляется функцией add (recipes.marks) одним INSERT,
+        если рецепт уже в списке, отсылается ответ с ошибкой error.
+        """
+        recipe = self.get_object()
+        if not add(self.request.user.id, recipe.id):
+            return send_bad_request_response(
+                settings.ERROR_MESSAGE.get(error)
+            )
         serializer = self.get_serializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def _delete_mark_recipes(self, request, id=None, *args, **kwargs):
+    def _unmark_recipe(self, remove: callable, error: str) -> object:
         """
         Удалить рецепт из списка избранного/списка загрузок
 
-        Удаляет из нужнгого списка выбранный рецеп, следит за наличием
-        данного рецепта, в случае отсутствия отсылает соответсвующий ответ.
+        Рецепт удаляется функцией remove (recipes.marks) одним DELETE.
+        Если удалять нечего, рецепт загружается, чтобы отличить
+        несуществующий рецепт (404) от рецепта не из списка (ответ с
+        ошибкой error).
         """
-        marked_recipes, _ = MarkedUserRecipe.objects.get_or_create(
-                                                            user=request.user
-                                                        )
-        recipe = self.get_object()
-
-        if request.resolver_match.url_name == 'recipes_api-mark-favorite-recipe':
-            if not check_the_occurrence(recipe,
-                                        'fovorited_recipe',
-                                        marked_recipes):
+        if remove(self.request.user.id, self.kwargs[self.lookup_field]):
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        self.get_object()
+        return send_bad_request_response(settings.ERROR_MESSAGE.get(error))
 
-                return send_bad_request_response(
-                    settings.ERROR_MESSAGE.get('not_in_favorited')
-                )
-            marked_recipes.fovorited_recipe.remove(recipe.id)
-        else:
-            if not check_the_occurrence(recipe,
-                                        'recipe_for_download',
-                                        marked_recipes):
-
-                return send_bad_request_response(
-                    settings.ERROR_MESSAGE.get('not_in_cart')
-                )
-
-            marked_recipes.recipe_for_download.remove(recipe.id)
+    def _change_marks(self, change: callable) -> object:
+        """
+        Добавить и удалить несколько рецептов избранного/списка загрузок
 
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        Список меняется функцией change (recipes.marks) в одной
+        транзакции, ответ содержит результат для каждого рецепта:
+        added, already_present, removed, not_present или not_found.
+        """
+        serializer = self.get_serializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        results = change(self.request.user.id,
+                         serializer.validated_data['add'],
+                         serializer.validated_data['remove'])
+        return Response({'results': [
+            {'id': recipe_id, 'result': result}
+            for recipe_id, result in results.items()
+        ]})
 
     @action(detail=False, url_path='download_shopping_cart',
             permission_classes=[IsAuthenticated])
     def download_shopping_cart(self, request, *args, **kwargs):
-        shopping_cart = request.user.marked_recipes.recipe_for_download.all()
-        ingredients = self._get_ingredient_list(shopping_cart)
+        """
+        Скачать список покупок в pdf.
+
+        С параметром async=1 файл формируется фоновой задачей: ответ 202
+        содержит задачу, статус которой опрашивается по url, а готовый
+        файл скачивается по result_url.
+        """
+        if request.query_params.get('async') in ('1', 'true'):
+            job = enqueue(SHOPPING_LIST_PDF, user=request.user)
+            serializer = JobSerializer(job, context={'request': request})
+            return Response(serializer.data,
+                            status=status.HTTP_202_ACCEPTED,
+                            headers={'Location': serializer.data['url']})
+        ingredients = get_ingredient_list(request.user)
         return self._send_file_response(ingredients)
 
-    def _get_ingredient_list(self, shopping_cart: list) -> dict:
-        """Получить список ингредиентов.
-
-            Сформировывает словарь из ингредиентов всех рецептов вида:
-                имя (единица измерения): колличество
-            -----
-            Note:
-                Одинаковые ингредиенты складываются и хранятся ввиде
-                суммы под одним ключем.
-            -----
-            Параметры:
-                shopping_cart: list - список обьектов Recipe
-            -----
-            выходное значение
-                dict: словарь ингредиентов ввида:
-                    имя (единица измерения): колличество
-        """
-
-        return {
-            f'{ingredient} ({measurement_unit})': amount
-                for ingredient, measurement_unit, amount in
-                    (Recipe.ingredients.through.objects
-                        .filter(recipe__in=shopping_cart)
-                        .values_list('ingredients__name',
-                                     'ingredients__measurement_unit')
-                        .annotate(count_ingredient=Sum('amount')))
-        }
+    @action(detail=False, url_path='shopping_cart_totals',
+            serializer_class=ShoppingCartIngredientSerializer,
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_totals(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            get_shopping_cart_totals(request.user),
+            many=True
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, url_path='export', permission_classes=[IsAdminUser])
+    def export(self, request, *args, **kwargs):
+        """
+        Выгрузить все рецепты в NDJSON (только для персонала).
+
+        Ответ формируется потоково (utils.data_exporters) и
+        загружается командой import_recipes.
+        """
+        response = StreamingHttpResponse(export_recipes(),
+                                         content_type=EXPORT_CONTENT_TYPE)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{EXPORT_FILENAME}"'
+        )
+        return response
 
     def _send_file_response(self, ingredients: dict) -> object:
         """
@@ -174,5 +278,5 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return FileResponse(
             file_with_ingredients,
             as_attachment=True,
-            filename='product_list.pdf'
+            filename=SHOPPING_LIST_FILENAME
         )
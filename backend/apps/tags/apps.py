@@ -5,3 +5,6 @@ class TagsConfig(AppConfig):
     name = 'tags'
     verbose_name = 'Тег'
     verbose_name_plural = 'Теги'
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Tag
+from utils.reference_data import TAGS, bump_version
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tags_version(**kwargs) -> None:
+    bump_version(TAGS)
@@ -0,0 +1,43 @@
+"""Соответствие slug тегов их id в памяти процесса.
+
+Фильтр рецептов по тегам получает slug, а рецепты связаны с тегами по
+id. Тегов немного и они почти не меняются, поэтому соответствие один
+раз загружается из базы данных и не запрашивается на каждый запрос
+ленты. Как и индекс поиска ингредиентов (ingredients.search), оно
+помнит версию справочника тегов (utils.reference_data) и лениво
+загружается заново после её изменения, в том числе в другом процессе.
+"""
+import threading
+from typing import Dict, Iterable
+
+from .models import Tag
+from utils.reference_data import TAGS, get_version
+
+
+class TagSlugMap:
+    """Соответствие slug тега его id."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids = None
+
+    def get_ids(self, slugs: Iterable[str]) -> Dict[str, int]:
+        """Найти id тегов по slug.
+
+            -----
+            Выходное значение
+                dict: {slug: id} для существующих тегов
+        """
+        ids = self._get_ids()
+        return {slug: ids[slug] for slug in slugs if slug in ids}
+
+    def _get_ids(self) -> Dict[str, int]:
+        version = get_version(TAGS)
+        with self._lock:
+            if self._version != version:
+                self._ids = dict(Tag.objects.values_list('slug', 'id'))
+                self._version = version
+            return self._ids
+
+
+tag_slug_map = TagSlugMap()
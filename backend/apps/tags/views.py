@@ -2,9 +2,13 @@ from rest_framework.viewsets import ReadOnlyModelViewSet
 
 from .models import Tag
 from .serializers import TagSerializer
+from utils.mixins import ReferenceDataConditionalGetMixin, ServerTimingMixin
+from utils.reference_data import TAGS
 
 
-class TagsViewSet(ReadOnlyModelViewSet):
+class TagsViewSet(ServerTimingMixin, ReferenceDataConditionalGetMixin,
+                  ReadOnlyModelViewSet):
+    reference_data = TAGS
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
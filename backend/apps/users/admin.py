@@ -11,7 +11,8 @@ User = get_user_model()
 class UserAdmin(BaseUserAdmin):
     form = UserChangeForm
     add_form = UserCreationForm
-    list_display = ('email', 'username', 'first_name',)
+    list_display = ('email', 'username', 'first_name',
+                    'recipes_count', 'followers_count',)
     list_filter = ('email', 'first_name',)
     fieldsets = (
         ('Регистрационные данные', {
@@ -15,6 +15,11 @@ class User(AbstractUser):
             Проверка формата производится внутри Dlango.
         subscribes(int):
             Ссылки на id связанных пользователей.
+        recipes_count(int):
+            Количество рецептов пользователя.
+        followers_count(int):
+            Количество подписчиков пользователя.
+            Счётчики поддерживаются recipes.counters.
     """
     first_name = models.CharField(
         max_length=50,
@@ -36,6 +41,16 @@ class User(AbstractUser):
         blank=True,
         verbose_name='Подписки пользователя'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [
@@ -5,6 +5,7 @@ from djoser.serializers import \
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from rest_framework import serializers
 
+from recipes.fields import ImageVariantsField
 from recipes.models import Recipe
 from utils.generalizing_functions import check_the_occurrence
 
@@ -31,33 +32,32 @@ class UserSerializer(DjoserUserSerializer):
         ) + tuple(User.REQUIRED_FIELDS) + ('is_subscribed',)
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return check_the_occurrence(obj, 'subscriptions', self)
 
 
-class LimitedListRecipieSerializer(serializers.ListSerializer):
-    def to_representation(self, data):
-        limit = self.context.get('request').query_params.get('recipes_limit')
-        if limit is None:
-            return super().to_representation(data)
-        return super().to_representation(data.all()[:int(limit)])
-
-
 class SubscribtionsRecipeSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
-        list_serializer_class = LimitedListRecipieSerializer
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class SubscribtionsUserSerializer(UserSerializer):
-    recipes = SubscribtionsRecipeSerializer(many=True)
-    recipes_count = serializers.SerializerMethodField()
+    """
+    Автор из подписок пользователя с его последними рецептами.
+
+    Ожидает авторов, подготовленных UserViewSet._annotate_subscriptions:
+    latest_recipes - уже ограниченный recipes_limit список рецептов,
+    recipes_count - счётчик всех рецептов автора (User.recipes_count).
+    """
+    recipes = SubscribtionsRecipeSerializer(many=True, source='latest_recipes')
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + (
             'recipes',
             'recipes_count',
         )
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
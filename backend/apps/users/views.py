@@ -1,20 +1,24 @@
 from django.conf import settings as django_settings
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, Prefetch, Subquery
 from djoser.conf import settings
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from recipes.models import Recipe
 from utils.generalizing_functions import (check_the_occurrence,
                                           send_bad_request_response)
-from utils.mixins import DisableUslessDjoserActionMixin
+from utils.mixins import DisableUslessDjoserActionMixin, ServerTimingMixin
 
 User = get_user_model()
 
 
-class UserViewSet(DisableUslessDjoserActionMixin, DjoserUserViewSet):
+class UserViewSet(ServerTimingMixin, DisableUslessDjoserActionMixin,
+                  DjoserUserViewSet):
     def get_permissions(self):
         if self.action == 'retrieve':
             self.permission_classes = settings.PERMISSIONS.user_detail
@@ -28,9 +32,66 @@ class UserViewSet(DisableUslessDjoserActionMixin, DjoserUserViewSet):
 
     def get_queryset(self):
         if self.action == 'list_subscriptions':
-            return self.request.user.subscriptions.all()
+            return self._annotate_subscriptions(
+                self.request.user.subscriptions.all()
+            )
+        if self.action == 'subscribe_on_user':
+            return self._annotate_subscriptions(super().get_queryset())
         return super().get_queryset()
 
+    def _annotate_subscriptions(self, queryset: object) -> object:
+        """
+        Дополнить авторов данными для SubscribtionsUserSerializer.
+
+        Подписка считается в основном запросе, количество рецептов
+        хранится в User.recipes_count. Последние recipes_limit рецептов
+        всех авторов страницы загружаются одним запросом: для каждого
+        рецепта коррелированный подзапрос проверяет, что он входит в
+        первые recipes_limit рецептов своего автора. Подзапрос читает
+        recipes_limit строк индекса recipe_author_feed_idx, а не
+        сортирует все рецепты автора.
+        """
+        latest_recipes = (Recipe.objects
+                          .filter(author=OuterRef('author'))
+                          .order_by('-publication_date', '-id')
+                          .values('id')[:self._get_recipes_limit()])
+        subscriptions = User.subscriptions.through.objects.filter(
+            from_user=self.request.user,
+            to_user=OuterRef('pk'),
+        )
+        return (queryset
+                .annotate(is_subscribed=Exists(subscriptions))
+                .prefetch_related(Prefetch(
+                    'recipes',
+                    queryset=(Recipe.objects
+                              .filter(id__in=Subquery(latest_recipes))
+                              .order_by('-publication_date', '-id')),
+                    to_attr='latest_recipes',
+                ))
+                .order_by('id'))
+
+    def _get_recipes_limit(self) -> int:
+        """
+        Получить количество рецептов автора из параметра recipes_limit.
+
+        Значение ограничено settings.RECIPES_LIMIT_MAX, без параметра
+        выводится максимальное количество рецептов.
+        """
+        limit = self.request.query_params.get('recipes_limit')
+        if limit is None:
+            return django_settings.RECIPES_LIMIT_MAX
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = -1
+        if limit < 0:
+            raise ValidationError({
+                'errors': django_settings.ERROR_MESSAGE.get(
+                    'invalid_recipes_limit'
+                )
+            })
+        return min(limit, django_settings.RECIPES_LIMIT_MAX)
+
     @action(detail=False, url_path='subscriptions',
             permission_classes=[IsAuthenticated])
     def list_subscriptions(self, request, *args, **kwargs):
@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -26,9 +27,11 @@ INSTALLED_APPS = [
     'ingredients',
     'tags',
     'recipes',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'utils.server_timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -123,6 +126,68 @@ REST_FRAMEWORK = {
     'SEARCH_PARAM': 'name',
 }
 
+# Файловый кеш общий для всех процессов сервера, в нём хранятся версии
+# справочников и отрисованные ответы (utils.reference_data). Обработчик
+# фоновых задач (run_jobs) меняет версии данных, поэтому CACHE_LOCATION
+# у него и у сервера должен указывать на один каталог (в docker-compose -
+# общий том).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'foodgram_cache')
+        ),
+    }
+}
+
+# Замеры времени обработки запросов (utils.server_timing), время в
+# секундах.
+SERVER_TIMING = bool(int(os.environ.get('SERVER_TIMING') or 0))
+SERVER_TIMING_SLOW_REQUEST = float(
+    os.environ.get('SERVER_TIMING_SLOW_REQUEST') or 0.5
+)
+SERVER_TIMING_SLOW_SAMPLE_RATE = float(
+    os.environ.get('SERVER_TIMING_SLOW_SAMPLE_RATE') or 0.1
+)
+
+# Метрики запросов в формате Prometheus (utils.metrics), доступны по
+# /internal/metrics/ с заголовком Authorization: Bearer <METRICS_TOKEN>.
+METRICS = bool(int(os.environ.get('METRICS') or 0))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_DIR = (os.environ.get('METRICS_DIR')
+               or os.path.join(tempfile.gettempdir(), 'foodgram_metrics'))
+METRICS_FLUSH_INTERVAL = 1
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'utils.server_timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+RECIPES_LIMIT_MAX = 100
+# Наибольшее количество рецептов в пакетном изменении избранного или
+# корзины покупок.
+RECIPE_MARKS_BATCH_MAX = 100
+
+# Очередь фоновых задач (jobs.queue), время в секундах.
+JOBS_POLL_INTERVAL = 1
+JOBS_RETRY_DELAY = 10
+JOBS_RUNNING_TIMEOUT = 10 * 60
+JOBS_RESULT_TTL = 60 * 60
+JOBS_DB_ERROR_MAX_DELAY = 60
+
 ERROR_MESSAGE = {
     'alredy_favorited': 'Вы уже подписаны на этот рецепт',
     'alredy_in_cart': 'Рецепт уже есть в корзине',
@@ -135,4 +200,14 @@ ERROR_MESSAGE = {
                           'is_favorited одновременно'),
     'unique_query_params': ('Не возможно фильтровать по автору и одному из'
                             ' is_in_shopping_cart или is_favorited одновременно'),
+    'invalid_recipes_limit': ('recipes_limit должен быть целым '
+                              'неотрицательным числом'),
+    'job_result_not_ready': 'Результат задачи ещё не готов',
+    'unknown_tag': 'Тега {slug} не существует',
+    'empty_marks_batch': 'Укажите рецепты в add или remove',
+    'conflicting_marks_batch': ('Рецепты {ids} указаны и в add, '
+                                'и в remove'),
+    'cursor_with_ordering': ('Параметр cursor не совмещается с поиском: '
+                             'результаты поиска упорядочены по '
+                             'релевантности'),
 }
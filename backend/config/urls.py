@@ -5,19 +5,23 @@ from django.urls import include, path
 from rest_framework import routers
 
 from ingredients.views import IngredientsViewSet
+from jobs.views import JobViewSet
 from recipes.views import RecipeViewSet
 from tags.views import TagsViewSet
 from users.views import UserViewSet
+from utils.metrics import metrics_view
 
 router_v1 = routers.DefaultRouter()
 router_v1.register(r'api/tags', TagsViewSet, basename='tags_api')
 router_v1.register(r'api/users', UserViewSet, basename='users_api')
 router_v1.register(r'api/recipes', RecipeViewSet, basename='recipes_api')
 router_v1.register(r'api/ingredients', IngredientsViewSet, basename='ingredients_api')
+router_v1.register(r'api/jobs', JobViewSet, basename='jobs_api')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('djoser.urls.authtoken')),
+    path('internal/metrics/', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
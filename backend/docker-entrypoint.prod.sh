@@ -14,8 +14,11 @@ fi
 
 python manage.py makemigrations --noinput
 python manage.py migrate --noinput
+python manage.py copy_marked_recipes
 python manage.py collectstatic --no-input --clear
-python manage.py load_ingredients
+python manage.py load_data --ingredients ../data/ingredients.csv
+python manage.py reconcile_counters
+python manage.py generate_image_variants
 
 python -c "import django; django.setup(); \
     from django.contrib.auth.management.commands.createsuperuser import get_user_model; \
@@ -14,7 +14,10 @@ fi
 
 python manage.py makemigrations
 python manage.py migrate --noinput
-python manage.py load_ingredients
+python manage.py copy_marked_recipes
+python manage.py load_data --ingredients ../data/ingredients.csv
+python manage.py reconcile_counters
+python manage.py generate_image_variants
 
 python -c "import django; django.setup(); \
     from django.contrib.auth.management.commands.createsuperuser import get_user_model; \
@@ -0,0 +1,111 @@
+"""Вспомогательные функции для массовой записи в базу данных.
+
+На SQLite Django 3.2 не возвращает первичные ключи из bulk_create,
+поэтому идентификаторы для новых объектов выделяются заранее, а после
+записи последовательности PostgreSQL выравниваются по максимальному id.
+"""
+from typing import Iterable, List, Sequence, Tuple
+
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+
+
+def allocate_ids(model: object, count: int) -> range:
+    """Выделить count идентификаторов, следующих за максимальным в таблице.
+
+    Вызывать внутри транзакции, чтобы выделенные id не заняли
+    параллельные запросы.
+    """
+    last_id = model.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+    return range(last_id + 1, last_id + count + 1)
+
+
+def reset_sequences(*models: object) -> None:
+    """Выровнять последовательности первичных ключей после записи с явными id.
+    """
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if not statements:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def upsert(model: object,
+           objs: List[object],
+           key_fields: Sequence[str],
+           update_fields: Sequence[str] = (),
+           ids: Iterable[int] = None) -> Tuple[list, list]:
+    """Создать новые и обновить существующие объекты постоянным числом запросов.
+
+    Объекты сопоставляются с записями таблицы по key_fields: одна выборка
+    по всем полям ключа (только ключ и update_fields, чтобы у автора с
+    большим числом рецептов не загружались все его рецепты целиком),
+    затем bulk_create для новых объектов и
+    bulk_update изменившихся update_fields. Всем объектам из objs
+    проставляется pk найденной или созданной записи (если база данных
+    его возвращает или переданы ids), повторы ключа внутри objs
+    сохраняются одной записью с последними значениями.
+
+        ------
+        Параметры:
+            model: модель
+            objs: список несохранённых объектов модели
+            key_fields: поля естественного ключа
+            update_fields: поля, обновляемые у существующих записей
+            ids: id для новых объектов (см. allocate_ids)
+        -----
+        Выходное значение:
+            tuple: (созданные объекты, существующие объекты)
+    """
+    key_attnames = [model._meta.get_field(field).attname
+                    for field in key_fields]
+    update_attnames = [model._meta.get_field(field).attname
+                       for field in update_fields]
+
+    def get_key(obj: object) -> tuple:
+        return tuple(getattr(obj, attname) for attname in key_attnames)
+
+    unique = _deduplicate(objs, get_key, update_attnames)
+    found = model.objects.filter(**{
+        f'{field}__in': {key[index] for key in unique}
+        for index, field in enumerate(key_fields)
+    }).only(*key_fields, *update_fields)
+    found = {get_key(obj): obj for obj in found}
+
+    created, existing, changed = [], [], []
+    for key, obj in unique.items():
+        if key not in found:
+            created.append(obj)
+            continue
+        obj.pk = found[key].pk
+        existing.append(obj)
+        if any(getattr(obj, attname) != getattr(found[key], attname)
+               for attname in update_attnames):
+            changed.append(obj)
+
+    if ids is not None:
+        for obj, obj_id in zip(created, ids):
+            obj.pk = obj_id
+    model.objects.bulk_create(created)
+    if changed:
+        model.objects.bulk_update(changed, update_fields)
+
+    for obj in objs:
+        obj.pk = unique[get_key(obj)].pk
+    return created, existing
+
+
+def _deduplicate(objs: List[object],
+                 get_key: callable,
+                 update_attnames: Sequence[str]) -> dict:
+    unique = {}
+    for obj in objs:
+        key = get_key(obj)
+        if key in unique:
+            for attname in update_attnames:
+                setattr(unique[key], attname, getattr(obj, attname))
+        else:
+            unique[key] = obj
+    return unique
@@ -0,0 +1,119 @@
+"""Потоковая выгрузка рецептов в NDJSON.
+
+Выгрузка - JSON Lines, по объекту в строке, тип объекта в поле type:
+    user: email, username, first_name, last_name (только авторы
+        рецептов, без паролей)
+    tag: id, name, color, slug
+    ingredient: id, name, measurement_unit
+    recipe: id, author (email автора), name, text, cooking_time,
+        image (путь в MEDIA_ROOT), publication_date (ISO 8601),
+        tags (список id тегов),
+        ingredients (список объектов id ингредиента, amount)
+Сначала выводятся авторы, все теги и ингредиенты, затем рецепты в
+порядке id, поэтому при загрузке (utils.data_loaders.load_recipe_export)
+авторы, теги и ингредиенты рецепта уже известны. Уменьшенные копии изображений не
+выгружаются: их заново строит generate_image_variants.
+
+Записи читаются iterator(chunk_size) (на PostgreSQL - курсором на
+стороне сервера) и выводятся пачками по chunk_size строк: на каждую
+пачку рецептов выполняется два запроса (теги и ингредиенты рецептов
+пачки), а в памяти держится только текущая пачка.
+"""
+import json
+from collections import defaultdict
+from typing import Iterable, Iterator
+
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+
+from ingredients.models import Ingredient
+from recipes.models import IngredientsList, Recipe
+from tags.models import Tag
+from utils.data_loaders import (EXPORT_INGREDIENT, EXPORT_RECIPE, EXPORT_TAG,
+                                EXPORT_USER, USER_FIELDS, batched)
+
+User = get_user_model()
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_CONTENT_TYPE = 'application/x-ndjson'
+EXPORT_FILENAME = 'recipes.ndjson'
+
+RECIPE_FIELDS = ('id', 'author__email', 'name', 'text', 'cooking_time',
+                 'image', 'publication_date')
+
+
+def export_recipes(chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Выгрузить авторов, теги, ингредиенты и рецепты.
+
+        -----
+        Выходное значение:
+            итератор строк, каждая из которых содержит до chunk_size
+            записей NDJSON (с переводом строки после каждой)
+    """
+    authors = (User.objects
+               .filter(Exists(Recipe.objects.filter(author=OuterRef('pk'))))
+               .order_by('id')
+               .values(*USER_FIELDS)
+               .iterator(chunk_size=chunk_size))
+    for batch in batched(authors, chunk_size):
+        yield _dump(EXPORT_USER, batch)
+
+    tags = (Tag.objects
+            .order_by('id')
+            .values('id', 'name', 'color', 'slug')
+            .iterator(chunk_size=chunk_size))
+    for batch in batched(tags, chunk_size):
+        yield _dump(EXPORT_TAG, batch)
+
+    ingredients = (Ingredient.objects
+                   .order_by('id')
+                   .values('id', 'name', 'measurement_unit')
+                   .iterator(chunk_size=chunk_size))
+    for batch in batched(ingredients, chunk_size):
+        yield _dump(EXPORT_INGREDIENT, batch)
+
+    recipes = (Recipe.objects
+               .order_by('id')
+               .values_list(*RECIPE_FIELDS)
+               .iterator(chunk_size=chunk_size))
+    for batch in batched(recipes, chunk_size):
+        yield _dump(EXPORT_RECIPE, _build_recipes(batch))
+
+
+def _build_recipes(rows: list) -> Iterator[dict]:
+    ids = [row[0] for row in rows]
+    tags = defaultdict(list)
+    for recipe_id, tag_id in (Recipe.tags.through.objects
+                              .filter(recipe__in=ids)
+                              .order_by('id')
+                              .values_list('recipe', 'tag')):
+        tags[recipe_id].append(tag_id)
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id, amount in (IngredientsList.objects
+                                             .filter(recipe__in=ids)
+                                             .order_by('id')
+                                             .values_list('recipe',
+                                                          'ingredients',
+                                                          'amount')):
+        ingredients[recipe_id].append({'id': ingredient_id, 'amount': amount})
+
+    for (recipe_id, author, name, text, cooking_time, image,
+         publication_date) in rows:
+        yield {
+            'id': recipe_id,
+            'author': author,
+            'name': name,
+            'text': text,
+            'cooking_time': cooking_time,
+            'image': image,
+            'publication_date': publication_date.isoformat(),
+            'tags': tags[recipe_id],
+            'ingredients': ingredients[recipe_id],
+        }
+
+
+def _dump(record_type: str, records: Iterable[dict]) -> str:
+    return ''.join(
+        json.dumps({'type': record_type, **record}, ensure_ascii=False) + '\n'
+        for record in records
+    )
@@ -0,0 +1,316 @@
+"""Генерация синтетических данных.
+
+Модуль заполняет базу данных детерминированным набором пользователей,
+тегов, ингредиентов, рецептов, подписок, избранного и корзин заданного
+масштаба. Один и тот же seed всегда даёт один и тот же набор данных
+(при генерации в пустую базу данных, иначе id объектов сдвигаются).
+Все объекты создаются через bulk_create, поэтому генерация больших
+наборов не упирается в количество обращений к базе данных.
+
+С skew > 0 данные распределены неравномерно, по закону Ципфа с
+показателем skew: вес i-го по популярности объекта 1 / i ** skew.
+Популярны авторы с меньшим id: у них больше рецептов и подписчиков,
+их рецепты чаще попадают в избранное и корзины, а ингредиенты с
+меньшим id чаще встречаются в рецептах. Средние размеры корзин
+сохраняются, но у немногих пользователей корзины очень большие.
+С skew = 0 (по умолчанию) все пользователи одинаковы.
+"""
+import random
+from collections import namedtuple
+from itertools import accumulate
+from typing import List, Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from ingredients.models import Ingredient
+from recipes.counters import reconcile_counters
+from recipes.models import Favorite, IngredientsList, Recipe, ShoppingCart
+from recipes.search import rebuild_search_index
+from recipes.shopping_cart import rebuild_shopping_cart_totals
+from tags.models import Tag
+from utils.bulk_operations import allocate_ids, reset_sequences
+from utils.reference_data import INGREDIENTS, TAGS, bump_version
+from utils.response_cache import bump_recipes
+
+User = get_user_model()
+
+DatasetScale = namedtuple('DatasetScale', (
+    'users',
+    'recipes_per_user',
+    'ingredients',
+    'ingredients_per_recipe',
+    'tags',
+    'tags_per_recipe',
+    'favorites_per_user',
+    'cart_per_user',
+    'subscriptions_per_user',
+    'skew',
+), defaults=(0.0,))
+
+SCALES = {
+    'small': DatasetScale(
+        users=10,
+        recipes_per_user=5,
+        ingredients=100,
+        ingredients_per_recipe=5,
+        tags=3,
+        tags_per_recipe=2,
+        favorites_per_user=10,
+        cart_per_user=5,
+        subscriptions_per_user=3,
+    ),
+    'large': DatasetScale(
+        users=30,
+        recipes_per_user=10,
+        ingredients=300,
+        ingredients_per_recipe=15,
+        tags=6,
+        tags_per_recipe=3,
+        favorites_per_user=60,
+        cart_per_user=20,
+        subscriptions_per_user=15,
+    ),
+}
+
+# Наборы данных для нагрузочного тестирования (generate_data, load_test).
+LOAD_TEST_SCALES = {
+    'medium': DatasetScale(
+        users=1000,
+        recipes_per_user=20,
+        ingredients=2000,
+        ingredients_per_recipe=8,
+        tags=10,
+        tags_per_recipe=2,
+        favorites_per_user=30,
+        cart_per_user=5,
+        subscriptions_per_user=20,
+        skew=1.0,
+    ),
+    'production': DatasetScale(
+        users=10000,
+        recipes_per_user=10,
+        ingredients=2000,
+        ingredients_per_recipe=10,
+        tags=10,
+        tags_per_recipe=2,
+        favorites_per_user=50,
+        cart_per_user=8,
+        subscriptions_per_user=30,
+        skew=1.0,
+    ),
+}
+
+USER_PASSWORD = 'foodgram-password'
+BULK_BATCH_SIZE = 5000
+# Число попыток добрать выборку по весам до перехода к равномерной.
+WEIGHTED_SAMPLE_ATTEMPTS = 5
+RECIPE_IMAGE = 'recipes/images/placeholder.png'
+
+
+def generate_dataset(scale: DatasetScale, seed: int = 0) -> dict:
+    """Сгенерировать набор данных.
+
+        ------
+        Параметры:
+            scale: DatasetScale - размеры набора данных
+            seed: int - зерно генератора случайных чисел
+        -----
+        Выходное значение:
+            dict: количество созданных объектов каждого типа
+    """
+    rng = random.Random(seed)
+
+    users = _create_users(scale)
+    tags = _create_tags(scale)
+    ingredients = _create_ingredients(scale)
+    recipes = _create_recipes(scale, rng, users, tags, ingredients)
+    _create_marks(scale, rng, users, recipes)
+    _create_subscriptions(scale, rng, users)
+
+    reset_sequences(User, Tag, Ingredient, Recipe)
+    rebuild_shopping_cart_totals()
+    reconcile_counters()
+    rebuild_search_index()
+
+    return {
+        'users': len(users),
+        'tags': len(tags),
+        'ingredients': len(ingredients),
+        'recipes': len(recipes),
+    }
+
+
+def _create_users(scale: DatasetScale) -> list:
+    password = make_password(USER_PASSWORD)
+    return User.objects.bulk_create([
+        User(
+            id=user_id,
+            email=f'user{user_id}@foodgram.test',
+            username=f'user{user_id}',
+            first_name=f'Имя{user_id}',
+            last_name=f'Фамилия{user_id}',
+            password=password,
+        ) for user_id in allocate_ids(User, scale.users)
+    ])
+
+
+def _create_tags(scale: DatasetScale) -> list:
+    tags = Tag.objects.bulk_create([
+        Tag(
+            id=tag_id,
+            name=f'Тег {tag_id}',
+            color=f'#{tag_id * 2654435761 % 0xFFFFFF:06X}',
+            slug=f'tag{tag_id}',
+        ) for tag_id in allocate_ids(Tag, scale.tags)
+    ])
+    bump_version(TAGS)
+    return tags
+
+
+def _create_ingredients(scale: DatasetScale) -> list:
+    ingredients = Ingredient.objects.bulk_create([
+        Ingredient(
+            id=ingredient_id,
+            name=f'ингредиент {ingredient_id}',
+            measurement_unit='г',
+        ) for ingredient_id in allocate_ids(Ingredient, scale.ingredients)
+    ])
+    bump_version(INGREDIENTS)
+    return ingredients
+
+
+def _create_recipes(scale: DatasetScale,
+                    rng: random.Random,
+                    users: list,
+                    tags: list,
+                    ingredients: list) -> list:
+    counts = _distribute(scale.users * scale.recipes_per_user, len(users),
+                         scale.skew)
+    recipe_ids = iter(allocate_ids(Recipe, sum(counts)))
+    recipes = Recipe.objects.bulk_create([
+        Recipe(
+            id=next(recipe_ids),
+            author=author,
+            name=f'Рецепт {number} от {author.username}',
+            image=RECIPE_IMAGE,
+            text='Смешать все ингредиенты и готовить до готовности.',
+            cooking_time=rng.randint(5, 120),
+        ) for author, count in zip(users, counts) for number in range(count)
+    ], batch_size=BULK_BATCH_SIZE)
+
+    tag_weights = _get_cum_weights(len(tags), scale.skew)
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for recipe in recipes
+        for tag in _sample(rng, tags, scale.tags_per_recipe, tag_weights)
+    ], batch_size=BULK_BATCH_SIZE)
+    ingredient_weights = _get_cum_weights(len(ingredients), scale.skew)
+    IngredientsList.objects.bulk_create([
+        IngredientsList(
+            recipe_id=recipe.id,
+            ingredients_id=ingredient.id,
+            amount=rng.randint(1, 500),
+        )
+        for recipe in recipes
+        for ingredient in _sample(rng, ingredients,
+                                  scale.ingredients_per_recipe,
+                                  ingredient_weights)
+    ], batch_size=BULK_BATCH_SIZE)
+    bump_recipes([])
+    return recipes
+
+
+def _create_marks(scale: DatasetScale,
+                  rng: random.Random,
+                  users: list,
+                  recipes: list) -> None:
+    recipe_weights = _get_cum_weights(len(recipes), scale.skew)
+    Favorite.objects.bulk_create([
+        Favorite(user_id=user.id, recipe_id=recipe.id)
+        for user in users
+        for recipe in _sample(rng, recipes, scale.favorites_per_user,
+                              recipe_weights)
+    ], batch_size=BULK_BATCH_SIZE)
+    cart_sizes = _distribute(scale.users * scale.cart_per_user, len(users),
+                             scale.skew)
+    if scale.skew:
+        # Большие корзины не обязательно у популярных авторов.
+        rng.shuffle(cart_sizes)
+    ShoppingCart.objects.bulk_create([
+        ShoppingCart(user_id=user.id, recipe_id=recipe.id)
+        for user, size in zip(users, cart_sizes)
+        for recipe in _sample(rng, recipes, size, recipe_weights)
+    ], batch_size=BULK_BATCH_SIZE)
+
+
+def _create_subscriptions(scale: DatasetScale,
+                          rng: random.Random,
+                          users: list) -> None:
+    user_weights = _get_cum_weights(len(users), scale.skew)
+    subscriptions = User.subscriptions.through
+    subscriptions.objects.bulk_create([
+        subscriptions(from_user_id=user.id, to_user_id=author.id)
+        for user in users
+        for author in _sample_authors(rng, user, users,
+                                      scale.subscriptions_per_user,
+                                      user_weights)
+    ], batch_size=BULK_BATCH_SIZE)
+
+
+def _sample_authors(rng: random.Random, user: object, users: list, k: int,
+                    cum_weights: Optional[list]) -> list:
+    """Авторы, на которых подписан user (кроме него самого)."""
+    if cum_weights is None:
+        return rng.sample([author for author in users if author != user],
+                          min(k, len(users) - 1))
+    authors = _sample(rng, users, k + 1, cum_weights)
+    return [author for author in authors if author != user][:k]
+
+
+def _sample(rng: random.Random, population: list, k: int,
+            cum_weights: Optional[list] = None) -> list:
+    """Выбрать до k различных элементов population.
+
+    Без cum_weights элементы выбираются равновероятно, иначе -
+    с вероятностью, пропорциональной весу. Если при сильном перекосе
+    весов выборка не набирается за WEIGHTED_SAMPLE_ATTEMPTS попыток,
+    она добирается равновероятно из оставшихся элементов.
+    """
+    k = min(k, len(population))
+    if cum_weights is None:
+        return rng.sample(population, k)
+    indexes = range(len(population))
+    chosen = {}
+    for _ in range(WEIGHTED_SAMPLE_ATTEMPTS):
+        if len(chosen) == k:
+            break
+        for index in rng.choices(indexes, cum_weights=cum_weights,
+                                 k=k - len(chosen)):
+            chosen[index] = None
+    if len(chosen) < k:
+        rest = [index for index in indexes if index not in chosen]
+        chosen.update(dict.fromkeys(rng.sample(rest, k - len(chosen))))
+    return [population[index] for index in chosen]
+
+
+def _get_cum_weights(count: int, skew: float) -> Optional[list]:
+    """Накопленные веса Ципфа, None при равномерном распределении."""
+    if not skew:
+        return None
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def _distribute(total: int, count: int, skew: float) -> List[int]:
+    """Разделить total между count объектами по весам Ципфа.
+
+    Остаток от округления достаётся самым популярным объектам.
+    """
+    if not count:
+        return []
+    weights = [1 / rank ** skew for rank in range(1, count + 1)]
+    weight_sum = sum(weights)
+    counts = [int(total * weight / weight_sum) for weight in weights]
+    for index in range(total - sum(counts)):
+        counts[index % count] += 1
+    return counts
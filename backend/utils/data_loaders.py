@@ -0,0 +1,467 @@
+"""Массовая загрузка данных из файлов.
+
+Модуль загружает в базу данных ингредиенты, теги и рецепты из файлов
+CSV, JSON (массив объектов) и JSON Lines (.jsonl/.ndjson, по объекту в
+строке). Файлы читаются потоково и записываются пачками:
+    - на каждую пачку выполняется постоянное число запросов
+      (выборка существующих записей, bulk_create, bulk_update);
+    - записи сопоставляются с существующими по естественному ключу
+      и обновляются (upsert), поэтому повторная загрузка того же файла
+      ничего не дублирует.
+
+Форматы записей:
+    ингредиенты: name, measurement_unit
+    теги: name, color, slug
+    рецепты: author (email автора), name, text, cooking_time,
+        image (путь в MEDIA_ROOT), tags (список slug),
+        ingredients (список объектов name, measurement_unit, amount),
+        publication_date (ISO 8601, необязательно)
+    Рецепты загружаются только из JSON и JSON Lines.
+
+Выгрузка рецептов (utils.data_exporters) загружается load_recipe_export.
+"""
+import csv
+import json
+import os
+from itertools import groupby, islice
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from ingredients.models import Ingredient
+from recipes.counters import refresh_recipes_count
+from recipes.models import IngredientsList, Recipe, ShoppingCart
+from recipes.search import update_search_index
+from recipes.shopping_cart import rebuild_shopping_cart_totals
+from tags.models import Tag
+from utils.bulk_operations import allocate_ids, reset_sequences, upsert
+from utils.reference_data import INGREDIENTS, TAGS, bump_version
+from utils.response_cache import bump_recipes
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+INGREDIENT_FIELDS = ('name', 'measurement_unit')
+RECIPE_UPDATE_FIELDS = ('text', 'cooking_time', 'image')
+TAG_FIELDS = ('name', 'color', 'slug')
+USER_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+# Типы записей выгрузки рецептов (поле type).
+EXPORT_USER = 'user'
+EXPORT_TAG = 'tag'
+EXPORT_INGREDIENT = 'ingredient'
+EXPORT_RECIPE = 'recipe'
+
+
+class DataLoadError(ValueError):
+    """Ошибка в загружаемых данных."""
+
+
+def read_records(file_path: str, fields: Sequence[str]) -> Iterator[dict]:
+    """Потоково прочитать записи из файла.
+
+    Формат определяется по расширению. Строки CSV сопоставляются с
+    fields по порядку, строка заголовка (совпадающая с fields)
+    пропускается.
+
+        ------
+        Параметры:
+            file_path: str - путь к файлу
+            fields: Sequence[str] - поля записи в порядке колонок CSV
+        -----
+        Выходное значение:
+            итератор словарей {поле: значение}
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    with open(file_path, newline='', encoding='utf-8') as file:
+        if extension == '.csv':
+            if not fields:
+                raise DataLoadError(f'{file_path}: эти данные не '
+                                    f'загружаются из CSV')
+            for row in csv.reader(file):
+                if not row or tuple(row) == tuple(fields):
+                    continue
+                if len(row) != len(fields):
+                    raise DataLoadError(
+                        f'{file_path}: ожидается {len(fields)} колонки, '
+                        f'получено {row}'
+                    )
+                yield dict(zip(fields, row))
+        elif extension in ('.jsonl', '.ndjson'):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        elif extension == '.json':
+            yield from json.load(file)
+        else:
+            raise DataLoadError(f'{file_path}: неизвестный формат файла')
+
+
+def batched(records: Iterable, size: int) -> Iterator[list]:
+    """Разбить поток записей на пачки по size записей."""
+    records = iter(records)
+    batch = list(islice(records, size))
+    while batch:
+        yield batch
+        batch = list(islice(records, size))
+
+
+def load_ingredients(records: Iterable[dict],
+                     batch_size: int = BATCH_SIZE) -> Tuple[int, int, int]:
+    """Загрузить ингредиенты.
+
+    Ингредиент определяется парой (name, measurement_unit), поэтому
+    существующие ингредиенты не изменяются.
+
+        -----
+        Выходное значение:
+            tuple: (прочитано, создано, уже существовало)
+    """
+    def build(record: dict) -> Ingredient:
+        return Ingredient(name=record['name'].strip(),
+                          measurement_unit=record['measurement_unit'].strip())
+
+    totals = _load(records, batch_size, build, Ingredient,
+                   key_fields=INGREDIENT_FIELDS)
+    if totals[1]:
+        bump_version(INGREDIENTS)
+    return totals
+
+
+def load_tags(records: Iterable[dict],
+              batch_size: int = BATCH_SIZE) -> Tuple[int, int, int]:
+    """Загрузить теги, существующие теги сопоставляются по slug.
+
+        -----
+        Выходное значение:
+            tuple: (прочитано, создано, уже существовало)
+    """
+    def build(record: dict) -> Tag:
+        return Tag(name=record['name'].strip(),
+                   color=record['color'].strip(),
+                   slug=record['slug'].strip())
+
+    totals = _load(records, batch_size, build, Tag,
+                   key_fields=('slug',), update_fields=('name', 'color'))
+    bump_version(TAGS)
+    return totals
+
+
+def load_users(records: Iterable[dict],
+               batch_size: int = BATCH_SIZE) -> Tuple[int, int, int]:
+    """Загрузить пользователей без паролей.
+
+    Пользователь определяется email, существующие пользователи не
+    изменяются.
+
+        -----
+        Выходное значение:
+            tuple: (прочитано, создано, уже существовало)
+    """
+    password = make_password(None)
+
+    def build(record: dict) -> User:
+        return User(password=password,
+                    **{field: record[field].strip() for field in USER_FIELDS})
+
+    return _load(records, batch_size, build, User, key_fields=('email',))
+
+
+def load_recipes(records: Iterable[dict],
+                 batch_size: int = BATCH_SIZE) -> Tuple[int, int, int]:
+    """Загрузить рецепты.
+
+    Рецепт определяется парой (автор, название), повторы пары в файле
+    сохраняются одним рецептом с последними значениями. Теги и
+    ингредиенты существующего рецепта заменяются целиком, итоги корзин,
+    в которых он лежит, пересчитываются.
+
+        -----
+        Выходное значение:
+            tuple: (прочитано, создано, уже существовало)
+    """
+    return _load_recipe_batches(records, batch_size, _upsert_recipes)
+
+
+def load_recipe_export(
+    records: Iterable[dict],
+    batch_size: int = BATCH_SIZE,
+) -> Dict[str, Tuple[int, int, int]]:
+    """Загрузить выгрузку рецептов (utils.data_exporters).
+
+    Авторы сопоставляются с существующими пользователями по email,
+    теги - по slug, ингредиенты - по (name, measurement_unit),
+    недостающие создаются (пользователи - без пароля, войти они смогут
+    после его сброса; существующие пользователи не изменяются). Id тегов и
+    ингредиентов в рецептах выгрузки заменяются их естественными
+    ключами.
+
+    Рецепты сопоставляются по id выгрузки, а не по названию: у автора
+    может быть несколько рецептов с одинаковым названием
+    (см. _save_exported_recipes). Дата публикации берётся из выгрузки.
+    В памяти помимо текущей пачки хранятся соответствие id тегов и
+    ингредиентов выгрузки их ключам и id рецептов, созданных этой
+    загрузкой не под своим id.
+
+        -----
+        Выходное значение:
+            dict: {тип записи: (прочитано, создано, уже существовало)}
+    """
+    tag_slugs = {}
+    ingredient_keys = {}
+    moved_ids = set()
+    loaders = {
+        EXPORT_USER: lambda group: load_users(group, batch_size),
+        EXPORT_TAG: lambda group: load_tags(
+            _remember_keys(group, tag_slugs, lambda record: record['slug'].strip()),
+            batch_size
+        ),
+        EXPORT_INGREDIENT: lambda group: load_ingredients(
+            _remember_keys(group, ingredient_keys, lambda record: {
+                'name': record['name'].strip(),
+                'measurement_unit': record['measurement_unit'].strip(),
+            }),
+            batch_size
+        ),
+        EXPORT_RECIPE: lambda group: _load_recipe_batches(
+            (_resolve_recipe(record, tag_slugs, ingredient_keys)
+             for record in group),
+            batch_size,
+            lambda batch, recipes: _save_exported_recipes(batch, recipes,
+                                                          moved_ids)
+        ),
+    }
+    totals = {}
+    for record_type, group in groupby(records,
+                                      key=lambda record: record.get('type')):
+        if record_type not in loaders:
+            raise DataLoadError(f'Неизвестный тип записи: {record_type}')
+        result = loaders[record_type](group)
+        previous = totals.get(record_type, (0, 0, 0))
+        totals[record_type] = tuple(map(sum, zip(previous, result)))
+    return totals
+
+
+def _remember_keys(records: Iterable[dict], keys: dict,
+                   get_key: callable) -> Iterator[dict]:
+    for record in records:
+        try:
+            keys[record['id']] = get_key(record)
+        except KeyError as error:
+            raise DataLoadError(f'{record}: нет поля {error}') from error
+        yield record
+
+
+def _resolve_recipe(record: dict, tag_slugs: dict,
+                    ingredient_keys: dict) -> dict:
+    """Рецепт выгрузки в формате load_recipes."""
+    try:
+        tags = [tag_slugs[tag_id] for tag_id in record['tags']]
+    except KeyError as error:
+        raise DataLoadError(f'Рецепт {record.get("name")}: '
+                            f'нет тега с id {error}') from error
+    try:
+        ingredients = [
+            dict(ingredient_keys[item['id']], amount=item['amount'])
+            for item in record['ingredients']
+        ]
+    except KeyError as error:
+        raise DataLoadError(f'Рецепт {record.get("name")}: '
+                            f'нет ингредиента с id {error}') from error
+    return dict(record, tags=tags, ingredients=ingredients)
+
+
+def _load(records: Iterable[dict],
+          batch_size: int,
+          build: callable,
+          model: object,
+          key_fields: Sequence[str],
+          update_fields: Sequence[str] = ()) -> Tuple[int, int, int]:
+    read = created = existing = 0
+    for batch in batched(records, batch_size):
+        try:
+            objs = [build(record) for record in batch]
+        except (KeyError, AttributeError) as error:
+            raise DataLoadError(
+                f'{model._meta.verbose_name}: нет поля {error}'
+            ) from error
+        with transaction.atomic():
+            batch_created, batch_existing = upsert(
+                model, objs, key_fields, update_fields
+            )
+        read += len(batch)
+        created += len(batch_created)
+        existing += len(batch_existing)
+    return read, created, existing
+
+
+def _load_recipe_batches(records: Iterable[dict],
+                         batch_size: int,
+                         save: callable) -> Tuple[int, int, int]:
+    read = created = existing = 0
+    for batch in batched(records, batch_size):
+        with transaction.atomic():
+            batch_created, batch_existing = _load_recipes_batch(batch, save)
+        read += len(batch)
+        created += batch_created
+        existing += batch_existing
+    reset_sequences(Recipe)
+    return read, created, existing
+
+
+def _load_recipes_batch(batch: List[dict], save: callable) -> Tuple[int, int]:
+    """Загрузить пачку рецептов.
+
+    save(batch, recipes) записывает рецепты (проставляя им pk) и
+    возвращает списки созданных и уже существовавших рецептов.
+    """
+    authors = _get_by_key(User, 'email',
+                          {record['author'] for record in batch})
+    tags = _get_by_key(Tag, 'slug',
+                       {slug for record in batch for slug in record['tags']})
+    ingredients = {
+        (ingredient.name, ingredient.measurement_unit): ingredient
+        for ingredient in Ingredient.objects.filter(name__in={
+            item['name'] for record in batch
+            for item in record['ingredients']
+        })
+    }
+
+    recipes = []
+    for record in batch:
+        if record['author'] not in authors:
+            raise DataLoadError(f'Рецепт {record["name"]}: '
+                                f'нет автора {record["author"]}')
+        recipes.append(Recipe(
+            author=authors[record['author']],
+            name=record['name'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+            image=record.get('image', ''),
+        ))
+    created, existing = save(batch, recipes)
+    _set_publication_dates(batch, recipes)
+
+    # Теги и ингредиенты рецепта берутся из последней его записи.
+    last_records = {recipe.pk: (record, recipe)
+                    for record, recipe in zip(batch, recipes)}
+    recipe_tags = []
+    recipe_ingredients = []
+    for record, recipe in last_records.values():
+        for slug in record['tags']:
+            if slug not in tags:
+                raise DataLoadError(f'Рецепт {recipe.name}: нет тега {slug}')
+            recipe_tags.append(
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tags[slug].id)
+            )
+        for item in record['ingredients']:
+            key = (item['name'], item['measurement_unit'])
+            if key not in ingredients:
+                raise DataLoadError(f'Рецепт {recipe.name}: '
+                                    f'нет ингредиента {key}')
+            recipe_ingredients.append(IngredientsList(
+                recipe_id=recipe.id,
+                ingredients_id=ingredients[key].id,
+                amount=item['amount'],
+            ))
+
+    existing_ids = [recipe.id for recipe in existing]
+    Recipe.tags.through.objects.filter(recipe__in=existing_ids).delete()
+    IngredientsList.objects.filter(recipe__in=existing_ids).delete()
+    Recipe.tags.through.objects.bulk_create(recipe_tags, ignore_conflicts=True)
+    IngredientsList.objects.bulk_create(recipe_ingredients, ignore_conflicts=True)
+    if existing_ids:
+        rebuild_shopping_cart_totals(
+            ShoppingCart.objects
+            .filter(recipe__in=existing_ids)
+            .values_list('user', flat=True)
+            .distinct()
+        )
+    refresh_recipes_count({recipe.author_id for recipe in created})
+    update_search_index(list(last_records))
+    bump_recipes(existing_ids)
+    return len(created), len(existing)
+
+
+def _upsert_recipes(batch: List[dict],
+                    recipes: List[Recipe]) -> Tuple[list, list]:
+    """Записать рецепты, сопоставляя их по паре (автор, название)."""
+    return upsert(
+        Recipe, recipes, ('author', 'name'),
+        update_fields=RECIPE_UPDATE_FIELDS,
+        ids=allocate_ids(Recipe, len(recipes)),
+    )
+
+
+def _save_exported_recipes(batch: List[dict], recipes: List[Recipe],
+                           moved_ids: set) -> Tuple[list, list]:
+    """Записать рецепты выгрузки, сопоставляя их по id выгрузки.
+
+    Рецепт выгрузки с id, которого нет в базе, создаётся под этим id,
+    поэтому повторная загрузка той же выгрузки (в том числе в базу, из
+    которой она получена) находит свои рецепты. Рецепт с id, который
+    занят рецептом того же автора, обновляется целиком, включая
+    название. Если id занят рецептом другого автора или рецептом,
+    созданным этой загрузкой под новым id, рецепт создаётся под новым
+    id (moved_ids), а чужой рецепт не изменяется. Такие рецепты при
+    повторной загрузке в ту же базу создаются снова.
+    """
+    try:
+        ids = [record['id'] for record in batch]
+    except KeyError as error:
+        raise DataLoadError(f'Рецепт выгрузки: нет поля {error}') from error
+    found = dict(Recipe.objects.filter(id__in=ids)
+                 .values_list('id', 'author_id'))
+
+    created, existing, moved = [], [], []
+    for recipe_id, recipe in zip(ids, recipes):
+        recipe.pk = recipe_id
+        if recipe_id not in found:
+            created.append(recipe)
+            found[recipe_id] = recipe.author_id
+        elif (found[recipe_id] == recipe.author_id
+                and recipe_id not in moved_ids):
+            existing.append(recipe)
+        else:
+            moved.append(recipe)
+    Recipe.objects.bulk_create(created)
+    for recipe, recipe_id in zip(moved, allocate_ids(Recipe, len(moved))):
+        recipe.pk = recipe_id
+        moved_ids.add(recipe_id)
+    Recipe.objects.bulk_create(moved)
+    if existing:
+        Recipe.objects.bulk_update(existing,
+                                   ('name',) + RECIPE_UPDATE_FIELDS)
+    return created + moved, existing
+
+
+def _set_publication_dates(batch: List[dict], recipes: List[Recipe]) -> None:
+    """Проставить даты публикации из записей.
+
+    publication_date заполняется автоматически (auto_now_add) и при
+    создании рецепта не берётся из объекта, поэтому переданные даты
+    записываются отдельным bulk_update.
+    """
+    dated = []
+    for record, recipe in zip(batch, recipes):
+        if not record.get('publication_date'):
+            continue
+        publication_date = parse_datetime(record['publication_date'])
+        if publication_date is None:
+            raise DataLoadError(f'Рецепт {recipe.name}: неверная дата '
+                                f'{record["publication_date"]}')
+        recipe.publication_date = publication_date
+        dated.append(recipe)
+    if dated:
+        Recipe.objects.bulk_update(dated, ['publication_date'])
+
+
+def _get_by_key(model: object, field: str, values: set) -> dict:
+    return {
+        getattr(obj, field): obj
+        for obj in model.objects.filter(**{f'{field}__in': values})
+    }
@@ -1,19 +1,51 @@
-import io
+import os
+import tempfile
 from typing import Dict
 
-import reportlab
 from django.conf import settings
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm
+from reportlab.lib.utils import simpleSplit
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
+FONT_NAME = 'Roboto'
+FONT_PATH = os.path.join(settings.BASE_DIR, 'utils', 'fonts', 'Roboto.ttf')
+
+HEADER_FONT_SIZE = 18
+TEXT_FONT_SIZE = 16
+LINE_SPACING = 1.2
+PAGE_MARGIN = 1 * cm
+HEADER_MARGIN = 2 * cm
+
+# Файл держится в памяти, пока не превысит этот размер, затем пишется
+# на диск, поэтому память воркера не растёт вместе со списком покупок.
+MAX_IN_MEMORY_PDF_SIZE = 1024 * 1024
+
+
+def register_fonts() -> None:
+    """Зарегистрировать шрифты для pdf файлов.
+
+    Вызывается один раз при запуске приложения (RecipesConfig.ready),
+    повторный вызов ничего не делает.
+    """
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+
+
+def get_line_height(font_size: int) -> float:
+    """Высота строки по реальным метрикам шрифта."""
+    ascent, descent = pdfmetrics.getAscentDescent(FONT_NAME, font_size)
+    return (ascent - descent) * LINE_SPACING
+
 
 def create_ingredients_list_pdf(ingredients: Dict[str, int]):
     """Создать пдф файл со списком ингредиентов.
 
-     Формирует файл(pdf) на онсове ingredients.
+     Формирует файл(pdf) на онсове ingredients. Строки переносятся по
+     ширине страницы, новая страница начинается, когда следующая строка
+     не помещается по высоте.
 
         ------
         Параметры:
@@ -21,44 +53,44 @@ def create_ingredients_list_pdf(ingredients: Dict[str, int]):
                 {имя (единица измерения): колличество}
         -----
         Выходное значение:
-            указатель на буфер с фалом
+            указатель на временный файл с pdf
     """
-    reportlab.rl_config.TTFSearchPath.append(
-        str(settings.BASE_DIR) + '/utils/fonts/'
-    )
-    pdfmetrics.registerFont(TTFont('Roboto', 'Roboto.ttf'))
-
-    buffer = io.BytesIO()
-    p = canvas.Canvas(
-        buffer,
-        pagesize=A4,
-        initialFontName='Roboto',
-        initialFontSize=18
-    )
-
-    margin_top = 27 * cm
-    margint_top_header = margin_top - 3 * cm
-    left_margin = 1 * cm
-
-    p.drawString(6.5 * cm, margin_top, 'Общий список ингредиентов!')
-    p.setFontSize(16)
-
-    page_spliter = 0
+    register_fonts()
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=MAX_IN_MEMORY_PDF_SIZE)
+    page_width, page_height = A4
+    p = canvas.Canvas(buffer, pagesize=A4, initialFontName=FONT_NAME)
+
+    text_width = page_width - 2 * PAGE_MARGIN
+    line_height = get_line_height(TEXT_FONT_SIZE)
+    y = _start_page(p, 'Общий список ингредиентов!')
+
     for ingredient, amount in ingredients.items():
-        p.drawString(
-            left_margin,
-            margint_top_header,
-            f'{ingredient} - {amount}'
-        )
-        margint_top_header -= cm
-        page_spliter += 1
-
-        if page_spliter % 24 == 0:
-            p.showPage()
-            p.drawString(3 * cm, margin_top, 'Продолжение списка ингредиентов')
-            margint_top_header = margin_top - 3 * cm
+        lines = simpleSplit(f'{ingredient} - {amount}',
+                            FONT_NAME, TEXT_FONT_SIZE, text_width)
+        for line in lines:
+            if y - line_height < PAGE_MARGIN:
+                p.showPage()
+                y = _start_page(p, 'Продолжение списка ингредиентов')
+            y -= line_height
+            p.drawString(PAGE_MARGIN, y, line)
 
     p.showPage()
     p.save()
     buffer.seek(0)
     return buffer
+
+
+def _start_page(p: canvas.Canvas, header: str) -> float:
+    """Вывести заголовок страницы.
+
+        -----
+        Выходное значение
+            float: координата y, с которой начинается текст страницы
+    """
+    page_width, page_height = A4
+    y = page_height - HEADER_MARGIN
+    p.setFont(FONT_NAME, HEADER_FONT_SIZE)
+    p.drawCentredString(page_width / 2, y, header)
+    p.setFont(FONT_NAME, TEXT_FONT_SIZE)
+    return y - get_line_height(HEADER_FONT_SIZE)
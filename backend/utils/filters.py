@@ -1,42 +1,37 @@
 from django.conf import settings
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 
+from ingredients.search import ingredient_search_index
 from recipes.models import Recipe
-from tags.models import Tag
+from recipes.search import search_recipes
+from tags.slugs import tag_slug_map
 
+TAGS_ANY = 'any'
+TAGS_ALL = 'all'
+TAGS_MODES = (
+    (TAGS_ANY, 'Хотя бы один из тегов'),
+    (TAGS_ALL, 'Все теги'),
+)
 
-class DoubleSearchBackend(SearchFilter):
+
+class IngredientSearchBackend(SearchFilter):
     """
-    Бекенд для фильтрации с выводом в заданой последовательности.
+    Бекенд для поиска ингредиентов по индексу в памяти процесса.
 
-    Поддерживает примущества базавого фильтра, но выводит
-    результаты в последовательности указанной в search_fields
+    Поддерживает параметр поиска базового фильтра, но ищет без обращения
+    к базе данных и выводит сначала ингредиенты, название которых
+    начинается с искомой строки, а затем содержащие её.
     """
     def filter_queryset(self, request, queryset, view):
-        search_fields = self.get_search_fields(view, request)
         search_terms = self.get_search_terms(request)
 
-        if not search_fields or not search_terms:
+        if not search_terms or view.action != 'list':
             return queryset
 
-        orm_lookups = [
-            self.construct_search(str(search_field))
-            for search_field in search_fields
-        ]
-
-        filtered_queryset = []
-        for search_term in search_terms:
-            for orm_lookup in orm_lookups:
-                ingredients = (queryset.filter(
-                    **{orm_lookup: search_term}
-                ))
-                for ingredient in ingredients:
-                    if ingredient not in filtered_queryset:
-                        filtered_queryset.append(ingredient)
-
-        return filtered_queryset
+        return ingredient_search_index.search(search_terms)
 
 
 class RecipeFilterSet(FilterSet):
@@ -45,17 +40,23 @@ class RecipeFilterSet(FilterSet):
     Фильтрация идет по следующим query праметрам:
     - author: указывается id автора рецепта
     - tags: указывается slug тега(ов)
+    - tags_mode: any (по умолчанию) - рецепты хотя бы с одним из тегов,
+      all - рецепты со всеми тегами
     - is_favorited: true, выводит список рецептов из избранного
     - is_in_shopping_cart: true, выводит список рецептов из корзины
+    - search: полнотекстовый поиск по названию, описанию и ингредиентам,
+      рецепты выводятся по релевантности (recipes.search)
     Note:
     --------
     is_favorited и is_in_shopping_cart - самостоятельные параметры, совместное
     использование, в том числе с author приводит к возвращениее HTTP404_BAD_REQUEST
     """
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        to_field_name='slug',
-        field_name='tags__slug'
+    tags = filters.CharFilter(
+        method='filter_tags'
+    )
+    tags_mode = filters.ChoiceFilter(
+        choices=TAGS_MODES,
+        method='skip_filter'
     )
     is_favorited = filters.CharFilter(
         method='check_is_in_favorited'
@@ -63,14 +64,48 @@ class RecipeFilterSet(FilterSet):
     is_in_shopping_cart = filters.CharFilter(
         method='check_is_in_shopping_cart'
     )
+    search = filters.CharFilter(
+        method='search_recipes'
+    )
+
+    def filter_tags(self, queryset, name, value):
+        """Фильтрация по тегам подзапросами EXISTS к таблице связей
+        рецептов с тегами.
+
+        В отличие от JOIN, подзапрос не размножает рецепт с несколькими
+        выбранными тегами, поэтому ни список, ни COUNT пагинации не нужно
+        сворачивать DISTINCT. id тегов берутся из tags.slugs без запроса
+        к базе данных.
+        """
+        slugs = list(dict.fromkeys(
+            slug for slug in self.request.query_params.getlist('tags') if slug
+        ))
+        tag_ids = tag_slug_map.get_ids(slugs)
+        unknown = [slug for slug in slugs if slug not in tag_ids]
+        if unknown:
+            raise ValidationError({'tags': [
+                settings.ERROR_MESSAGE.get('unknown_tag').format(slug=slug)
+                for slug in unknown
+            ]})
+
+        recipe_tags = Recipe.tags.through.objects.filter(recipe=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_mode') == TAGS_ALL:
+            for tag_id in tag_ids.values():
+                queryset = queryset.filter(Exists(recipe_tags.filter(tag=tag_id)))
+            return queryset
+        return queryset.filter(
+            Exists(recipe_tags.filter(tag__in=tag_ids.values()))
+        )
+
+    def skip_filter(self, queryset, name, value):
+        return queryset
 
     def check_is_in_favorited(self, queryset, name, value):
         is_favorited = self.request.query_params.get('is_favorited')
         if is_favorited == '1' or is_favorited == 'true':
             try:
                 favorite_recipes = (self.request.user.
-                                    marked_recipes.
-                                    fovorited_recipe.values_list('id'))
+                                    favorites.values('recipe'))
                 return queryset.filter(
                     id__in=favorite_recipes
                 )
@@ -84,8 +119,7 @@ class RecipeFilterSet(FilterSet):
         if is_in_shopping_cart == '1' or is_in_shopping_cart == 'true':
             try:
                 recipes_for_download = (self.request.user.
-                                        marked_recipes.
-                                        recipe_for_download.values_list('id'))
+                                        shopping_cart.values('recipe'))
                 return queryset.filter(
                     id__in=recipes_for_download
                 )
@@ -93,6 +127,9 @@ class RecipeFilterSet(FilterSet):
                 return queryset.none()
         return queryset
 
+    def search_recipes(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
     def is_valid(self):
         shopping_cart = self.request.query_params.get('is_in_shopping_cart')
         favorited = self.request.query_params.get('is_favorited')
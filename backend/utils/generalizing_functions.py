@@ -17,6 +17,9 @@ def check_the_occurrence(ckecked_obj: object,
         related_field допускает использование __ снитаксиса для доступа
             к другим сылочным полям.
         Ловит исключение если передано не корректное related_field
+        При вызове из сериализатора id связанных объектов загружаются
+            одним запросом и кешируются в контексте сериализатора,
+            поэтому проверка всех объектов страницы стоит один запрос.
     ------
     Параметры:
         obj - обьект в котором будет произведен поиск на наличие объекта
@@ -28,20 +31,37 @@ def check_the_occurrence(ckecked_obj: object,
     """
     try:
         user = obj.context.get('request').user
-        if user.is_anonymous:
-            return False
-        object_for_search = user
     except AttributeError:
-        object_for_search = obj
-
-    for field in related_field.split('__'):
-        if not hasattr(object_for_search, field):
+        related_manager = _get_related_manager(obj, related_field)
+        if related_manager is None:
             return False
-        object_for_search = getattr(object_for_search, field)
+        return related_manager.filter(pk=ckecked_obj.pk).exists()
+
+    if user.is_anonymous:
+        return False
+
+    occurrence_cache = obj.context.setdefault('occurrence_cache', {})
+    if related_field not in occurrence_cache:
+        related_manager = _get_related_manager(user, related_field)
+        occurrence_cache[related_field] = (
+            set() if related_manager is None
+            else set(related_manager.values_list('pk', flat=True))
+        )
 
-    data = getattr(object_for_search, 'all')()
+    return ckecked_obj.pk in occurrence_cache[related_field]
 
-    return ckecked_obj in data
+
+def _get_related_manager(obj: object, related_field: str) -> object:
+    """
+    Получить менеджер связанных объектов по пути related_field.
+
+    Возвращает None если какого-то из полей пути нет у объекта.
+    """
+    for field in related_field.split('__'):
+        if not hasattr(obj, field):
+            return None
+        obj = getattr(obj, field)
+    return obj
 
 
 def send_bad_request_response(message: str) -> object:
@@ -0,0 +1,494 @@
+"""Нагрузочное тестирование API.
+
+run_load_test воспроизводит смесь запросов TRAFFIC_MIX к маршрутам
+router_v1 против запущенного сервера и считает пропускную способность
+и перцентили времени ответа по сценариям. Данные для запросов (id
+рецептов, пользователей, тегов, ингредиентов) и токены пользователей
+получаются через API, поэтому сервер может работать с любой базой,
+заполненной generate_data (пароль пользователей USER_PASSWORD).
+
+Каждый клиент (поток) работает от имени своего пользователя, держит
+keep-alive соединение и выбирает сценарии по весам генератором со
+своим зерном: при одном seed последовательность сценариев клиента
+одинакова. Изменяющие сценарии возвращают данные в исходное
+состояние (добавленное удаляется тем же сценарием). Регистрация, смена
+пароля, изменение и удаление пользователей и выгрузка рецептов в смесь
+не входят.
+
+Время ответа измеряется в процессе клиента, поэтому при большом числе
+клиентов в него входит и ожидание GIL: для замеров сервера на пределе
+клиент запускается на отдельной машине или в нескольких процессах.
+"""
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from itertools import accumulate
+from typing import List, Sequence, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from utils.data_generators import USER_PASSWORD
+
+# Рецепт, создаваемый сценарием recipe_write.
+IMAGE = ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAf'
+         'FcSJAAAADUlEQVR42mP8z8DwHwAFBQIAX8jx0gAAAABJRU5ErkJggg==')
+DISCOVERY_PAGES = 5
+DISCOVERY_PAGE_SIZE = 100
+# Страницы списков, как у фронтенда; лента листается не дальше
+# MAX_FEED_PAGE, отфильтрованные списки - только первая страница.
+PAGE_SIZE = 6
+MAX_FEED_PAGE = 20
+MARKS_BATCH_SIZE = 10
+SEARCH_WORDS = ('рецепт', 'смешать готовить', 'ингредиент', 'несуществующее')
+PERCENTILES = (50, 95, 99)
+REQUEST_TIMEOUT = 60
+
+Scenario = namedtuple('Scenario', ('name', 'weight', 'anonymous', 'run'))
+Measurement = namedtuple('Measurement',
+                         ('scenario', 'method', 'seconds', 'status', 'ok'))
+LoadTestData = namedtuple('LoadTestData', (
+    'recipe_ids',
+    'feed_pages',
+    'user_ids',
+    'user_pages',
+    'tag_ids',
+    'tag_slugs',
+    'ingredient_ids',
+    'ingredient_prefixes',
+))
+
+
+class LoadTestError(Exception):
+    """Сервер не готов к нагрузочному тестированию."""
+
+
+class ApiClient:
+    """HTTP клиент одного потока с keep-alive соединением."""
+    def __init__(self, url: str, token: str = None, user_id: int = None):
+        parts = urlsplit(url)
+        connection_class = (HTTPSConnection if parts.scheme == 'https'
+                            else HTTPConnection)
+        self._connection = connection_class(parts.netloc,
+                                            timeout=REQUEST_TIMEOUT)
+        self._prefix = parts.path.rstrip('/')
+        self.token = token
+        self.user_id = user_id
+        self.scenario = None
+        self.anonymous = False
+        self.recording = False
+        self.measurements = []
+
+    def request(self, method: str, path: str, payload: object = None,
+                statuses: Sequence[int] = (200,)) -> Tuple[int, object]:
+        """Выполнить запрос.
+
+            -----
+            Выходное значение:
+                tuple: (HTTP статус или None при ошибке соединения,
+                    тело ответа JSON или None)
+        """
+        headers = {'Accept': 'application/json'}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+        if self.token and not self.anonymous:
+            headers['Authorization'] = f'Token {self.token}'
+
+        started = time.perf_counter()
+        try:
+            self._connection.request(method.upper(), self._prefix + path,
+                                     body, headers)
+            response = self._connection.getresponse()
+            content = response.read()
+            status = response.status
+            content_type = response.getheader('Content-Type', '')
+        except (OSError, HTTPException):
+            self._connection.close()
+            status, content, content_type = None, b'', ''
+        seconds = time.perf_counter() - started
+
+        if self.recording:
+            self.measurements.append(Measurement(
+                self.scenario, method.upper(), seconds, status,
+                status in statuses
+            ))
+        if content and content_type.startswith('application/json'):
+            return status, json.loads(content)
+        return status, None
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def run_load_test(url: str,
+                  duration: float,
+                  concurrency: int,
+                  users: int,
+                  seed: int = 0,
+                  warmup: float = 0,
+                  password: str = USER_PASSWORD,
+                  scenarios: Sequence[str] = None) -> dict:
+    """Выполнить нагрузочный тест.
+
+        ------
+        Параметры:
+            url: адрес сервера, например http://127.0.0.1:8000
+            duration: длительность замера, секунды
+            concurrency: количество одновременных клиентов
+            users: количество пользователей, от имени которых клиенты
+                выполняют запросы (по кругу)
+            seed: зерно выбора сценариев и данных
+            warmup: длительность прогрева перед замером, секунды
+            password: пароль пользователей
+            scenarios: имена сценариев TRAFFIC_MIX, по умолчанию все
+        -----
+        Выходное значение:
+            dict: результаты, см. _build_report
+    """
+    mix = [scenario for scenario in TRAFFIC_MIX
+           if scenarios is None or scenario.name in scenarios]
+    if not mix:
+        raise LoadTestError('Не выбран ни один сценарий')
+    data, accounts = _discover(url, users)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        tokens = list(executor.map(
+            lambda account: _log_in(url, account, password), accounts
+        ))
+    clients = [
+        ApiClient(url, *tokens[index % len(tokens)])
+        for index in range(concurrency)
+    ]
+
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+    cum_weights = list(accumulate(scenario.weight for scenario in mix))
+    threads = [
+        threading.Thread(
+            target=_run_client,
+            args=(client, random.Random(seed * 1000003 + index), data, mix,
+                  cum_weights, measure_from, deadline),
+            name=f'load-test-{index}',
+        )
+        for index, client in enumerate(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for client in clients:
+        client.close()
+
+    return _build_report(
+        [measurement for client in clients
+         for measurement in client.measurements],
+        duration
+    )
+
+
+def _discover(url: str, users: int) -> Tuple[LoadTestData, List[dict]]:
+    """Получить данные для запросов и пользователей для входа."""
+    client = ApiClient(url)
+    status, tags = client.request('get', '/api/tags/')
+    if status != 200:
+        raise LoadTestError(f'{url}: сервер недоступен (статус {status})')
+    _, ingredients = client.request('get', '/api/ingredients/')
+    _, user_page = client.request(
+        'get', f'/api/users/?limit={max(users, 1)}'
+    )
+    recipe_ids = []
+    feed_count = 0
+    for page in range(1, DISCOVERY_PAGES + 1):
+        _, feed = client.request(
+            'get', f'/api/recipes/?limit={DISCOVERY_PAGE_SIZE}&page={page}',
+            statuses=(200, 404)
+        )
+        if not feed or not feed.get('results'):
+            break
+        feed_count = feed['count']
+        recipe_ids.extend(recipe['id'] for recipe in feed['results'])
+    client.close()
+    if not recipe_ids or not tags or not ingredients:
+        raise LoadTestError(f'{url}: в базе нет рецептов, тегов или '
+                            f'ингредиентов, заполните её generate_data')
+
+    accounts = user_page['results'][:users]
+    data = LoadTestData(
+        recipe_ids=recipe_ids,
+        feed_pages=max(math.ceil(feed_count / PAGE_SIZE), 1),
+        user_ids=[user['id'] for user in accounts],
+        user_pages=max(math.ceil(user_page['count'] / PAGE_SIZE), 1),
+        tag_ids=[tag['id'] for tag in tags],
+        tag_slugs=[tag['slug'] for tag in tags],
+        ingredient_ids=[ingredient['id'] for ingredient in ingredients],
+        ingredient_prefixes=sorted({
+            ingredient['name'][:3] for ingredient in ingredients
+        }),
+    )
+    return data, accounts
+
+
+def _log_in(url: str, account: dict, password: str) -> Tuple[str, int]:
+    client = ApiClient(url)
+    status, body = client.request('post', '/api/auth/token/login/', {
+        'email': account['email'],
+        'password': password,
+    })
+    client.close()
+    if status != 200:
+        raise LoadTestError(f'{account["email"]}: не удалось войти '
+                            f'(статус {status})')
+    return body['auth_token'], account['id']
+
+
+def _run_client(client: ApiClient, rng: random.Random, data: LoadTestData,
+                mix: list, cum_weights: list, measure_from: float,
+                deadline: float) -> None:
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(mix, cum_weights=cum_weights)[0]
+        client.scenario = scenario.name
+        client.anonymous = scenario.anonymous
+        client.recording = time.perf_counter() >= measure_from
+        scenario.run(client, rng, data)
+
+
+def _build_report(measurements: List[Measurement], duration: float) -> dict:
+    """Сводка замеров.
+
+        -----
+        Выходное значение:
+            dict: {'rows': [{scenario, method, requests, errors, rps,
+                p50, p95, p99, max}], 'total': {то же по всем
+                запросам}, 'errors': {(сценарий, метод, статус):
+                количество}}; время в миллисекундах
+    """
+    groups = defaultdict(list)
+    for measurement in measurements:
+        groups[(measurement.scenario, measurement.method)].append(measurement)
+    rows = [
+        dict(scenario=scenario, method=method,
+             **_summarize(group, duration))
+        for (scenario, method), group in sorted(groups.items())
+    ]
+    errors = Counter(
+        (measurement.scenario, measurement.method, measurement.status)
+        for measurement in measurements if not measurement.ok
+    )
+    return {
+        'rows': rows,
+        'total': dict(scenario='всего', method='',
+                      **_summarize(measurements, duration)),
+        'errors': dict(errors.most_common()),
+    }
+
+
+def _summarize(measurements: List[Measurement], duration: float) -> dict:
+    timings = sorted(measurement.seconds * 1000
+                     for measurement in measurements)
+    summary = {
+        'requests': len(timings),
+        'errors': sum(not measurement.ok for measurement in measurements),
+        'rps': len(timings) / duration,
+        'max': timings[-1] if timings else 0.0,
+    }
+    for percent in PERCENTILES:
+        summary[f'p{percent}'] = _percentile(timings, percent)
+    return summary
+
+
+def _percentile(timings: List[float], percent: float) -> float:
+    """Перцентиль по ближайшему рангу."""
+    if not timings:
+        return 0.0
+    return timings[max(math.ceil(len(timings) * percent / 100) - 1, 0)]
+
+
+def _get_feed(client: ApiClient, page: int = 1, **params) -> None:
+    query = urlencode(dict(params, page=page, limit=PAGE_SIZE), doseq=True)
+    client.request('get', f'/api/recipes/?{query}')
+
+
+def _feed(client, rng, data) -> None:
+    _get_feed(client, rng.randint(1, min(data.feed_pages, MAX_FEED_PAGE)))
+
+
+def _feed_tags(client, rng, data) -> None:
+    _get_feed(client,
+              tags=rng.sample(data.tag_slugs, min(2, len(data.tag_slugs))))
+
+
+def _feed_author(client, rng, data) -> None:
+    _get_feed(client, author=rng.choice(data.user_ids))
+
+
+def _feed_favorited(client, rng, data) -> None:
+    _get_feed(client, is_favorited=1)
+
+
+def _feed_shopping_cart(client, rng, data) -> None:
+    _get_feed(client, is_in_shopping_cart=1)
+
+
+def _feed_search(client, rng, data) -> None:
+    _get_feed(client, search=rng.choice(SEARCH_WORDS))
+
+
+def _recipe(client, rng, data) -> None:
+    client.request('get', f'/api/recipes/{rng.choice(data.recipe_ids)}/')
+
+
+def _tags(client, rng, data) -> None:
+    client.request('get', '/api/tags/')
+
+
+def _tag(client, rng, data) -> None:
+    client.request('get', f'/api/tags/{rng.choice(data.tag_ids)}/')
+
+
+def _ingredients_search(client, rng, data) -> None:
+    query = urlencode({'name': rng.choice(data.ingredient_prefixes)})
+    client.request('get', f'/api/ingredients/?{query}')
+
+
+def _ingredient(client, rng, data) -> None:
+    client.request('get',
+                   f'/api/ingredients/{rng.choice(data.ingredient_ids)}/')
+
+
+def _users(client, rng, data) -> None:
+    page = rng.randint(1, min(data.user_pages, MAX_FEED_PAGE))
+    client.request('get', f'/api/users/?page={page}&limit={PAGE_SIZE}')
+
+
+def _user(client, rng, data) -> None:
+    client.request('get', f'/api/users/{rng.choice(data.user_ids)}/')
+
+
+def _me(client, rng, data) -> None:
+    client.request('get', '/api/users/me/')
+
+
+def _subscriptions(client, rng, data) -> None:
+    client.request('get', '/api/users/subscriptions/')
+
+
+def _toggle(client: ApiClient, path: str, added: int = 201) -> None:
+    """Добавить и убрать отметку, сохранив исходное состояние.
+
+    Если отметка уже была (ответ 400), она восстанавливается.
+    """
+    status, _ = client.request('post', path, statuses=(added, 400))
+    client.request('delete', path, statuses=(204,))
+    if status == 400:
+        client.request('post', path, statuses=(added,))
+
+
+def _subscribe(client, rng, data) -> None:
+    authors = [user_id for user_id in data.user_ids
+               if user_id != client.user_id]
+    if authors:
+        _toggle(client, f'/api/users/{rng.choice(authors)}/subscribe/',
+                added=200)
+
+
+def _favorite(client, rng, data) -> None:
+    _toggle(client, f'/api/recipes/{rng.choice(data.recipe_ids)}/favorite/')
+
+
+def _shopping_cart(client, rng, data) -> None:
+    _toggle(client,
+            f'/api/recipes/{rng.choice(data.recipe_ids)}/shopping_cart/')
+
+
+def _change_marks_batch(client: ApiClient, rng: random.Random,
+                        data: LoadTestData, path: str) -> None:
+    recipe_ids = rng.sample(data.recipe_ids,
+                            min(MARKS_BATCH_SIZE, len(data.recipe_ids)))
+    _, body = client.request('post', path, {'add': recipe_ids})
+    added = [item['id'] for item in (body or {}).get('results', ())
+             if item['result'] == 'added']
+    if added:
+        client.request('post', path, {'remove': added})
+
+
+def _favorite_batch(client, rng, data) -> None:
+    _change_marks_batch(client, rng, data, '/api/recipes/favorite/batch/')
+
+
+def _shopping_cart_batch(client, rng, data) -> None:
+    _change_marks_batch(client, rng, data,
+                        '/api/recipes/shopping_cart/batch/')
+
+
+def _shopping_cart_totals(client, rng, data) -> None:
+    client.request('get', '/api/recipes/shopping_cart_totals/')
+
+
+def _download_shopping_cart(client, rng, data) -> None:
+    client.request('get', '/api/recipes/download_shopping_cart/')
+
+
+def _download_shopping_cart_async(client, rng, data) -> None:
+    status, job = client.request(
+        'get', '/api/recipes/download_shopping_cart/?async=1',
+        statuses=(202,)
+    )
+    if status == 202:
+        client.request('get', f'/api/jobs/{job["id"]}/')
+
+
+def _recipe_write(client, rng, data) -> None:
+    status, recipe = client.request('post', '/api/recipes/', {
+        'name': f'Нагрузочный рецепт {rng.getrandbits(32)}',
+        'text': 'Рецепт создан нагрузочным тестом.',
+        'cooking_time': rng.randint(5, 120),
+        'image': IMAGE,
+        'tags': rng.sample(data.tag_ids, min(2, len(data.tag_ids))),
+        'ingredients': [
+            {'id': ingredient_id, 'amount': rng.randint(1, 500)}
+            for ingredient_id in rng.sample(
+                data.ingredient_ids, min(5, len(data.ingredient_ids))
+            )
+        ],
+    }, statuses=(201,))
+    if status != 201:
+        return
+    path = f'/api/recipes/{recipe["id"]}/'
+    client.request('patch', path, {'cooking_time': rng.randint(5, 120)})
+    client.request('delete', path, statuses=(204,))
+
+
+# Смесь запросов: (имя, вес, без аутентификации, функция сценария).
+TRAFFIC_MIX = (
+    Scenario('feed_anonymous', 15, True, _feed),
+    Scenario('feed', 15, False, _feed),
+    Scenario('feed_tags', 6, False, _feed_tags),
+    Scenario('feed_author', 4, False, _feed_author),
+    Scenario('feed_favorited', 3, False, _feed_favorited),
+    Scenario('feed_shopping_cart', 2, False, _feed_shopping_cart),
+    Scenario('feed_search', 3, False, _feed_search),
+    Scenario('recipe_anonymous', 5, True, _recipe),
+    Scenario('recipe', 10, False, _recipe),
+    Scenario('tags', 3, True, _tags),
+    Scenario('tag', 1, True, _tag),
+    Scenario('ingredients_search', 5, True, _ingredients_search),
+    Scenario('ingredient', 1, True, _ingredient),
+    Scenario('users', 2, False, _users),
+    Scenario('user', 2, False, _user),
+    Scenario('me', 3, False, _me),
+    Scenario('subscriptions', 5, False, _subscriptions),
+    Scenario('subscribe', 2, False, _subscribe),
+    Scenario('favorite', 4, False, _favorite),
+    Scenario('shopping_cart', 3, False, _shopping_cart),
+    Scenario('favorite_batch', 1, False, _favorite_batch),
+    Scenario('shopping_cart_batch', 1, False, _shopping_cart_batch),
+    Scenario('shopping_cart_totals', 2, False, _shopping_cart_totals),
+    Scenario('download_shopping_cart', 1, False, _download_shopping_cart),
+    Scenario('download_shopping_cart_async', 1, False,
+             _download_shopping_cart_async),
+    Scenario('recipe_write', 1, False, _recipe_write),
+)
@@ -0,0 +1,242 @@
+"""Метрики запросов API в формате Prometheus.
+
+Если включён METRICS, ServerTimingMiddleware (utils.server_timing)
+после каждого запроса добавляет его замеры к метрикам маршрута (имени
+url, например recipes_api-list) и метода запроса:
+    - foodgram_http_requests_total - количество запросов по статусам
+      ответа;
+    - foodgram_http_request_duration_seconds - гистограмма времени
+      обработки запроса;
+    - foodgram_http_request_db_queries - гистограмма количества SQL
+      запросов;
+    - foodgram_http_request_db_seconds_total - суммарное время SQL
+      запросов;
+    - foodgram_http_response_size_bytes - гистограмма размера ответа.
+
+Каждый процесс сервера накапливает метрики в памяти и фоновым потоком
+раз в METRICS_FLUSH_INTERVAL секунд записывает их в собственный файл
+каталога METRICS_DIR, общего для всех процессов. Эндпоинт метрик
+(metrics_view) суммирует файлы всех процессов, поэтому метрики не
+зависят от того, какой процесс ответил на запрос. Файлы завершившихся
+процессов эндпоинт удаляет, иначе каталог рос бы с каждым перезапуском
+процессов сервера: счётчики при этом уменьшаются, и Prometheus
+считает это их сбросом.
+"""
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+REQUESTS = 'foodgram_http_requests_total'
+DURATION = 'foodgram_http_request_duration_seconds'
+DB_QUERIES = 'foodgram_http_request_db_queries'
+DB_TIME = 'foodgram_http_request_db_seconds_total'
+RESPONSE_SIZE = 'foodgram_http_response_size_bytes'
+
+# Метрика: (тип, описание), в порядке вывода.
+FAMILIES = {
+    REQUESTS: ('counter', 'Количество запросов'),
+    DURATION: ('histogram', 'Время обработки запроса, секунды'),
+    DB_QUERIES: ('histogram', 'Количество SQL запросов за запрос'),
+    DB_TIME: ('counter', 'Суммарное время SQL запросов, секунды'),
+    RESPONSE_SIZE: ('histogram', 'Размер тела ответа, байты'),
+}
+BUCKETS = {
+    DURATION: (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    DB_QUERIES: (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+    RESPONSE_SIZE: (256, 1024, 4096, 16384, 65536, 262144, 1048576,
+                    4194304),
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class MetricsRegistry:
+    """Метрики процесса сервера."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Файл процесса записывают и фоновый поток, и эндпоинт метрик.
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._path = None
+        self._samples = None
+        self._dirty = False
+
+    def record(self, route: str, method: str, status: int,
+               duration: float, queries: int, db_time: float,
+               size: int = None) -> None:
+        """Добавить замеры запроса к метрикам.
+
+            ------
+            Параметры:
+                size - размер тела ответа, None если неизвестен
+                    (потоковый ответ без Content-Length)
+        """
+        labels = {'route': route or UNMATCHED_ROUTE, 'method': method}
+        with self._lock:
+            self._start()
+            self._increment(REQUESTS, dict(labels, status=status), 1)
+            self._observe(DURATION, labels, duration)
+            self._observe(DB_QUERIES, labels, queries)
+            self._increment(DB_TIME, labels, db_time)
+            if size is not None:
+                self._observe(RESPONSE_SIZE, labels, size)
+            self._dirty = True
+
+    def flush(self) -> None:
+        """Записать метрики процесса в его файл, если они изменились."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                content = json.dumps(self._samples)
+                path = self._path
+                self._dirty = False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f'{path}.tmp'
+            with open(temporary, 'w') as file:
+                file.write(content)
+            os.replace(temporary, path)
+
+    def collect(self) -> str:
+        """Метрики всех процессов в текстовом формате Prometheus."""
+        self.flush()
+        samples = defaultdict(dict)
+        for family_samples in _read_process_samples():
+            for family, values in family_samples.items():
+                if family not in FAMILIES:
+                    continue
+                for sample, value in values.items():
+                    samples[family][sample] = (
+                        samples[family].get(sample, 0) + value
+                    )
+
+        lines = []
+        for family, (metric_type, description) in FAMILIES.items():
+            lines.append(f'# HELP {family} {description}')
+            lines.append(f'# TYPE {family} {metric_type}')
+            for sample, value in samples[family].items():
+                lines.append(f'{sample} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _start(self) -> None:
+        """Начать метрики процесса.
+
+        Процесс, созданный fork, начинает собственные метрики и
+        собственный файл.
+        """
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._path = os.path.join(
+            settings.METRICS_DIR, f'{self._pid}-{uuid.uuid4().hex}.json'
+        )
+        self._samples = defaultdict(dict)
+        self._dirty = False
+        threading.Thread(target=self._flush_periodically, daemon=True,
+                         name='metrics-flush').start()
+
+    def _flush_periodically(self) -> None:
+        pid = self._pid
+        while pid == os.getpid():
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+    def _increment(self, family: str, labels: dict, value: float,
+                   suffix: str = '') -> None:
+        sample = f'{family}{suffix}{_format_labels(labels)}'
+        samples = self._samples[family]
+        samples[sample] = samples.get(sample, 0) + value
+
+    def _observe(self, family: str, labels: dict, value: float) -> None:
+        for bucket in BUCKETS[family]:
+            self._increment(family, dict(labels, le=bucket),
+                            int(value <= bucket), '_bucket')
+        self._increment(family, dict(labels, le='+Inf'), 1, '_bucket')
+        self._increment(family, labels, value, '_sum')
+        self._increment(family, labels, 1, '_count')
+
+
+def metrics_view(request: object) -> HttpResponse:
+    """
+    Метрики в формате Prometheus.
+
+    Доступны только с заголовком Authorization: Bearer <METRICS_TOKEN>.
+    Если метрики выключены или токен не задан, эндпоинта нет (404).
+    """
+    if not settings.METRICS or not settings.METRICS_TOKEN:
+        raise Http404
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if not hmac.compare_digest(authorization,
+                               f'Bearer {settings.METRICS_TOKEN}'):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics_registry.collect(), content_type=CONTENT_TYPE)
+
+
+def _read_process_samples() -> Iterable[Dict[str, Dict[str, float]]]:
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return
+    for name in sorted(names):
+        path = os.path.join(settings.METRICS_DIR, name)
+        if not _is_process_alive(name.split('-', 1)[0]):
+            _remove(path)
+            continue
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(path) as file:
+                yield json.load(file)
+        except (FileNotFoundError, ValueError):
+            continue
+
+
+def _is_process_alive(pid: str) -> bool:
+    """Работает ли процесс, если имя файла начинается с его pid."""
+    if not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _format_labels(labels: dict) -> str:
+    pairs = ','.join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+    )
+    return f'{{{pairs}}}'
+
+
+def _escape(value: object) -> str:
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+metrics_registry = MetricsRegistry()
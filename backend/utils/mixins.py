@@ -1,3 +1,55 @@
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+
+from utils.reference_data import get_etag, get_last_modified, get_version
+from utils.response_cache import get_cache_key
+from utils.server_timing import get_request_timing, get_timed_serializer_class
+
+
+def get_cached_response(cache_key: str, timeout: int,
+                        view, request, *args, **kwargs):
+    """
+    Получить отрисованный ответ view из кеша.
+
+    При промахе выполняет view и после отрисовки сохраняет успешный ответ
+    в кеш по cache_key.
+    """
+    cached = cache.get(cache_key)
+    if cached is not None:
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+
+    response = view(request, *args, **kwargs)
+    if response.status_code == status.HTTP_200_OK:
+        response.add_post_render_callback(
+            lambda response: cache.set(
+                cache_key,
+                (response.content, response['Content-Type']),
+                timeout,
+            )
+        )
+    return response
+
+
+class ServerTimingMixin():
+    """
+    Замер времени работы сериализаторов (utils.server_timing).
+
+    Сериализатор, созданный get_serializer, засчитывает время валидации
+    и сериализации в метрику serializer запроса. Если замеры выключены,
+    сериализатор не меняется.
+    """
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if get_request_timing() is not None:
+            serializer.__class__ = get_timed_serializer_class(
+                serializer.__class__
+            )
+        return serializer
+
+
 class DisableUslessDjoserActionMixin():
     def activation(self, request, *args, **kwargs):
         pass
@@ -19,3 +71,106 @@ class DisableUslessDjoserActionMixin():
 
     def reset_username_confirm(self, request, *args, **kwargs):
         pass
+
+
+class ReferenceDataConditionalGetMixin():
+    """
+    Условные GET запросы к справочнику (ETag / Last-Modified).
+
+    ETag и Last-Modified строятся по версии справочника
+    reference_data (utils.reference_data), поэтому на If-None-Match и
+    If-Modified-Since с актуальной версией отвечает 304 без запросов к
+    базе данных и сериализации. Отрисованное тело ответа кешируется по
+    версии, формату и адресу запроса. Справочник одинаков для всех
+    пользователей, поэтому аутентификация не выполняется.
+    """
+    reference_data = None
+    reference_data_timeout = 24 * 60 * 60
+
+    def perform_authentication(self, request):
+        pass
+
+    def list(self, request, *args, **kwargs):
+        return self._get_conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._get_conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def _get_conditional_response(self, view, request, *args, **kwargs):
+        version = get_version(self.reference_data)
+        renderer_format = request.accepted_renderer.format
+        etag = get_etag(self.reference_data, version, renderer_format)
+        last_modified = get_last_modified(version)
+        headers = {
+            'ETag': etag,
+            'Last-Modified': http_date(last_modified),
+            'Cache-Control': 'no-cache',
+        }
+
+        if self._is_not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        else:
+            cache_key = (f'reference-data:{self.reference_data}:{version}:'
+                         f'{renderer_format}:{request.get_full_path()}')
+            response = get_cached_response(
+                cache_key, self.reference_data_timeout,
+                view, request, *args, **kwargs
+            )
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def _is_not_modified(self, request, etag: str, last_modified: int):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            etags = parse_etags(if_none_match)
+            return etag in etags or '*' in etags
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE')
+        )
+        return (if_modified_since is not None
+                and last_modified <= if_modified_since)
+
+
+class AnonymousResponseCacheMixin():
+    """
+    Кеш ответов list/retrieve для анонимных пользователей.
+
+    Ключ кеша строится по параметрам запроса anonymous_cache_query_params
+    и версиям данных из get_response_version_names (utils.response_cache),
+    поэтому после изменения данных ответ отрисовывается заново.
+    Ответы аутентифицированным пользователям не кешируются.
+    """
+    anonymous_cache_query_params = ()
+    anonymous_cache_timeout = 60 * 60
+
+    def get_response_version_names(self) -> tuple:
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return self._get_anonymous_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._get_anonymous_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def _get_anonymous_response(self, view, request, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return view(request, *args, **kwargs)
+        cache_key = get_cache_key(
+            request,
+            request.accepted_renderer.format,
+            self.anonymous_cache_query_params,
+            self.get_response_version_names(),
+        )
+        return get_cached_response(
+            cache_key, self.anonymous_cache_timeout,
+            view, request, *args, **kwargs
+        )
@@ -1,5 +1,99 @@
+import base64
+import binascii
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class PageNumberWithPageSizeControllPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class RecipeFeedPagination(PageNumberWithPageSizeControllPagination):
+    """
+    Пагинация ленты рецептов.
+
+    По умолчанию постраничная (page, limit). Если в запросе есть
+    параметр cursor, включается курсорная пагинация по ключу
+    (publication_date, id): страница выбирается условием
+    WHERE (publication_date, id) < курсор без OFFSET и COUNT(*), поэтому
+    любая страница стоит столько же, сколько первая. Пустой cursor -
+    первая страница, курсор следующей страницы возвращается в next.
+    Выборку со своим порядком (поиск по релевантности) курсор по дате
+    публикации переупорядочил бы, поэтому для неё cursor отклоняется
+    с ошибкой 400.
+    """
+    cursor_query_param = 'cursor'
+    ordering = ('-publication_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.cursor_mode = False
+            return super().paginate_queryset(queryset, request, view)
+
+        if queryset.query.order_by and (tuple(queryset.query.order_by)
+                                        != self.ordering):
+            raise ValidationError(
+                {'error': settings.ERROR_MESSAGE.get('cursor_with_ordering')}
+            )
+
+        self.cursor_mode = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            publication_date, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(publication_date__lt=publication_date)
+                | Q(publication_date=publication_date, id__lt=pk)
+            )
+
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        self.page = page[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(last.publication_date, last.id),
+        )
+
+    def encode_cursor(self, publication_date, pk: int) -> str:
+        position = f'{publication_date.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> tuple:
+        try:
+            position = base64.urlsafe_b64decode(cursor.encode()).decode()
+            publication_date, pk = position.split('|')
+            publication_date = parse_datetime(publication_date)
+            pk = int(pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if publication_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return publication_date, pk
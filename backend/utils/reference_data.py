@@ -0,0 +1,67 @@
+"""Версии наборов данных для кеширования ответов.
+
+Версия набора данных - момент его последнего изменения в наносекундах.
+Она хранится в кеше Django (по умолчанию файловом, общем для всех
+процессов сервера) и меняется сигналами при сохранении и удалении
+объектов, а также явным вызовом bump_version после массовой записи в
+обход сигналов (bulk_create, bulk_update).
+
+Версии ведутся для справочников (теги, ингредиенты) и для рецептов
+(utils.response_cache). По версиям справочников строятся ETag и
+Last-Modified их ответов (utils.mixins.ReferenceDataConditionalGetMixin)
+и проверяется актуальность индекса поиска ингредиентов.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import quote_etag
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+
+VERSION_KEY = 'reference-data-version:{name}'
+
+
+def get_version(name: str) -> int:
+    """Получить текущую версию справочника.
+
+    Если версии нет в кеше (первый запуск, очистка кеша), справочник
+    считается изменённым сейчас.
+    """
+    key = VERSION_KEY.format(name=name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*names: str) -> None:
+    """Отметить изменение данных.
+
+    Внутри транзакции версия меняется после её фиксации: иначе
+    параллельный запрос мог бы закешировать по новой версии ещё старые
+    данные.
+    """
+    def bump():
+        version = time.time_ns()
+        cache.set_many({VERSION_KEY.format(name=name): version
+                        for name in names}, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def get_versions(*names: str) -> tuple:
+    """Получить текущие версии нескольких наборов данных."""
+    return tuple(get_version(name) for name in names)
+
+
+def get_etag(name: str, version: int, renderer_format: str) -> str:
+    """ETag ответа справочника для версии и формата ответа."""
+    return quote_etag(f'{name}-{version}-{renderer_format}')
+
+
+def get_last_modified(version: int) -> int:
+    """Last-Modified ответа справочника, секунды с начала эпохи."""
+    return version // 10 ** 9
@@ -0,0 +1,66 @@
+"""Кеш ответов API рецептов для анонимных пользователей.
+
+Для анонимного пользователя ответ списка и страницы рецепта зависит
+только от данных рецептов, поэтому отрисованный ответ кешируется
+(utils.mixins.AnonymousResponseCacheMixin). Ключ кеша составляется из
+нормализованной строки запроса и версий (utils.reference_data) всех
+данных, попадающих в ответ:
+    - RECIPES_FEED - любой рецепт (список);
+    - recipe-<id> - конкретный рецепт (страница рецепта);
+    - AUTHORS - данные пользователей-авторов;
+    - справочники тегов и ингредиентов.
+Изменение любого из них меняет ключ, поэтому устаревший ответ никогда
+не выдаётся, а старые записи вытесняются кешем по времени.
+"""
+from hashlib import md5
+from typing import Iterable, Sequence
+
+from django.utils.http import urlencode
+
+from utils.reference_data import INGREDIENTS, TAGS, bump_version, get_versions
+
+RECIPES_FEED = 'recipes-feed'
+AUTHORS = 'recipe-authors'
+
+# Поля пользователя, которые выводятся в рецептах.
+AUTHOR_FIELDS = frozenset(('email', 'username', 'first_name', 'last_name'))
+
+
+def get_recipe_version_name(recipe_id: int) -> str:
+    return f'recipe-{recipe_id}'
+
+
+def bump_recipes(recipe_ids: Iterable[int]) -> None:
+    """Отметить изменение рецептов."""
+    bump_version(RECIPES_FEED, *(get_recipe_version_name(recipe_id)
+                                 for recipe_id in recipe_ids))
+
+
+def bump_authors() -> None:
+    """Отметить изменение данных авторов рецептов."""
+    bump_version(AUTHORS)
+
+
+def get_cache_key(request: object,
+                  renderer_format: str,
+                  query_params: Sequence[str],
+                  version_names: Sequence[str]) -> str:
+    """Ключ кеша ответа.
+
+        ------
+        Параметры:
+            request - запрос
+            renderer_format: str - формат ответа
+            query_params - параметры запроса, влияющие на ответ,
+                остальные параметры и их порядок не учитываются
+            version_names - версии данных, из которых состоит ответ
+    """
+    query = urlencode(sorted(
+        (param, value)
+        for param in query_params
+        for value in request.query_params.getlist(param)
+    ))
+    versions = get_versions(*version_names, AUTHORS, TAGS, INGREDIENTS)
+    key = (f'{request.get_host()}{request.path}?{query}:{renderer_format}:'
+           + '.'.join(map(str, versions)))
+    return 'anonymous-response:' + md5(key.encode()).hexdigest()
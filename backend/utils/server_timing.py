@@ -0,0 +1,215 @@
+"""Замеры времени обработки запросов (Server-Timing).
+
+Если включён SERVER_TIMING, ServerTimingMiddleware для каждого запроса
+измеряет:
+    - db: количество и суммарное время запросов к базе данных
+      (connection.execute_wrapper, работает и без DEBUG);
+    - serializer: время валидации и сериализации данных сериализаторами
+      view (utils.mixins.ServerTimingMixin);
+    - view: время выполнения view до отрисовки ответа;
+    - render: время отрисовки ответа рендерером DRF;
+    - total: полное время обработки запроса.
+Запросы к базе данных, выполненные при сериализации (ленивые queryset),
+входят и в db, и в serializer.
+
+Замеры отдаются заголовком Server-Timing и записываются одной строкой
+JSON в лог utils.server_timing вместе с именем маршрута и действием
+viewset. Для запросов дольше SERVER_TIMING_SLOW_REQUEST в строку с
+вероятностью SERVER_TIMING_SLOW_SAMPLE_RATE добавляется список SQL
+запросов (первые MAX_LOGGED_QUERIES) без параметров, чтобы в лог не
+попадали данные пользователей.
+
+Если включён METRICS, те же замеры добавляются к метрикам процесса
+(utils.metrics).
+"""
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from utils.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# Метрики заголовка Server-Timing в порядке вывода.
+METRICS = ('db', 'serializer', 'view', 'render', 'total')
+MAX_LOGGED_QUERIES = 100
+
+_current_timing = ContextVar('server_timing', default=None)
+
+
+class RequestTiming:
+    """Замеры одного запроса."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float, db=0.0)
+        self.queries = []
+        self.route = None
+        self.action = None
+        self.view_started = None
+        self.view_finished = None
+
+    @contextmanager
+    def measure(self, name: str):
+        """Добавить время выполнения блока к метрике name."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - started
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка запросов к базе данных (execute_wrapper)."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.durations['db'] += duration
+            self.queries.append((sql, duration))
+
+    def get_header(self) -> str:
+        """Значение заголовка Server-Timing."""
+        metrics = []
+        for name in METRICS:
+            if name not in self.durations:
+                continue
+            metric = f'{name};dur={self.durations[name] * 1000:.1f}'
+            if name == 'db':
+                metric += f';desc="{len(self.queries)} queries"'
+            metrics.append(metric)
+        return ', '.join(metrics)
+
+    def get_log_record(self, request: object, response: object) -> dict:
+        """Строка лога запроса."""
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'route': self.route,
+            'action': self.action,
+            'queries': len(self.queries),
+        }
+        for name in METRICS:
+            record[f'{name}_ms'] = round(self.durations[name] * 1000, 1)
+        if (self.durations['total'] >= settings.SERVER_TIMING_SLOW_REQUEST
+                and random.random() < settings.SERVER_TIMING_SLOW_SAMPLE_RATE):
+            record['sql'] = [
+                {'sql': sql, 'ms': round(duration * 1000, 1)}
+                for sql, duration in self.queries[:MAX_LOGGED_QUERIES]
+            ]
+        return record
+
+
+def get_request_timing() -> Optional[RequestTiming]:
+    """Замеры текущего запроса или None, если замеры выключены."""
+    return _current_timing.get()
+
+
+@lru_cache(maxsize=None)
+def get_timed_serializer_class(serializer_class: type) -> type:
+    """Подкласс сериализатора, засчитывающий время валидации и
+    сериализации в метрику serializer текущего запроса."""
+    class TimedSerializer(serializer_class):
+        def is_valid(self, *args, **kwargs):
+            with _measure('serializer'):
+                return super().is_valid(*args, **kwargs)
+
+        @property
+        def data(self):
+            with _measure('serializer'):
+                return super().data
+
+    TimedSerializer.__name__ = serializer_class.__name__
+    TimedSerializer.__qualname__ = serializer_class.__qualname__
+    return TimedSerializer
+
+
+class ServerTimingMiddleware:
+    """
+    Замеры времени обработки запросов.
+
+    Должен стоять первым в MIDDLEWARE, чтобы total включал остальные
+    middleware, а render - только отрисовку ответа. Без SERVER_TIMING и
+    METRICS исключается из обработки запросов.
+    """
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING and not settings.METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(timing)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+
+        finished = time.perf_counter()
+        if timing.view_started is not None:
+            timing.durations['view'] = (
+                (timing.view_finished or finished) - timing.view_started
+            )
+        timing.durations['total'] = finished - timing.started
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = timing.get_header()
+            logger.info(json.dumps(timing.get_log_record(request, response),
+                                   ensure_ascii=False))
+        if settings.METRICS:
+            metrics_registry.record(
+                timing.route, request.method, response.status_code,
+                timing.durations['total'], len(timing.queries),
+                timing.durations['db'], _get_response_size(response),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = get_request_timing()
+        timing.route = request.resolver_match.view_name
+        actions = getattr(view_func, 'actions', None) or {}
+        timing.action = actions.get(request.method.lower())
+        timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timing = get_request_timing()
+        timing.view_finished = time.perf_counter()
+
+        def set_render_duration(response):
+            timing.durations['render'] = (time.perf_counter()
+                                          - timing.view_finished)
+
+        response.add_post_render_callback(set_render_duration)
+        return response
+
+
+def _get_response_size(response: object) -> Optional[int]:
+    if not response.streaming:
+        return len(response.content)
+    if response.has_header('Content-Length'):
+        return int(response['Content-Length'])
+    return None
+
+
+@contextmanager
+def _measure(name: str):
+    timing = get_request_timing()
+    if timing is None:
+        yield
+        return
+    with timing.measure(name):
+        yield